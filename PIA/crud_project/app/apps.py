@@ -43,7 +43,6 @@ class AppConfig(_AppConfig):
         # Úsalo para registrar señales o inicializaciones ligeras.
         # Evita operaciones lentas o bloqueantes aquí para no retrasar el arranque.
         def ready(self):
-                # Ejemplo (comentado): registrar señales con importación local
-                # from . import signals
-                # signals.connect_handlers()
-                pass
+                # Registrar señales con importación local (ver `signals.py`).
+                from . import signals
+                signals.connect_handlers()
@@ -0,0 +1,205 @@
+"""
+Búsqueda de pacientes/clientes en citas y reservaciones.
+
+Una búsqueda se clasifica según el texto:
+- Solo dígitos (se ignoran espacios, guiones y paréntesis): prefijo de
+  `telefono_busqueda` (el teléfono guardado sin separadores).
+- Contiene `@`: prefijo de `correo_busqueda` (el correo en minúsculas).
+- Cualquier otro texto: prefijo del nombre normalizado (`nombre_busqueda`: sin
+  acentos y en mayúsculas).
+
+El término y la columna se normalizan con las mismas funciones
+(`normalizar_busqueda`, `normalizar_telefono`, `normalizar_correo` de
+`app/models.py`): la columna al guardar y el término al buscar, así
+"Ana@Mail.com" o "81-1234-5678" se encuentran igual que se capturaron.
+`telefono` y `correo` conservan el valor original para mostrarlo.
+
+Las tres columnas están indexadas. El prefijo se consulta como rango
+(`col >= 'ANA' AND col < 'ANA\\U0010ffff'`) en SQLite, porque su `LIKE` no usa
+índices con la collation por defecto; en otros motores se usa `startswith`.
+
+FTS5 (opcional, solo SQLite): con `settings.BUSQUEDA_FTS = True` las búsquedas
+por nombre usan la tabla virtual `app_busqueda_fts`, que encuentra el prefijo en
+cualquier palabra del nombre (apellidos incluidos). La tabla la crea la
+migración 0008 si SQLite trae FTS5, se mantiene sincronizada con señales y se
+reconstruye con `python manage.py busqueda --reindexar` (p. ej. tras una
+importación masiva, que no dispara señales).
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.utils import DatabaseError
+
+from .models import CitaDental, Reservacion, normalizar_busqueda, normalizar_correo, normalizar_telefono
+
+MAX_RESULTADOS = 50
+MIN_CARACTERES = 2
+
+TABLA_FTS = 'app_busqueda_fts'
+
+# rowid de FTS = id * 2 + tipo, para poder borrar/reemplazar por rowid.
+_TIPOS = {'cita': 0, 'reservacion': 1}
+
+_fts_disponible = None
+
+
+# ------------------------------------------------------------------ FTS5
+
+def crear_tabla_fts(cursor):
+	"""Crea la tabla FTS5 si el motor es SQLite y tiene FTS5 (si no, no hace nada)."""
+	if cursor.db.vendor != 'sqlite':
+		return False
+	try:
+		cursor.execute(
+			f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} '
+			"USING fts5(texto, tokenize='unicode61 remove_diacritics 2')"
+		)
+	except DatabaseError:
+		return False
+	return True
+
+
+def fts_activo():
+	"""True si `BUSQUEDA_FTS` está activado y la tabla FTS5 existe."""
+	global _fts_disponible
+	if not getattr(settings, 'BUSQUEDA_FTS', False) or connection.vendor != 'sqlite':
+		return False
+	if _fts_disponible is None:
+		_fts_disponible = TABLA_FTS in connection.introspection.table_names()
+	return _fts_disponible
+
+
+def _rowid(tipo, pk):
+	return pk * 2 + _TIPOS[tipo]
+
+
+def _texto_fts(nombre, telefono, correo):
+	return ' '.join(filter(None, [normalizar_busqueda(nombre), telefono, correo]))
+
+
+def _rowid_de(sender, instance):
+	return _rowid('cita' if sender is CitaDental else 'reservacion', instance.pk)
+
+
+def sincronizar_fts(sender, instance, **kwargs):
+	"""Receptor de `post_save` de `CitaDental` y `Reservacion`."""
+	if not fts_activo():
+		return
+	nombre = instance.nombre_paciente if sender is CitaDental else instance.nombre_cliente
+	rowid = _rowid_de(sender, instance)
+	with connection.cursor() as cursor:
+		cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [rowid])
+		cursor.execute(
+			f'INSERT INTO {TABLA_FTS}(rowid, texto) VALUES (%s, %s)',
+			[rowid, _texto_fts(nombre, instance.telefono, instance.correo)],
+		)
+
+
+def quitar_fts(sender, instance, **kwargs):
+	"""Receptor de `post_delete` de `CitaDental` y `Reservacion`."""
+	if not fts_activo():
+		return
+	with connection.cursor() as cursor:
+		cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [_rowid_de(sender, instance)])
+
+
+def reindexar_fts(tamano_lote=2000):
+	"""Reconstruye la tabla FTS desde cero. Devuelve el número de filas indexadas."""
+	total = 0
+	with connection.cursor() as cursor:
+		if not crear_tabla_fts(cursor):
+			return 0
+		cursor.execute(f'DELETE FROM {TABLA_FTS}')
+		fuentes = (
+			('cita', CitaDental.objects.values_list('pk', 'nombre_paciente', 'telefono', 'correo')),
+			('reservacion', Reservacion.objects.values_list('pk', 'nombre_cliente', 'telefono', 'correo')),
+		)
+		for tipo, filas in fuentes:
+			lote = []
+			for pk, nombre, telefono, correo in filas.iterator(chunk_size=tamano_lote):
+				lote.append((_rowid(tipo, pk), _texto_fts(nombre, telefono, correo)))
+				if len(lote) >= tamano_lote:
+					cursor.executemany(f'INSERT INTO {TABLA_FTS}(rowid, texto) VALUES (%s, %s)', lote)
+					total += len(lote)
+					lote = []
+			if lote:
+				cursor.executemany(f'INSERT INTO {TABLA_FTS}(rowid, texto) VALUES (%s, %s)', lote)
+				total += len(lote)
+	global _fts_disponible
+	_fts_disponible = None
+	return total
+
+
+def _buscar_fts(termino, limite):
+	palabras = re.findall(r'\w+', normalizar_busqueda(termino))
+	if not palabras:
+		return [], []
+	consulta = ' '.join(f'"{p}"*' for p in palabras)
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s ORDER BY rank LIMIT %s',
+			[consulta, limite * 2],
+		)
+		rowids = [fila[0] for fila in cursor.fetchall()]
+	citas = [r // 2 for r in rowids if r % 2 == _TIPOS['cita']][:limite]
+	reservaciones = [r // 2 for r in rowids if r % 2 == _TIPOS['reservacion']][:limite]
+	return citas, reservaciones
+
+
+# ------------------------------------------------------------- búsqueda
+
+def _prefijo(campo, valor):
+	if connection.vendor == 'sqlite':
+		return {f'{campo}__gte': valor, f'{campo}__lt': valor + '\U0010ffff'}
+	return {f'{campo}__startswith': valor}
+
+
+def clasificar(termino):
+	"""`(tipo, valor)` con tipo 'telefono', 'correo' o 'nombre'; `None` si es muy corto."""
+	termino = (termino or '').strip()
+	if len(termino) >= 3 and re.fullmatch(r'[\d\s\-()+.]+', termino):
+		digitos = normalizar_telefono(termino)
+		if len(digitos) >= 3:
+			return 'telefono', digitos
+	if '@' in termino:
+		return 'correo', normalizar_correo(termino)
+	nombre = normalizar_busqueda(termino)
+	if len(nombre) < MIN_CARACTERES:
+		return None
+	return 'nombre', nombre
+
+
+def buscar(termino, limite=MAX_RESULTADOS, incluir_reservaciones=True):
+	"""Busca en citas y reservaciones.
+
+	Devuelve `{'tipo': ..., 'citas': [...], 'reservaciones': [...]}` con hasta
+	`limite` resultados de cada modelo (más recientes primero), o `None` si el
+	término es demasiado corto. Con `incluir_reservaciones=False` no se consultan
+	las reservaciones (usuarios que solo tienen acceso a citas).
+	"""
+	clasificado = clasificar(termino)
+	if clasificado is None:
+		return None
+	tipo, valor = clasificado
+
+	citas = CitaDental.objects.all()
+	reservaciones = Reservacion.objects.all()
+	if tipo == 'nombre' and fts_activo():
+		ids_citas, ids_reservaciones = _buscar_fts(valor, limite)
+		citas = citas.filter(pk__in=ids_citas)
+		reservaciones = reservaciones.filter(pk__in=ids_reservaciones)
+	else:
+		campo = {'telefono': 'telefono_busqueda', 'correo': 'correo_busqueda', 'nombre': 'nombre_busqueda'}[tipo]
+		citas = citas.filter(**_prefijo(campo, valor))
+		reservaciones = reservaciones.filter(**_prefijo(campo, valor))
+
+	return {
+		'tipo': tipo,
+		'citas': list(citas.order_by('-fecha_cita', '-id')[:limite]),
+		'reservaciones': (
+			list(reservaciones.order_by('-fecha_reservacion', '-id')[:limite])
+			if incluir_reservaciones else []
+		),
+	}
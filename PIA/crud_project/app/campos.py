@@ -0,0 +1,72 @@
+"""
+Campos de texto normalizado (mayúsculas, sin espacios en los extremos).
+
+Antes la normalización se hacía en `save()` de cada modelo, así que
+`bulk_create()`, `bulk_update()` y `QuerySet.update()` guardaban el texto tal
+como llegaba. Estos campos la aplican en la capa del campo:
+
+Diseño:
+- `pre_save()` normaliza y actualiza el atributo de la instancia: cubre
+  `save()` y `bulk_create()` (ambos lo llaman al insertar/actualizar).
+- `get_prep_value()` normaliza el valor que se envía a la base de datos: cubre
+  `QuerySet.update(campo='...')` y `bulk_update()`. También se aplica a los
+  valores de los filtros (`filter(estatus='pendiente')` busca 'PENDIENTE'),
+  que es lo esperado al comparar contra una columna normalizada.
+- Las expresiones (`F()`, `Upper()`, ...) no pasan por `get_prep_value()`.
+- `Mayusculas` es la misma normalización como expresión SQL, para
+  actualizaciones por conjuntos (`manage.py normalizar`). En SQLite `UPPER()`
+  solo convierte ASCII, así que se usa la función `APP_MAYUSCULAS` que se
+  registra en cada conexión nueva (`registrar_funciones_sqlite`).
+"""
+
+from django.db import models
+from django.db.models import Func
+
+
+def mayusculas(valor):
+	# Si el valor es string: quitar espacios de los extremos y convertir a
+	# mayúsculas. Otros valores (None incluido) se devuelven tal cual.
+	if isinstance(valor, str):
+		return valor.strip().upper()
+	return valor
+
+
+class CampoMayusculas:
+	"""Mixin: normaliza el valor con `mayusculas()` al guardar y al filtrar."""
+
+	def pre_save(self, model_instance, add):
+		valor = mayusculas(getattr(model_instance, self.attname))
+		setattr(model_instance, self.attname, valor)
+		return valor
+
+	def get_prep_value(self, value):
+		return super().get_prep_value(mayusculas(value))
+
+
+class MayusculasCharField(CampoMayusculas, models.CharField):
+	"""`CharField` que guarda el texto en mayúsculas y sin espacios extremos."""
+
+
+class MayusculasTextField(CampoMayusculas, models.TextField):
+	"""`TextField` que guarda el texto en mayúsculas y sin espacios extremos."""
+
+
+class Mayusculas(Func):
+	"""`UPPER(TRIM(expr))` en SQL; mismo resultado que `mayusculas()`."""
+
+	template = 'UPPER(TRIM(%(expressions)s))'
+	arity = 1
+
+	def as_sqlite(self, compiler, connection, **extra_context):
+		return self.as_sql(compiler, connection, template='APP_MAYUSCULAS(%(expressions)s)', **extra_context)
+
+
+def registrar_funciones_sqlite(sender, connection, **kwargs):
+	"""Receptor de `connection_created`: registra `APP_MAYUSCULAS` en SQLite."""
+	if connection.vendor == 'sqlite':
+		connection.connection.create_function('APP_MAYUSCULAS', 1, mayusculas, deterministic=True)
+
+
+def campos_mayusculas(modelo):
+	"""Nombres de los campos concretos de `modelo` que se guardan en mayúsculas."""
+	return [campo.name for campo in modelo._meta.concrete_fields if isinstance(campo, CampoMayusculas)]
@@ -0,0 +1,107 @@
+"""
+Catálogo de tratamientos serializado y cacheado.
+
+El catálogo es la petición anónima más frecuente (la landing lo consume vía
+`/api/tratamientos/`). Aquí se construye una sola vez con `.values()` (sin
+instanciar modelos), se guarda en la cache de Django junto con su `ETag` y
+`Last-Modified`, y se reutiliza hasta que un `Tratamiento` cambia.
+
+Invalidación:
+- La cache es versionada: `invalidar_catalogo()` incrementa la versión y
+  registra la hora del cambio. Se conecta a `post_save`/`post_delete` de
+  `Tratamiento` en `signals.py`.
+- La versión cambia al confirmar la transacción (`on_commit`), no dentro de
+  ella: si cambiara antes, un lector concurrente podría reconstruir el
+  catálogo (o la tabla de precios de `cotizador`) con las filas viejas aún
+  confirmadas bajo la versión nueva, y esa copia vieja quedaría en uso hasta
+  el siguiente cambio.
+- El payload además expira tras `CATALOGO_CACHE_TIMEOUT` segundos, lo que
+  acota la desactualización si la cache no se comparte entre procesos.
+"""
+
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Tratamiento
+from .replicas import en_primaria
+
+CATALOGO_CACHE_TIMEOUT = 300
+
+_ESTADO_KEY = 'app:catalogo:estado'
+
+
+def _estado():
+	# (versión, fecha de último cambio). Se inicializa en frío con la hora
+	# actual porque `Tratamiento` no guarda fecha de modificación. La versión
+	# inicial es única (nanosegundos), no 1: así quien guarda datos en memoria
+	# con la versión (p. ej. `cotizador`) detecta también que la cache se vació.
+	estado = cache.get(_ESTADO_KEY)
+	if estado is None:
+		estado = (time.time_ns(), timezone.now().replace(microsecond=0))
+		cache.add(_ESTADO_KEY, estado, None)
+		estado = cache.get(_ESTADO_KEY, estado)
+	return estado
+
+
+def version_catalogo():
+	"""Versión actual del catálogo; cambia cada vez que se modifica un `Tratamiento`."""
+	return _estado()[0]
+
+
+def _serializar():
+	data = []
+	filas = Tratamiento.objects.order_by('id').values('id', 'nombre', 'descripcion', 'precio')
+	for t in filas:
+		data.append({
+			'id': t['id'],
+			'nombre': t['nombre'],
+			'descripcion': t['descripcion'] or '',
+			'precio': float(t['precio']),
+			'precioTexto': f"${t['precio']} MXN",
+		})
+	return data
+
+
+def catalogo_tratamientos():
+	"""Devuelve el catálogo cacheado.
+
+	Diccionario con:
+	- `data`: lista de tratamientos (id, nombre, descripcion, precio, precioTexto).
+	- `json`: la misma lista ya serializada (str), lista para responder.
+	- `etag`: ETag fuerte (hash del JSON, entre comillas).
+	- `last_modified`: datetime del último cambio conocido del catálogo.
+	"""
+	version, modificado = _estado()
+	key = f'app:catalogo:v{version}'
+	catalogo = cache.get(key)
+	if catalogo is None:
+		with en_primaria():
+			data = _serializar()
+		contenido = json.dumps(data)
+		catalogo = {
+			'data': data,
+			'json': contenido,
+			'etag': '"%s"' % hashlib.sha1(contenido.encode('utf-8')).hexdigest(),
+			'last_modified': modificado,
+		}
+		cache.set(key, catalogo, CATALOGO_CACHE_TIMEOUT)
+	return catalogo
+
+
+def _nueva_version():
+	version, _ = _estado()
+	cache.set(_ESTADO_KEY, (version + 1, timezone.now().replace(microsecond=0)), None)
+
+
+def invalidar_catalogo(using=None, **kwargs):
+	"""Marca el catálogo como modificado (nueva versión de cache) al confirmar.
+
+	Fuera de una transacción se aplica de inmediato. Acepta `**kwargs` para
+	poder conectarse directamente a señales.
+	"""
+	transaction.on_commit(_nueva_version, using=using)
@@ -12,9 +12,9 @@ Descripción:
 Consideraciones de rendimiento y buenas prácticas:
 - Evitar consultas costosas o lógica pesada aquí: el context processor se
   ejecuta en cada render de plantilla que use el motor de templates.
-- Si necesitas realizar múltiples consultas, considera cachear el resultado
-  en `request` (p. ej. `request._roles_cache`) o usar un sistema de cache
-  (memcached/redis) para no golpear la DB en cada petición.
+- Los roles se resuelven con `app.roles`, que carga los grupos del usuario
+  una sola vez por request (y, con `ROLES_CACHE_COMPARTIDA`, en la cache),
+  compartiendo el resultado con `group_required` y las vistas.
 - Evitar excepciones silenciosas; aquí la función captura excepciones leves
   para no romper el render, pero en producción es mejor registrar el error.
 
@@ -42,6 +42,8 @@ Ejemplo de uso en plantilla (Django template):
 
 """
 
+from .roles import banderas_roles
+
 
 def user_roles(request):
     """Context processor que añade banderas de rol para plantillas.
@@ -70,23 +72,8 @@ def user_roles(request):
     user = getattr(request, 'user', None)
 
     try:
-        # Verificar que el usuario esté autenticado antes de consultar grupos.
-        if user and user.is_authenticated:
-            # is_admin combina superuser y pertenencia al grupo 'Administrador'.
-            is_admin = (
-                user.is_superuser
-                or user.groups.filter(name='Administrador').exists()
-            )
-            flags['is_admin'] = is_admin
-
-            # Banderas simples basadas en pertenencia a grupos.
-            flags['is_employee'] = user.groups.filter(name='Empleado').exists()
-            flags['can_view_citas'] = (
-                is_admin or user.groups.filter(name='Permiso Citas').exists()
-            )
-            flags['can_manage_tratamientos'] = (
-                is_admin or user.groups.filter(name='Permiso Tratamientos').exists()
-            )
+        # `banderas_roles` reutiliza los grupos ya cargados en esta request.
+        flags = banderas_roles(user)
     except Exception:
         # En este contexto preferimos no romper el render de la plantilla.
         # Recomendación: cambiar a logging.exception(...) en producción.
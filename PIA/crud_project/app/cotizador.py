@@ -0,0 +1,158 @@
+"""
+Cotizador de tratamientos (`/api/cotizar/`).
+
+Calcula en el servidor, con `Decimal`, el total de uno o varios tratamientos
+con sus cantidades y descuentos, para que el precio mostrado sea el mismo que
+se puede auditar (el cálculo anterior se hacía en `main.js` con floats).
+
+Diseño:
+- Tabla de precios en memoria del proceso: `{id: (nombre, precio)}`. Se
+  reconstruye (una consulta) solo cuando cambia la versión del catálogo
+  (`catalogo.version_catalogo()`), que se incrementa al guardar o eliminar un
+  `Tratamiento`; así todos los procesos ven el cambio a través de la cache.
+- Descuentos: el cliente puede pedir uno de `DESCUENTOS_PERMITIDOS` y además
+  se evalúan las reglas automáticas de `REGLAS_DESCUENTO` (paquete de varios
+  tratamientos, volumen). Los descuentos no se acumulan: se aplica el mayor.
+- Importes redondeados a centavos con `ROUND_HALF_UP` y devueltos como texto
+  para no perder precisión en JSON.
+"""
+
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+from .catalogo import version_catalogo
+from .models import Tratamiento
+from .replicas import en_primaria
+
+CENTAVOS = Decimal('0.01')
+MAX_CANTIDAD = 100
+MAX_COTIZACIONES = 500
+
+DESCUENTOS_PERMITIDOS = (0, 10, 20)
+
+# `min_tratamientos`: tratamientos distintos en la cotización;
+# `min_unidades`: suma de cantidades.
+REGLAS_DESCUENTO = [
+	{'nombre': 'Paquete de tratamientos', 'min_tratamientos': 2, 'porcentaje': 5},
+	{'nombre': 'Tratamiento por volumen', 'min_unidades': 5, 'porcentaje': 10},
+]
+
+_lock = threading.Lock()
+_tabla = {'version': None, 'precios': {}}
+
+
+class CotizacionInvalida(ValueError):
+	"""Datos de cotización inválidos (tratamiento inexistente, cantidad, etc.)."""
+
+
+def tabla_precios():
+	"""`{id: (nombre, precio Decimal)}` de todos los tratamientos."""
+	version = version_catalogo()
+	if _tabla['version'] != version:
+		with _lock:
+			if _tabla['version'] != version:
+				with en_primaria():
+					precios = {
+						pk: (nombre, precio)
+						for pk, nombre, precio in Tratamiento.objects.values_list('pk', 'nombre', 'precio')
+					}
+				_tabla['precios'] = precios
+				_tabla['version'] = version
+	return _tabla['precios']
+
+
+def _reglas():
+	return getattr(settings, 'COTIZADOR_REGLAS_DESCUENTO', REGLAS_DESCUENTO)
+
+
+def _entero(valor, campo, minimo, maximo):
+	# Solo enteros JSON o texto con dígitos: `int()` truncaría 1.9 y fallaría
+	# con OverflowError en 1e400/Infinity.
+	if isinstance(valor, str) and valor.strip().isdigit():
+		valor = int(valor)
+	if not isinstance(valor, int) or isinstance(valor, bool):
+		raise CotizacionInvalida(f'`{campo}` debe ser un número entero.')
+	if not minimo <= valor <= maximo:
+		raise CotizacionInvalida(f'`{campo}` debe estar entre {minimo} y {maximo}.')
+	return valor
+
+
+def cotizar(items, descuento=0, precios=None):
+	"""Cotiza `items` (`[{'id': .., 'cantidad': ..}]`) con el `descuento` pedido (%).
+
+	Lanza `CotizacionInvalida` si algún dato no es válido.
+	"""
+	if precios is None:
+		precios = tabla_precios()
+	if not isinstance(items, list) or not items:
+		raise CotizacionInvalida('Incluya al menos un tratamiento en `items`.')
+	# Solo la ausencia (`None`/null) vale 0: `false`, `0.0` o '' se rechazan.
+	descuento = _entero(0 if descuento is None else descuento, 'descuento', 0, 100)
+	if descuento not in DESCUENTOS_PERMITIDOS:
+		raise CotizacionInvalida(f'Descuento no permitido: {descuento}%.')
+
+	cantidades = {}
+	for item in items:
+		if not isinstance(item, dict):
+			raise CotizacionInvalida('Cada item debe ser un objeto con `id` y `cantidad`.')
+		pk = _entero(item.get('id'), 'id', 1, 2 ** 63 - 1)
+		if pk not in precios:
+			raise CotizacionInvalida(f'El tratamiento {pk} no existe.')
+		cantidad = _entero(item.get('cantidad', 1), 'cantidad', 1, MAX_CANTIDAD)
+		cantidades[pk] = cantidades.get(pk, 0) + cantidad
+
+	lineas = []
+	subtotal = Decimal('0')
+	for pk, cantidad in cantidades.items():
+		nombre, precio = precios[pk]
+		importe = precio * cantidad
+		subtotal += importe
+		lineas.append({
+			'id': pk,
+			'nombre': nombre,
+			'cantidad': cantidad,
+			'precio_unitario': str(precio.quantize(CENTAVOS)),
+			'importe': str(importe.quantize(CENTAVOS)),
+		})
+
+	aplicado = {'porcentaje': descuento, 'regla': 'Descuento solicitado' if descuento else None}
+	unidades = sum(cantidades.values())
+	for regla in _reglas():
+		if len(cantidades) < regla.get('min_tratamientos', 0) or unidades < regla.get('min_unidades', 0):
+			continue
+		if regla['porcentaje'] > aplicado['porcentaje']:
+			aplicado = {'porcentaje': regla['porcentaje'], 'regla': regla['nombre']}
+
+	monto = (subtotal * aplicado['porcentaje'] / 100).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+	subtotal = subtotal.quantize(CENTAVOS)
+	return {
+		'lineas': lineas,
+		'subtotal': str(subtotal),
+		'descuento': dict(aplicado, monto=str(monto)),
+		'total': str(subtotal - monto),
+		'moneda': 'MXN',
+	}
+
+
+def cotizar_lote(cotizaciones):
+	"""Cotiza varias combinaciones con la misma tabla de precios.
+
+	Cada elemento es `{'items': [...], 'descuento': n}`; los inválidos devuelven
+	`{'error': mensaje}` en su posición sin afectar al resto.
+	"""
+	if not isinstance(cotizaciones, list) or not cotizaciones:
+		raise CotizacionInvalida('`cotizaciones` debe ser una lista no vacía.')
+	if len(cotizaciones) > MAX_COTIZACIONES:
+		raise CotizacionInvalida(f'Máximo {MAX_COTIZACIONES} cotizaciones por petición.')
+	precios = tabla_precios()
+	resultados = []
+	for datos in cotizaciones:
+		try:
+			if not isinstance(datos, dict):
+				raise CotizacionInvalida('Cada cotización debe ser un objeto con `items`.')
+			resultados.append(cotizar(datos.get('items'), datos.get('descuento', 0), precios=precios))
+		except CotizacionInvalida as exc:
+			resultados.append({'error': str(exc)})
+	return resultados
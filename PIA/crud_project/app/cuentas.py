@@ -0,0 +1,102 @@
+"""
+Alta y edición de cuentas (`User` + espejo `Usuario`).
+
+Es el único lugar que escribe `Usuario`; lo usan `signup`, `usuarios_crear` y
+`usuarios_editar`.
+
+Diseño:
+- La contraseña se hashea una sola vez (`make_password`) y el mismo hash se
+  guarda en `User.password` y en `Usuario.password`. Con PBKDF2 el hash es casi
+  todo el costo de un registro; antes se calculaba dos veces.
+- El usuario repetido lo detecta la base de datos (`auth_user.username` es
+  único): el `IntegrityError` del INSERT se traduce en `CuentaDuplicada`, sin
+  consulta previa ni carrera entre la comprobación y el INSERT.
+- El correo se comprueba con una consulta en `auth_user` (sin distinguir
+  mayúsculas): `auth_user.email` no es único y hay cuentas sin espejo
+  (`createsuperuser`, admin, cuentas que la migración 0010 no pudo enlazar),
+  así que `app_usuario.email` único no basta. Esa restricción sigue cubriendo
+  la carrera entre dos registros simultáneos con el mismo correo.
+- `User` y `Usuario` se escriben en la misma transacción: si el espejo falla
+  (correo repetido) tampoco queda el `User`.
+"""
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .models import Usuario
+
+
+class CuentaDuplicada(Exception):
+	"""El usuario o el correo ya existen. `campo` es 'username' o 'email'."""
+
+	def __init__(self, campo):
+		super().__init__(campo)
+		self.campo = campo
+
+
+def _campo_duplicado(exc):
+	# La primera línea nombra la columna o la restricción en SQLite
+	# ("UNIQUE constraint failed: app_usuario.email") y en PostgreSQL
+	# ('... unique constraint "app_usuario_email_key"'). Las siguientes
+	# (DETAIL en PostgreSQL) repiten los valores enviados, p. ej. un usuario
+	# que contiene "email", así que no se miran.
+	mensaje = str(exc).split('\n', 1)[0]
+	tabla = Usuario._meta.db_table
+	if f'{tabla}.email' in mensaje or f'{tabla}_email' in mensaje:
+		return 'email'
+	return 'username'
+
+
+def _correo_en_uso(email, excepto=None):
+	if not email:
+		return False
+	cuentas = User.objects.filter(email__iexact=email)
+	if excepto is not None:
+		cuentas = cuentas.exclude(pk=excepto.pk)
+	return cuentas.exists()
+
+
+def crear_cuenta(username, email, password, **campos):
+	"""Crea el `User` y su `Usuario` espejo con un solo hash de `password`.
+
+	`campos` son atributos extra de `User` (`is_staff`, `is_superuser`, ...).
+	Lanza `CuentaDuplicada` si el usuario o el correo ya existen.
+	"""
+	email = User.objects.normalize_email(email)
+	if _correo_en_uso(email):
+		raise CuentaDuplicada('email')
+	hash_password = make_password(password)
+	try:
+		with transaction.atomic():
+			user = User.objects.create(
+				username=username,
+				email=email,
+				password=hash_password,
+				**campos,
+			)
+			Usuario.objects.create(user=user, email=user.email or None, password=hash_password)
+	except IntegrityError as exc:
+		raise CuentaDuplicada(_campo_duplicado(exc))
+	return user
+
+
+def guardar_cuenta(user, password=None):
+	"""Guarda los cambios de `user` (y `password` si se da) y actualiza su espejo.
+
+	Lanza `CuentaDuplicada` si el nuevo usuario o correo ya existen.
+	"""
+	if _correo_en_uso(user.email, excepto=user):
+		raise CuentaDuplicada('email')
+	if password:
+		user.set_password(password)
+	try:
+		with transaction.atomic():
+			user.save()
+			datos = {'email': user.email or None, 'password': user.password}
+			if not Usuario.objects.filter(user=user).update(**datos):
+				# Cuentas creadas por otra vía (admin, createsuperuser) no tienen espejo aún.
+				Usuario.objects.create(user=user, **datos)
+	except IntegrityError as exc:
+		raise CuentaDuplicada(_campo_duplicado(exc))
+	return user
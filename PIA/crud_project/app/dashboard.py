@@ -0,0 +1,90 @@
+"""
+Resumen (contadores) del dashboard `listar`.
+
+Todos los contadores salen de una sola consulta: un `aggregate()` sobre
+`CitaDental` con `Count(..., filter=...)` por estatus y por rango de fechas,
+más subconsultas escalares para tratamientos y reservaciones pendientes.
+
+El resultado se cachea `RESUMEN_CACHE_TIMEOUT` segundos y se invalida desde
+`signals.py` cuando se guarda o elimina una cita, un tratamiento o una
+reservación. La invalidación se aplica al confirmar la transacción
+(`on_commit`): borrada antes, una petición concurrente podría recalcular el
+resumen sin el cambio y cachearlo otra vez.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, Q, Subquery
+from django.utils import timezone
+
+from .models import CitaDental, Reservacion, Tratamiento
+from .replicas import en_primaria
+
+RESUMEN_CACHE_TIMEOUT = 60
+
+_RESUMEN_KEY = 'app:dashboard:resumen'
+
+
+class _Conteo(Subquery):
+	"""`COUNT(*)` de otro queryset como subconsulta escalar.
+
+	Se marca como agregado para poder combinarla con los `Count` dentro de
+	`aggregate()`; al no estar correlacionada, la base de datos la evalúa una vez.
+	"""
+	template = '(SELECT COUNT(*) FROM (%(subquery)s) AS _conteo)'
+	contains_aggregate = True
+	output_field = IntegerField()
+
+
+def _calcular(hoy):
+	inicio_hoy = timezone.make_aware(datetime.combine(hoy, time.min))
+	inicio_semana = inicio_hoy - timedelta(days=hoy.weekday())
+	rango_hoy = Q(fecha_cita__gte=inicio_hoy, fecha_cita__lt=inicio_hoy + timedelta(days=1))
+	rango_semana = Q(fecha_cita__gte=inicio_semana, fecha_cita__lt=inicio_semana + timedelta(days=7))
+
+	conteos = {
+		'total_citas': Count('pk'),
+		'citas_hoy': Count('pk', filter=rango_hoy),
+		'citas_semana': Count('pk', filter=rango_semana),
+	}
+	for estatus, _ in CitaDental.ESTATUS_CHOICES:
+		conteos[f'estatus_{estatus}'] = Count('pk', filter=Q(estatus=estatus))
+	conteos['total_tratamientos'] = _Conteo(Tratamiento.objects.values('pk'))
+	conteos['reservaciones_pendientes'] = _Conteo(
+		Reservacion.objects.filter(estatus=Reservacion.ESTATUS_PENDIENTE).values('pk')
+	)
+	datos = CitaDental.objects.aggregate(**conteos)
+
+	por_estatus = {
+		estatus: datos.pop(f'estatus_{estatus}') for estatus, _ in CitaDental.ESTATUS_CHOICES
+	}
+	datos['por_estatus'] = por_estatus
+	datos['dia'] = hoy
+	return datos
+
+
+def resumen_dashboard():
+	"""Devuelve los contadores del dashboard (cacheados).
+
+	Claves: `total_citas`, `por_estatus` (dict estatus -> total), `citas_hoy`,
+	`citas_semana` (lunes a domingo), `total_tratamientos`,
+	`reservaciones_pendientes` y `dia` (fecha local del cálculo).
+	"""
+	hoy = timezone.localdate()
+	resumen = cache.get(_RESUMEN_KEY)
+	if resumen is None or resumen['dia'] != hoy:
+		with en_primaria():
+			resumen = _calcular(hoy)
+		cache.set(_RESUMEN_KEY, resumen, RESUMEN_CACHE_TIMEOUT)
+	return resumen
+
+
+def _borrar_resumen():
+	cache.delete(_RESUMEN_KEY)
+
+
+def invalidar_resumen(using=None, **kwargs):
+	"""Descarta el resumen cacheado al confirmar (conectable directamente a señales)."""
+	transaction.on_commit(_borrar_resumen, using=using)
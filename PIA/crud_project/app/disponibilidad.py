@@ -0,0 +1,143 @@
+"""
+Horarios libres para citas (`/api/disponibilidad/`).
+
+Cada día del horario de la clínica (`settings.HORARIO_CITAS`) se divide en
+franjas de una hora; una franja está ocupada si hay una cita no cancelada con
+ese `franja_hora`.
+
+Diseño:
+- Las horas ocupadas se guardan en cache por día (`app:disponibilidad:v{n}:{fecha}`).
+  Los días que faltan en cache se calculan juntos con una sola consulta de
+  rango sobre `franja_hora` (indexado), no una consulta por franja ni por día.
+- Al guardar o eliminar una cita (`signals.py`) se borra la cache de su día y,
+  si la cita cambió de fecha, la del día anterior. `invalidar_disponibilidad()`
+  descarta todos los días (la usan las operaciones masivas que no disparan
+  señales, como la importación).
+- Ambas invalidaciones se aplican al confirmar la transacción (`on_commit`),
+  igual que en `catalogo.py`: si se borrara antes, una consulta concurrente
+  podría volver a cachear el día sin la cita recién reservada y ofrecer esa
+  hora como libre hasta que expire la cache.
+- Las horas ya pasadas del día actual se descartan al responder, no en la
+  cache, para que la cache siga siendo válida durante el día.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CitaDental
+from .replicas import en_primaria
+
+DISPONIBILIDAD_CACHE_TIMEOUT = 300
+MAX_DIAS = 31
+# Días hacia adelante que se pueden consultar (y límite para no desbordar `date`).
+MAX_ANTICIPACION = 365
+
+_VERSION_KEY = 'app:disponibilidad:version'
+
+HORARIO_POR_DEFECTO = {dia: (9, 18) for dia in range(5)}
+
+
+def _horario(dia):
+	horario = getattr(settings, 'HORARIO_CITAS', HORARIO_POR_DEFECTO)
+	inicio, fin = horario.get(dia.weekday(), (0, 0))
+	return range(inicio, fin)
+
+
+def _inicio_del_dia(dia):
+	return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _clave(version, dia):
+	return f'app:disponibilidad:v{version}:{dia.isoformat()}'
+
+
+def _ocupadas(dias):
+	"""`{dia: set(horas ocupadas)}` para `dias`, usando la cache por día."""
+	version = cache.get_or_set(_VERSION_KEY, 1, None)
+	claves = {_clave(version, dia): dia for dia in dias}
+	en_cache = cache.get_many(list(claves))
+	ocupadas = {claves[clave]: set(horas) for clave, horas in en_cache.items()}
+
+	faltantes = [dia for dia in dias if dia not in ocupadas]
+	if faltantes:
+		calculadas = {dia: set() for dia in faltantes}
+		with en_primaria():
+			franjas = list(
+				CitaDental.objects
+				.filter(
+					franja_hora__gte=_inicio_del_dia(min(faltantes)),
+					franja_hora__lt=_inicio_del_dia(max(faltantes) + timedelta(days=1)),
+				)
+				.exclude(estatus=CitaDental.ESTATUS_CANCELADA)
+				.values_list('franja_hora', flat=True)
+			)
+		for franja in franjas:
+			local = timezone.localtime(franja)
+			if local.date() in calculadas:
+				calculadas[local.date()].add(local.hour)
+		cache.set_many(
+			{_clave(version, dia): sorted(horas) for dia, horas in calculadas.items()},
+			DISPONIBILIDAD_CACHE_TIMEOUT,
+		)
+		ocupadas.update(calculadas)
+	return ocupadas
+
+
+def disponibilidad(desde, hasta):
+	"""Franjas por día entre `desde` y `hasta` (fechas, inclusivas).
+
+	Devuelve `[{'fecha': 'YYYY-MM-DD', 'libres': ['09:00', ...], 'ocupadas': [...]}]`
+	solo para los días con horario de atención.
+	"""
+	dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+	dias = [dia for dia in dias if _horario(dia)]
+	ocupadas = _ocupadas(dias) if dias else {}
+	ahora = timezone.localtime()
+
+	resultado = []
+	for dia in dias:
+		libres, tomadas = [], []
+		for hora in _horario(dia):
+			texto = f'{hora:02d}:00'
+			if hora in ocupadas[dia]:
+				tomadas.append(texto)
+			elif dia > ahora.date() or (dia == ahora.date() and hora > ahora.hour):
+				libres.append(texto)
+		resultado.append({'fecha': dia.isoformat(), 'libres': libres, 'ocupadas': tomadas})
+	return resultado
+
+
+def invalidar_dia(franja):
+	"""Borra de la cache el día de `franja` (datetime o None)."""
+	if franja is None:
+		return
+	version = cache.get_or_set(_VERSION_KEY, 1, None)
+	cache.delete(_clave(version, timezone.localtime(franja).date()))
+
+
+def invalidar_cita(sender, instance, using=None, **kwargs):
+	"""Receptor de `post_save`/`post_delete` de `CitaDental` (al confirmar)."""
+	franjas = {instance.franja_hora, getattr(instance, '_franja_anterior', None)}
+
+	def invalidar():
+		for franja in franjas:
+			invalidar_dia(franja)
+
+	transaction.on_commit(invalidar, using=using)
+
+
+def _nueva_version():
+	try:
+		cache.incr(_VERSION_KEY)
+	except ValueError:
+		# La versión aún no existía: nada cacheado que invalidar.
+		pass
+
+
+def invalidar_disponibilidad(using=None, **kwargs):
+	"""Descarta la disponibilidad cacheada de todos los días (al confirmar)."""
+	transaction.on_commit(_nueva_version, using=using)
@@ -0,0 +1,226 @@
+"""
+Archivos estáticos versionados, precomprimidos y servidos por la app.
+
+Para despliegues de un solo nodo sin servidor web delante de los estáticos:
+
+    ESTATICOS_VERSIONADOS=1 python manage.py collectstatic --noinput
+
+Diseño:
+- `AlmacenEstaticos` (`STORAGES['staticfiles']`) es el
+  `ManifestStaticFilesStorage` de Django: copia a `STATIC_ROOT` cada archivo
+  con el hash de su contenido en el nombre (`style.3f2a9c1b.css`), reescribe
+  las `url()` del CSS y guarda el mapa en `staticfiles.json`; `{% static %}`
+  genera los nombres con hash.
+- Al terminar `collectstatic` crea junto a cada archivo de texto (CSS, JS,
+  SVG, ...) su variante `.gz` y, si está instalado el paquete `brotli`, `.br`.
+  Se comprimen una vez al desplegar, no en cada petición. Imágenes y videos ya
+  vienen comprimidos y se dejan igual.
+- `EstaticosMiddleware` sirve `STATIC_URL` desde `STATIC_ROOT` antes que el
+  resto de la pila (sin sesión, CSRF ni consultas). Al arrancar indexa los
+  archivos (ruta, tamaño, variantes, ETag) y por petición solo elige la
+  variante según `Accept-Encoding`. Los nombres con hash llevan
+  `Cache-Control: max-age=31536000, immutable`; el resto (p. ej. un nombre sin
+  hash pedido a mano) `ESTATICOS_MAX_AGE` segundos. Responde 304 con
+  `If-None-Match` y rangos de bytes (`Range`) para los videos.
+- Sin `ESTATICOS_VERSIONADOS` (desarrollo y pruebas) se usa el almacenamiento
+  normal y el middleware se desactiva (`runserver` sirve `app/statics`).
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+
+try:
+	import brotli
+except ImportError:  # Opcional: sin él solo se generan variantes gzip.
+	brotli = None
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.mjs', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ico')
+TAMANO_MINIMO = 512
+MAX_AGE_INMUTABLE = 365 * 24 * 3600
+MAX_AGE_POR_DEFECTO = 60
+TAMANO_BLOQUE = 64 * 1024
+
+# (sufijo del archivo, valor de Content-Encoding), en orden de preferencia.
+CODIFICACIONES = (('.br', 'br'), ('.gz', 'gzip'))
+
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _comprimir_gzip(datos):
+	# mtime=0: el mismo archivo produce siempre el mismo .gz.
+	return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def _comprimir_brotli(datos):
+	return brotli.compress(datos, quality=11)
+
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+	"""Estáticos con hash en el nombre y variantes `.gz`/`.br` precomprimidas."""
+
+	def post_process(self, paths, dry_run=False, **options):
+		yield from super().post_process(paths, dry_run=dry_run, **options)
+		if dry_run:
+			return
+		nombres = set(paths) | set(self.hashed_files.values())
+		for nombre in sorted(nombres):
+			for variante in self._comprimir(nombre):
+				yield nombre, variante, True
+
+	def _comprimir(self, nombre):
+		"""Escribe las variantes de `nombre` que ahorran al menos 5 %; devuelve sus nombres."""
+		if not nombre.lower().endswith(EXTENSIONES_COMPRIMIBLES) or not self.exists(nombre):
+			return []
+		with self.open(nombre) as archivo:
+			datos = archivo.read()
+		if len(datos) < TAMANO_MINIMO:
+			return []
+		compresores = [('.gz', _comprimir_gzip)]
+		if brotli is not None:
+			compresores.insert(0, ('.br', _comprimir_brotli))
+		creadas = []
+		for sufijo, comprimir in compresores:
+			comprimido = comprimir(datos)
+			if len(comprimido) > len(datos) * 0.95:
+				continue
+			with open(self.path(nombre + sufijo), 'wb') as salida:
+				salida.write(comprimido)
+			creadas.append(nombre + sufijo)
+		return creadas
+
+
+def _tipo(nombre):
+	tipo, _ = mimetypes.guess_type(nombre)
+	tipo = tipo or 'application/octet-stream'
+	if tipo.startswith('text/') or tipo in ('application/javascript', 'image/svg+xml', 'application/json'):
+		tipo += '; charset=utf-8'
+	return tipo
+
+
+def indexar(raiz, inmutables):
+	"""`{ruta_relativa: datos}` de los archivos de `raiz` (sin las variantes comprimidas).
+
+	`inmutables` son las rutas con hash del manifiesto.
+	"""
+	raiz = Path(raiz)
+	archivos = {}
+	for ruta in raiz.rglob('*'):
+		if not ruta.is_file() or ruta.suffix in ('.gz', '.br'):
+			continue
+		relativa = ruta.relative_to(raiz).as_posix()
+		stat = ruta.stat()
+		variantes = []
+		for sufijo, codificacion in CODIFICACIONES:
+			comprimida = ruta.with_name(ruta.name + sufijo)
+			if comprimida.is_file():
+				variantes.append((codificacion, str(comprimida), comprimida.stat().st_size))
+		archivos[relativa] = {
+			'ruta': str(ruta),
+			'tamano': stat.st_size,
+			'tipo': _tipo(relativa),
+			'etag': f'"{stat.st_size:x}-{int(stat.st_mtime):x}"',
+			'modificado': http_date(stat.st_mtime),
+			'variantes': variantes,
+			'inmutable': relativa in inmutables,
+		}
+	return archivos
+
+
+def _acepta(request, codificacion):
+	aceptadas = request.META.get('HTTP_ACCEPT_ENCODING', '')
+	return any(parte.split(';')[0].strip() == codificacion for parte in aceptadas.split(','))
+
+
+def _leer_rango(ruta, inicio, largo):
+	with open(ruta, 'rb') as archivo:
+		archivo.seek(inicio)
+		while largo > 0:
+			bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+			if not bloque:
+				break
+			largo -= len(bloque)
+			yield bloque
+
+
+class EstaticosMiddleware:
+	"""Sirve `STATIC_ROOT` en `STATIC_URL` con variantes comprimidas y cache larga."""
+
+	def __init__(self, get_response):
+		raiz = getattr(settings, 'STATIC_ROOT', None)
+		if not getattr(settings, 'ESTATICOS_VERSIONADOS', False) or not raiz or not os.path.isdir(raiz):
+			raise MiddlewareNotUsed
+		self.get_response = get_response
+		self.prefijo = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+		self.max_age = getattr(settings, 'ESTATICOS_MAX_AGE', MAX_AGE_POR_DEFECTO)
+		manifiesto = Path(raiz) / ManifestStaticFilesStorage.manifest_name
+		inmutables = set()
+		if manifiesto.is_file():
+			inmutables = set(json.loads(manifiesto.read_text(encoding='utf-8')).get('paths', {}).values())
+		self.archivos = indexar(raiz, inmutables)
+
+	def __call__(self, request):
+		if request.path_info.startswith(self.prefijo) and request.method in ('GET', 'HEAD'):
+			archivo = self.archivos.get(request.path_info[len(self.prefijo):])
+			if archivo is not None:
+				return self.servir(request, archivo)
+		return self.get_response(request)
+
+	def servir(self, request, archivo):
+		if archivo['inmutable']:
+			cache_control = f'public, max-age={MAX_AGE_INMUTABLE}, immutable'
+		else:
+			cache_control = f'public, max-age={self.max_age}'
+
+		if request.META.get('HTTP_IF_NONE_MATCH') == archivo['etag']:
+			response = HttpResponseNotModified()
+		else:
+			response = self._cuerpo(request, archivo)
+		response['Cache-Control'] = cache_control
+		response['ETag'] = archivo['etag']
+		response['Last-Modified'] = archivo['modificado']
+		if archivo['variantes']:
+			response['Vary'] = 'Accept-Encoding'
+		return response
+
+	def _cuerpo(self, request, archivo):
+		for codificacion, ruta, tamano in archivo['variantes']:
+			if _acepta(request, codificacion):
+				response = FileResponse(open(ruta, 'rb'), content_type=archivo['tipo'])
+				response['Content-Encoding'] = codificacion
+				response['Content-Length'] = str(tamano)
+				return response
+
+		tamano = archivo['tamano']
+		rango = _RANGO.match(request.META.get('HTTP_RANGE', '').strip())
+		if rango and any(rango.groups()):
+			desde, hasta = rango.groups()
+			if desde:
+				inicio, fin = int(desde), min(int(hasta), tamano - 1) if hasta else tamano - 1
+			else:
+				# `bytes=-N`: los últimos N bytes.
+				inicio, fin = max(tamano - int(hasta), 0), tamano - 1
+			if inicio > fin or inicio >= tamano:
+				response = HttpResponse(status=416)
+				response['Content-Range'] = f'bytes */{tamano}'
+				return response
+			largo = fin - inicio + 1
+			response = StreamingHttpResponse(
+				_leer_rango(archivo['ruta'], inicio, largo), status=206, content_type=archivo['tipo'],
+			)
+			response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+			response['Content-Length'] = str(largo)
+		else:
+			response = FileResponse(open(archivo['ruta'], 'rb'), content_type=archivo['tipo'])
+			response['Content-Length'] = str(tamano)
+		response['Accept-Ranges'] = 'bytes'
+		return response
@@ -0,0 +1,207 @@
+"""
+Exportación en streaming de citas y reservaciones a CSV o XLSX.
+
+La usan las vistas `citas_exportar` y `reservaciones_exportar`.
+
+Diseño:
+- Las filas salen de `.values_list(...).iterator(chunk_size=TAMANO_BLOQUE)`:
+  no se construyen instancias de modelo ni se guarda el resultado en la cache
+  del queryset (en Postgres además se usa un cursor del lado del servidor).
+- Los nombres de los tratamientos de cada cita se concatenan en SQL
+  (`GROUP_CONCAT` / `STRING_AGG`) en la misma consulta, en lugar de una consulta
+  o un prefetch por página.
+- Los generadores producen bloques de bytes para `StreamingHttpResponse`, así
+  que la memoria usada no depende del tamaño de la exportación.
+- El XLSX se escribe sin dependencias externas: un ZIP en modo streaming con
+  una sola hoja y celdas de texto en línea (`inlineStr`).
+- Nombres y teléfonos vienen del formulario público: el texto que empieza con
+  `=`, `+`, `-`, `@`, tabulador o retorno lleva un apóstrofo delante para que la
+  hoja de cálculo no lo evalúe como fórmula (inyección CSV).
+"""
+
+import csv
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import Aggregate, CharField
+from django.utils import timezone
+
+TAMANO_BLOQUE = 2000
+FILAS_POR_ESCRITURA = 500
+
+FORMATOS = {
+	'csv': 'text/csv; charset=utf-8',
+	'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+SEPARADOR_TRATAMIENTOS = ' | '
+
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Concatenar(Aggregate):
+	"""Concatena los valores del grupo separados por `SEPARADOR_TRATAMIENTOS`."""
+	function = 'GROUP_CONCAT'
+	template = "%(function)s(%(expressions)s, '" + SEPARADOR_TRATAMIENTOS + "')"
+	output_field = CharField()
+
+	def as_postgresql(self, compiler, connection, **extra_context):
+		return self.as_sql(compiler, connection, function='STRING_AGG', **extra_context)
+
+	def as_mysql(self, compiler, connection, **extra_context):
+		return self.as_sql(
+			compiler, connection,
+			template="%(function)s(%(expressions)s SEPARATOR '" + SEPARADOR_TRATAMIENTOS + "')",
+			**extra_context,
+		)
+
+
+def _fecha(valor):
+	return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M') if valor else ''
+
+
+# ---------------------------------------------------------------- filas
+
+ENCABEZADOS_CITAS = ['ID', 'Paciente', 'Fecha', 'Teléfono', 'Correo', 'Estatus', 'Tratamientos']
+ENCABEZADOS_RESERVACIONES = ['ID', 'Cliente', 'Fecha', 'Teléfono', 'Correo', 'Asistentes', 'Estatus', 'Creada']
+
+
+def filas_citas(qs):
+	"""Filas de `qs` (queryset de `CitaDental` ya filtrado), más recientes primero."""
+	filas = (
+		qs.order_by('-fecha_cita', '-id')
+		.annotate(nombres_tratamientos=_Concatenar('tratamientos__nombre'))
+		.values_list('id', 'nombre_paciente', 'fecha_cita', 'telefono', 'correo', 'estatus', 'nombres_tratamientos')
+		.iterator(chunk_size=TAMANO_BLOQUE)
+	)
+	for pk, nombre, fecha, telefono, correo, estatus, tratamientos in filas:
+		yield [pk, nombre, _fecha(fecha), telefono or '', correo or '', estatus, tratamientos or '']
+
+
+def filas_reservaciones(qs):
+	"""Filas de `qs` (queryset de `Reservacion`), más recientes primero."""
+	filas = (
+		qs.order_by('-fecha_reservacion', '-id')
+		.values_list('id', 'nombre_cliente', 'fecha_reservacion', 'telefono', 'correo', 'asistentes', 'estatus', 'created_at')
+		.iterator(chunk_size=TAMANO_BLOQUE)
+	)
+	for pk, nombre, fecha, telefono, correo, asistentes, estatus, creada in filas:
+		yield [pk, nombre, _fecha(fecha), telefono or '', correo or '', asistentes, estatus, _fecha(creada)]
+
+
+# -------------------------------------------------------------- escritores
+
+def _texto_seguro(valor):
+	# Texto que Excel/LibreOffice interpretarían como fórmula se exporta como literal.
+	if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+		return "'" + valor
+	return valor
+
+
+class _Eco:
+	# "Archivo" que devuelve lo escrito, para usar `csv.writer` sin buffer.
+	def write(self, valor):
+		return valor
+
+
+def generar_csv(encabezados, filas):
+	"""Genera el CSV (UTF-8 con BOM para Excel) en bloques de texto."""
+	escritor = csv.writer(_Eco())
+	yield '\ufeff' + escritor.writerow(encabezados)
+	bloque = []
+	for fila in filas:
+		bloque.append(escritor.writerow([_texto_seguro(valor) for valor in fila]))
+		if len(bloque) >= FILAS_POR_ESCRITURA:
+			yield ''.join(bloque)
+			bloque = []
+	if bloque:
+		yield ''.join(bloque)
+
+
+class _Salida:
+	# Destino no "seekable" para `zipfile`: acumula lo escrito hasta `vaciar()`.
+	def __init__(self):
+		self._partes = []
+
+	def write(self, datos):
+		self._partes.append(bytes(datos))
+		return len(datos)
+
+	def flush(self):
+		pass
+
+	def vaciar(self):
+		datos = b''.join(self._partes)
+		self._partes.clear()
+		return datos
+
+
+_XLSX_ESTATICOS = {
+	'[Content_Types].xml': (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+		'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+		'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+		'<Default Extension="xml" ContentType="application/xml"/>'
+		'<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+		'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+		'</Types>'
+	),
+	'_rels/.rels': (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+		'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+		'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+		'</Relationships>'
+	),
+	'xl/workbook.xml': (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+		'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+		'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+		'<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+	),
+	'xl/_rels/workbook.xml.rels': (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+		'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+		'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+		'</Relationships>'
+	),
+}
+
+
+def _celda(valor):
+	if isinstance(valor, int) and not isinstance(valor, bool):
+		return f'<c><v>{valor}</v></c>'
+	return f'<c t="inlineStr"><is><t>{escape(str(_texto_seguro(valor)))}</t></is></c>'
+
+
+def _fila_xml(valores):
+	return '<row>' + ''.join(_celda(v) for v in valores) + '</row>'
+
+
+def generar_xlsx(encabezados, filas, hoja='Datos'):
+	"""Genera un libro XLSX de una hoja en bloques de bytes."""
+	salida = _Salida()
+	with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+		for nombre, contenido in _XLSX_ESTATICOS.items():
+			libro.writestr(nombre, contenido.replace('{hoja}', escape(hoja)))
+		with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+			hoja_xml.write((
+				'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+				'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+				+ _fila_xml(encabezados)
+			).encode('utf-8'))
+			bloque = []
+			for fila in filas:
+				bloque.append(_fila_xml(fila))
+				if len(bloque) >= FILAS_POR_ESCRITURA:
+					hoja_xml.write(''.join(bloque).encode('utf-8'))
+					bloque = []
+					yield salida.vaciar()
+			hoja_xml.write((''.join(bloque) + '</sheetData></worksheet>').encode('utf-8'))
+	yield salida.vaciar()
+
+
+def generar(formato, encabezados, filas, hoja='Datos'):
+	"""Generador del archivo en `formato` ('csv' o 'xlsx')."""
+	if formato == 'xlsx':
+		return generar_xlsx(encabezados, filas, hoja=hoja)
+	return generar_csv(encabezados, filas)
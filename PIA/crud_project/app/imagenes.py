@@ -0,0 +1,160 @@
+"""
+Imágenes responsivas (WebP/AVIF a varios anchos) para la landing.
+
+`python manage.py imagenes` genera las derivadas en `img/derivadas/` dentro de
+`IMAGENES_DIR` (`app/statics`) y un índice `derivadas.json`. Las etiquetas de
+`app/templatetags/medios.py` las usan en `index.html`, `login.html`,
+`signup.html` y en la galería de `main.js`.
+
+Diseño:
+- Las derivadas se generan una vez (al desplegar, antes de `collectstatic`),
+  no por petición: quedan como estáticos normales y reciben hash, compresión y
+  cache larga igual que el resto (ver `app/estaticos.py`).
+- El índice guarda ancho/alto del original y las variantes por formato; la
+  plantilla no abre imágenes, solo lee el índice (una vez por proceso, se
+  relee si cambia el archivo).
+- Sin índice o sin derivadas de una imagen se usa el original: las plantillas
+  funcionan aunque no se haya corrido el comando.
+- Pillow es opcional (solo lo necesita el comando). AVIF requiere Pillow
+  >= 11.3 o el plugin `pillow-avif-plugin`; si no está, solo se genera WebP.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.templatetags.static import static
+
+try:
+	from PIL import Image
+except ImportError:  # Opcional: solo lo usa `manage.py imagenes`.
+	Image = None
+
+CARPETA_DERIVADAS = 'img/derivadas'
+NOMBRE_INDICE = 'derivadas.json'
+EXTENSIONES = ('.png', '.jpg', '.jpeg')
+ANCHOS_POR_DEFECTO = (480, 960, 1440)
+FORMATOS_POR_DEFECTO = ('avif', 'webp')
+TIPOS = {'avif': 'image/avif', 'webp': 'image/webp'}
+# Calidad por formato (AVIF rinde a calidad nominal más baja que WebP).
+CALIDADES = {'avif': 55, 'webp': 78}
+
+_lock = threading.Lock()
+_indice = {'clave': None, 'datos': {}}
+
+
+def directorio():
+	return Path(getattr(settings, 'IMAGENES_DIR', Path(settings.BASE_DIR) / 'app' / 'statics'))
+
+
+def ruta_indice():
+	return directorio() / CARPETA_DERIVADAS / NOMBRE_INDICE
+
+
+def indice():
+	"""Índice de derivadas `{original: {...}}`; `{}` si no se han generado."""
+	ruta = ruta_indice()
+	try:
+		clave = (ruta, os.stat(ruta).st_mtime_ns)
+	except OSError:
+		return {}
+	with _lock:
+		if _indice['clave'] != clave:
+			with open(ruta, encoding='utf-8') as archivo:
+				_indice['datos'] = json.load(archivo)
+			_indice['clave'] = clave
+		return _indice['datos']
+
+
+def datos_imagen(nombre):
+	"""`{'src', 'ancho', 'alto', 'fuentes': [{'tipo', 'srcset'}]}` de la imagen estática `nombre`.
+
+	`fuentes` va del formato preferido (AVIF) al menos preferido y está vacía si
+	no hay derivadas; `ancho`/`alto` son None si no se conocen.
+	"""
+	info = indice().get(nombre, {})
+	fuentes = []
+	for formato in FORMATOS_POR_DEFECTO:
+		variantes = info.get('variantes', {}).get(formato)
+		if variantes:
+			fuentes.append({
+				'tipo': TIPOS[formato],
+				'srcset': ', '.join(
+					f'{static(ruta)} {ancho}w'
+					for ancho, ruta in sorted(variantes.items(), key=lambda par: int(par[0]))
+				),
+			})
+	return {'src': static(nombre), 'ancho': info.get('ancho'), 'alto': info.get('alto'), 'fuentes': fuentes}
+
+
+def url_poster(nombre, ancho_maximo):
+	"""URL de la derivada WebP más ancha que no pase de `ancho_maximo` (o del original)."""
+	variantes = indice().get(nombre, {}).get('variantes', {}).get('webp', {})
+	anchos = [int(ancho) for ancho in variantes if int(ancho) <= ancho_maximo]
+	if not anchos:
+		return static(nombre)
+	return static(variantes[str(max(anchos))])
+
+
+def formatos_disponibles(formatos):
+	"""Los `formatos` que Pillow puede escribir (registra el plugin AVIF si existe)."""
+	if 'avif' in formatos:
+		try:
+			import pillow_avif  # noqa: F401  (registra el formato en Pillow < 11.3)
+		except ImportError:
+			pass
+	Image.init()
+	return [formato for formato in formatos if formato.upper() in Image.SAVE]
+
+
+def originales(base=None):
+	"""Rutas relativas (`img/...`) de las imágenes que admiten derivadas."""
+	base = base or directorio()
+	return sorted(
+		ruta.relative_to(base).as_posix()
+		for ruta in (base / 'img').iterdir()
+		if ruta.is_file() and ruta.suffix.lower() in EXTENSIONES
+	)
+
+
+def generar(nombres, anchos=ANCHOS_POR_DEFECTO, formatos=FORMATOS_POR_DEFECTO, forzar=False):
+	"""Genera las derivadas de `nombres` y actualiza el índice.
+
+	Devuelve `(creadas, omitidas)`. Una derivada más nueva que su original se
+	omite salvo con `forzar`. No amplía: solo anchos menores que el original
+	(o el ancho original si todos son mayores).
+	"""
+	base = directorio()
+	destino = base / CARPETA_DERIVADAS
+	destino.mkdir(parents=True, exist_ok=True)
+	datos = dict(indice())
+	creadas = omitidas = 0
+	for nombre in nombres:
+		origen = base / nombre
+		with Image.open(origen) as imagen:
+			imagen.load()
+			ancho_original, alto_original = imagen.size
+			if imagen.mode not in ('RGB', 'RGBA'):
+				imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+			medidas = [ancho for ancho in sorted(set(anchos)) if ancho < ancho_original] or [ancho_original]
+			variantes = {}
+			for formato in formatos:
+				variantes[formato] = {}
+				for ancho in medidas:
+					relativa = f'{CARPETA_DERIVADAS}/{Path(nombre).stem}-{ancho}.{formato}'
+					salida = base / relativa
+					variantes[formato][str(ancho)] = relativa
+					if not forzar and salida.exists() and salida.stat().st_mtime >= origen.stat().st_mtime:
+						omitidas += 1
+						continue
+					alto = round(alto_original * ancho / ancho_original)
+					reducida = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+					reducida.save(salida, formato.upper(), quality=CALIDADES[formato])
+					creadas += 1
+		datos[nombre] = {'ancho': ancho_original, 'alto': alto_original, 'variantes': variantes}
+
+	with open(ruta_indice(), 'w', encoding='utf-8') as archivo:
+		json.dump(datos, archivo, indent=2, sort_keys=True)
+	return creadas, omitidas
@@ -0,0 +1,362 @@
+"""
+Importación masiva de citas, tratamientos y reservaciones desde CSV o JSON.
+
+La usan el comando `python manage.py importar` y la vista `importar_datos`.
+
+Diseño:
+- El archivo se lee de forma incremental: CSV con `csv.DictReader`, JSON como
+  arreglo (`[{...}, {...}]`, decodificado objeto por objeto) o JSON Lines (un
+  objeto por línea). Nunca se carga el archivo completo en memoria.
+- Cada fila se valida en Python, incluidos los límites de cada columna
+  (`max_length`, rango de enteros, `max_digits`) para que un valor fuera de
+  rango rechace su fila y no el lote entero. Los campos en mayúsculas se
+  normalizan solos (`app/campos.py`); `franja_hora` y las claves de búsqueda
+  (`nombre_busqueda`, `telefono_busqueda`, `correo_busqueda`) se calculan aquí
+  con las funciones de `app/models.py`, porque `bulk_create` no llama a
+  `save()`.
+- Las filas válidas se insertan por lotes de `tamano_lote` con `bulk_create`,
+  y las relaciones M2M de las citas con un `bulk_create` sobre la tabla
+  intermedia. Cada lote va en su propia transacción.
+- Los errores se reportan por número de fila y la fila se omite; el resto del
+  archivo se sigue importando. Un archivo mal formado (JSON o CSV ilegible)
+  detiene la lectura con `ValueError`.
+- Al terminar se invalidan las caches del catálogo, del dashboard y de la
+  disponibilidad de horarios, ya que `bulk_create` no dispara `post_save`. Si
+  se usa la búsqueda FTS5, reconstruirla con `manage.py busqueda --reindexar`.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .campos import mayusculas
+from .catalogo import invalidar_catalogo
+from .dashboard import invalidar_resumen
+from .disponibilidad import invalidar_disponibilidad
+from .models import (
+	CitaDental, Reservacion, Tratamiento, franja_de, normalizar_busqueda, normalizar_correo,
+	normalizar_telefono,
+)
+
+TAMANO_LOTE = 1000
+MAX_ERRORES = 1000
+
+FORMATOS = ('csv', 'json')
+
+# Errores de un INSERT que afectan a filas concretas (no a la conexión).
+ERRORES_INSERCION = (IntegrityError, DataError, OverflowError)
+
+
+class ResultadoImportacion:
+	"""Totales de una importación y errores por fila (`[(fila, mensaje)]`)."""
+
+	def __init__(self):
+		self.creados = 0
+		self.omitidos = 0
+		self.errores = []
+
+	def error(self, fila, mensaje):
+		self.omitidos += 1
+		if len(self.errores) < MAX_ERRORES:
+			self.errores.append((fila, mensaje))
+
+	def a_dict(self):
+		return {
+			'creados': self.creados,
+			'omitidos': self.omitidos,
+			'errores': [{'fila': fila, 'error': mensaje} for fila, mensaje in self.errores],
+		}
+
+
+# ---------------------------------------------------------------- lectura
+
+def _filas_json(texto, tamano_bloque=64 * 1024):
+	# Decodifica un arreglo JSON o JSON Lines objeto por objeto, leyendo el
+	# archivo en bloques de `tamano_bloque` caracteres.
+	decoder = json.JSONDecoder()
+	buffer = ''
+	fin = False
+	while True:
+		buffer = buffer.lstrip(' \t\r\n,[]')
+		if buffer:
+			try:
+				objeto, pos = decoder.raw_decode(buffer)
+			except ValueError:
+				if fin:
+					raise ValueError('JSON inválido cerca de: %s' % buffer[:40])
+			else:
+				buffer = buffer[pos:]
+				yield objeto
+				continue
+		if fin:
+			return
+		bloque = texto.read(tamano_bloque)
+		fin = not bloque
+		buffer += bloque
+
+
+def leer_filas(archivo, formato):
+	"""Itera `(numero_fila, dict)` de un archivo de texto en `formato`."""
+	if formato == 'csv':
+		lector = csv.DictReader(archivo)
+		try:
+			for numero, fila in enumerate(lector, start=2):
+				yield numero, {(k or '').strip(): v for k, v in fila.items()}
+		except csv.Error as exc:
+			# CSV mal formado (p. ej. un campo mayor que `csv.field_size_limit()`):
+			# no se puede seguir leyendo; se reporta como los errores de JSON.
+			raise ValueError(f'CSV inválido cerca de la línea {lector.line_num}: {exc}')
+	elif formato == 'json':
+		for numero, fila in enumerate(_filas_json(archivo), start=1):
+			yield numero, fila
+	else:
+		raise ValueError(f'Formato no soportado: {formato}')
+
+
+def abrir_texto(archivo_binario):
+	"""Envuelve un archivo binario (p. ej. un `UploadedFile`) como texto UTF-8."""
+	return io.TextIOWrapper(archivo_binario, encoding='utf-8-sig', newline='')
+
+
+# ------------------------------------------------------- conversión de filas
+
+def _texto(fila, *claves):
+	for clave in claves:
+		valor = fila.get(clave)
+		if valor is not None and str(valor).strip() != '':
+			return str(valor).strip()
+	return None
+
+
+def _fecha(valor):
+	if valor is None:
+		raise ValueError('falta la fecha')
+	fecha = parse_datetime(valor)
+	if fecha is None:
+		dia = parse_date(valor)
+		if dia is None:
+			raise ValueError(f'fecha inválida: {valor}')
+		fecha = datetime.combine(dia, time.min)
+	if timezone.is_naive(fecha):
+		fecha = timezone.make_aware(fecha)
+	return fecha
+
+
+def _correo(valor):
+	if valor:
+		try:
+			validate_email(valor)
+		except ValidationError:
+			raise ValueError(f'correo inválido: {valor}')
+	return valor
+
+
+def _estatus(valor, modelo):
+	estatus = mayusculas(valor) or modelo.ESTATUS_PENDIENTE
+	if estatus not in dict(modelo.ESTATUS_CHOICES):
+		raise ValueError(f'estatus inválido: {valor}')
+	return estatus
+
+
+def _tratamiento(fila, contexto):
+	nombre = mayusculas(_texto(fila, 'nombre'))
+	if not nombre:
+		raise ValueError('falta el nombre')
+	try:
+		precio = Decimal(_texto(fila, 'precio') or '')
+	except InvalidOperation:
+		raise ValueError(f'precio inválido: {fila.get("precio")}')
+	# NaN/Infinity pasan `Decimal()` pero no se pueden comparar ni guardar.
+	if not precio.is_finite() or precio < 0:
+		raise ValueError(f'precio inválido: {fila.get("precio")}')
+	return Tratamiento(nombre=nombre, descripcion=_texto(fila, 'descripcion'), precio=precio), None
+
+
+def _cita(fila, contexto):
+	nombre = mayusculas(_texto(fila, 'nombre_paciente', 'nombre'))
+	if not nombre:
+		raise ValueError('falta el nombre del paciente')
+	fecha = _fecha(_texto(fila, 'fecha_cita', 'fecha'))
+	estatus = _estatus(_texto(fila, 'estatus'), CitaDental)
+
+	tratamientos = []
+	valor = fila.get('tratamientos') or ''
+	claves = valor if isinstance(valor, list) else str(valor).replace(';', '|').split('|')
+	for clave in claves:
+		clave = str(clave).strip()
+		if not clave:
+			continue
+		tratamiento_id = contexto['tratamientos'].get(clave.upper())
+		if tratamiento_id is None:
+			raise ValueError(f'tratamiento desconocido: {clave}')
+		if tratamiento_id not in tratamientos:
+			tratamientos.append(tratamiento_id)
+
+	telefono = _texto(fila, 'telefono')
+	correo = _correo(_texto(fila, 'correo'))
+	cita = CitaDental(
+		nombre_paciente=nombre,
+		nombre_busqueda=normalizar_busqueda(nombre),
+		fecha_cita=fecha,
+		franja_hora=franja_de(fecha),
+		telefono=telefono,
+		telefono_busqueda=normalizar_telefono(telefono),
+		correo=correo,
+		correo_busqueda=normalizar_correo(correo),
+		estatus=estatus,
+	)
+	return cita, tratamientos
+
+
+def _reservacion(fila, contexto):
+	nombre = _texto(fila, 'nombre_cliente', 'nombre')
+	if not nombre:
+		raise ValueError('falta el nombre del cliente')
+	try:
+		asistentes = int(_texto(fila, 'asistentes') or 0)
+	except ValueError:
+		raise ValueError(f'asistentes inválido: {fila.get("asistentes")}')
+	if asistentes < 0:
+		raise ValueError(f'asistentes inválido: {asistentes}')
+	telefono = _texto(fila, 'telefono')
+	correo = _correo(_texto(fila, 'correo'))
+	reservacion = Reservacion(
+		nombre_cliente=nombre,
+		nombre_busqueda=normalizar_busqueda(nombre),
+		fecha_reservacion=_fecha(_texto(fila, 'fecha_reservacion', 'fecha')),
+		telefono=telefono,
+		telefono_busqueda=normalizar_telefono(telefono),
+		correo=correo,
+		correo_busqueda=normalizar_correo(correo),
+		asistentes=asistentes,
+		estatus=_estatus(_texto(fila, 'estatus'), Reservacion),
+	)
+	return reservacion, None
+
+
+def _validar_campos(obj):
+	# Límites de cada columna (`max_length`, rango de enteros, `max_digits`):
+	# fuera de ellos el INSERT falla (PostgreSQL: DataError; SQLite:
+	# OverflowError) y con él todo el lote. Se rechaza solo la fila.
+	for campo in obj._meta.concrete_fields:
+		valor = getattr(obj, campo.attname)
+		if campo.primary_key or valor is None:
+			continue
+		try:
+			campo.run_validators(valor)
+		except ValidationError:
+			raise ValueError(f'{campo.name} fuera de rango: {str(valor)[:40]}')
+
+
+MODELOS = {
+	'citas': (CitaDental, _cita),
+	'tratamientos': (Tratamiento, _tratamiento),
+	'reservaciones': (Reservacion, _reservacion),
+}
+
+
+# --------------------------------------------------------------- inserción
+
+def _franjas_ocupadas(lote, vistas):
+	# Descarta citas activas cuya franja ya está ocupada en la base de datos o
+	# en una fila anterior del mismo archivo (una consulta por lote).
+	activas = [(n, c) for n, c, _ in lote if c.estatus != CitaDental.ESTATUS_CANCELADA]
+	ocupadas = set(
+		CitaDental.objects.filter(franja_hora__in=[c.franja_hora for _, c in activas])
+		.exclude(estatus=CitaDental.ESTATUS_CANCELADA)
+		.values_list('franja_hora', flat=True)
+	)
+	rechazadas = set()
+	for numero, cita in activas:
+		if cita.franja_hora in ocupadas or cita.franja_hora in vistas:
+			rechazadas.add(numero)
+		else:
+			vistas.add(cita.franja_hora)
+	return rechazadas
+
+
+def _insertar(modelo, lote):
+	objetos = modelo.objects.bulk_create([obj for _, obj, _ in lote])
+	if modelo is CitaDental:
+		Relacion = CitaDental.tratamientos.through
+		Relacion.objects.bulk_create(
+			Relacion(citadental_id=cita.pk, tratamiento_id=tratamiento_id)
+			for cita, (_, _, tratamientos) in zip(objetos, lote)
+			for tratamiento_id in tratamientos
+		)
+	return len(objetos)
+
+
+def _guardar_lote(modelo, lote, resultado, vistas):
+	if modelo is CitaDental:
+		rechazadas = _franjas_ocupadas(lote, vistas)
+		for numero in sorted(rechazadas):
+			resultado.error(numero, 'ya existe una cita activa en esa hora')
+		lote = [item for item in lote if item[0] not in rechazadas]
+	if not lote:
+		return
+	try:
+		with transaction.atomic():
+			resultado.creados += _insertar(modelo, lote)
+	except ERRORES_INSERCION:
+		# Otro proceso ocupó alguna franja entre la validación y el insert, o
+		# un valor que la validación no cubre fue rechazado: reintentar fila
+		# por fila para reportar solo las que fallan.
+		for item in lote:
+			try:
+				with transaction.atomic():
+					resultado.creados += _insertar(modelo, [item])
+			except ERRORES_INSERCION as exc:
+				resultado.error(item[0], f'no se pudo guardar: {exc}')
+
+
+def importar(nombre_modelo, filas, tamano_lote=TAMANO_LOTE):
+	"""Importa `filas` (iterable de `(numero, dict)`) como `nombre_modelo`.
+
+	`nombre_modelo` es una clave de `MODELOS`. Devuelve un `ResultadoImportacion`.
+	"""
+	modelo, convertir = MODELOS[nombre_modelo]
+	contexto = {}
+	if modelo is CitaDental:
+		# Los tratamientos se pueden referenciar por id o por nombre.
+		contexto['tratamientos'] = {}
+		for pk, nombre in Tratamiento.objects.values_list('pk', 'nombre'):
+			contexto['tratamientos'][str(pk)] = pk
+			contexto['tratamientos'].setdefault(mayusculas(nombre), pk)
+
+	resultado = ResultadoImportacion()
+	vistas = set()
+	lote = []
+	try:
+		for numero, fila in filas:
+			if not isinstance(fila, dict):
+				resultado.error(numero, 'la fila no es un objeto')
+				continue
+			try:
+				obj, extra = convertir(fila, contexto)
+				_validar_campos(obj)
+			except ValueError as exc:
+				resultado.error(numero, str(exc))
+				continue
+			lote.append((numero, obj, extra))
+			if len(lote) >= tamano_lote:
+				_guardar_lote(modelo, lote, resultado, vistas)
+				lote = []
+		if lote:
+			_guardar_lote(modelo, lote, resultado, vistas)
+	finally:
+		if resultado.creados:
+			invalidar_resumen()
+			if modelo is Tratamiento:
+				invalidar_catalogo()
+			elif modelo is CitaDental:
+				invalidar_disponibilidad()
+	return resultado
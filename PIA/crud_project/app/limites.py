@@ -0,0 +1,168 @@
+"""
+Límite de intentos por ventana deslizante (login y registro).
+
+Lo usan `login_view` y `signup` antes de `authenticate`/`crear_cuenta`, así que
+un intento rechazado no calcula ningún hash de contraseña. Los contadores se
+exponen en `/api/metricas/` (clave `limites`).
+
+Diseño:
+- Ventana deslizante aproximada con dos contadores por clave (ventana actual y
+  anterior): `estimado = anterior * fracción_restante + actual`. Memoria
+  constante por clave y sin guardar marcas de tiempo de cada intento.
+- Reglas en `settings.LIMITES_REGLAS`: `{regla: (intentos, segundos)}`, p. ej.
+  `login_ip` y `login_usuario`. La clave es la IP (`REMOTE_ADDR`) o el nombre
+  de usuario en minúsculas.
+- En memoria del proceso (por defecto): un `OrderedDict` LRU de hasta
+  `LIMITES_MAX_CLAVES` claves; al llenarse se desaloja la menos reciente, así
+  un ataque con miles de usuarios/IP distintos no hace crecer la memoria.
+- Compartido (`LIMITES_COMPARTIDOS = True`): los contadores viven en la cache
+  de Django (una clave por ventana con expiración), útil con varios procesos
+  si la cache es compartida (Redis, Memcached).
+- Un intento rechazado no suma al contador: quien sigue intentando no alarga
+  su bloqueo más allá de la ventana.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+REGLAS_POR_DEFECTO = {
+	'login_ip': (20, 300),
+	'login_usuario': (5, 300),
+	'signup_ip': (10, 3600),
+	'signup_usuario': (5, 3600),
+}
+MAX_CLAVES_POR_DEFECTO = 10000
+MAX_LARGO_CLAVE = 150
+
+
+def ip_cliente(request):
+	"""IP del cliente según `REMOTE_ADDR` (configurar el proxy para que la ponga)."""
+	return request.META.get('REMOTE_ADDR') or 'desconocida'
+
+
+class Limitador:
+	"""Contadores por `(regla, clave)` con ventana deslizante; seguro entre hilos."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._ventanas = OrderedDict()
+		self._estadisticas = {}
+
+	def _regla(self, regla):
+		return getattr(settings, 'LIMITES_REGLAS', REGLAS_POR_DEFECTO)[regla]
+
+	def _contar(self, regla, resultado):
+		estadisticas = self._estadisticas.setdefault(regla, {'permitidos': 0, 'rechazados': 0, 'desalojadas': 0})
+		estadisticas[resultado] += 1
+
+	def permitir(self, regla, clave, ahora=None):
+		"""Registra un intento. Devuelve `None` si se permite o los segundos a esperar."""
+		if not getattr(settings, 'LIMITES_ACTIVOS', True):
+			return None
+		intentos, segundos = self._regla(regla)
+		ahora = time.time() if ahora is None else ahora
+		clave = str(clave)[:MAX_LARGO_CLAVE]
+		if getattr(settings, 'LIMITES_COMPARTIDOS', False):
+			espera = self._permitir_cache(regla, clave, intentos, segundos, ahora)
+		else:
+			espera = self._permitir_memoria(regla, clave, intentos, segundos, ahora)
+		with self._lock:
+			self._contar(regla, 'permitidos' if espera is None else 'rechazados')
+		return espera
+
+	@staticmethod
+	def _estimar(anterior, actual, segundos, ahora):
+		fraccion = 1 - (ahora % segundos) / segundos
+		return anterior * fraccion + actual
+
+	@staticmethod
+	def _espera(segundos, ahora):
+		# Cota superior: al terminar la ventana actual el anterior pesa a lo más
+		# lo que pesa hoy el actual, que ya no alcanza el límite por sí solo.
+		return max(1, math.ceil(segundos - ahora % segundos))
+
+	def _permitir_memoria(self, regla, clave, intentos, segundos, ahora):
+		ventana = int(ahora // segundos)
+		with self._lock:
+			datos = self._ventanas.get((regla, clave))
+			if datos is None:
+				datos = [ventana, 0, 0]
+			elif datos[0] != ventana:
+				datos[1] = datos[2] if datos[0] == ventana - 1 else 0
+				datos[2] = 0
+				datos[0] = ventana
+			if self._estimar(datos[1], datos[2], segundos, ahora) >= intentos:
+				return self._espera(segundos, ahora)
+			datos[2] += 1
+			self._ventanas[(regla, clave)] = datos
+			self._ventanas.move_to_end((regla, clave))
+			maximo = getattr(settings, 'LIMITES_MAX_CLAVES', MAX_CLAVES_POR_DEFECTO)
+			while len(self._ventanas) > maximo:
+				(regla_desalojada, _), _ = self._ventanas.popitem(last=False)
+				self._contar(regla_desalojada, 'desalojadas')
+		return None
+
+	@staticmethod
+	def _clave_cache(regla, clave, ventana):
+		resumen = hashlib.sha1(clave.encode('utf-8')).hexdigest()
+		return f'app:limite:{regla}:{resumen}:{ventana}'
+
+	def _permitir_cache(self, regla, clave, intentos, segundos, ahora):
+		ventana = int(ahora // segundos)
+		actual_key = self._clave_cache(regla, clave, ventana)
+		anterior_key = self._clave_cache(regla, clave, ventana - 1)
+		valores = cache.get_many([actual_key, anterior_key])
+		if self._estimar(valores.get(anterior_key, 0), valores.get(actual_key, 0), segundos, ahora) >= intentos:
+			return self._espera(segundos, ahora)
+		cache.add(actual_key, 0, segundos * 2)
+		try:
+			cache.incr(actual_key)
+		except ValueError:
+			# Expiró entre `add` e `incr`.
+			cache.set(actual_key, 1, segundos * 2)
+		return None
+
+	def olvidar(self, regla, clave):
+		"""Borra los intentos de `clave` (p. ej. tras un login correcto)."""
+		clave = str(clave)[:MAX_LARGO_CLAVE]
+		if getattr(settings, 'LIMITES_COMPARTIDOS', False):
+			_, segundos = self._regla(regla)
+			ventana = int(time.time() // segundos)
+			cache.delete_many([self._clave_cache(regla, clave, v) for v in (ventana, ventana - 1)])
+			return
+		with self._lock:
+			self._ventanas.pop((regla, clave), None)
+
+	def resumen(self):
+		"""`{'claves': n, 'max_claves': n, 'reglas': {regla: {...}}}` para `/api/metricas/`."""
+		reglas = getattr(settings, 'LIMITES_REGLAS', REGLAS_POR_DEFECTO)
+		with self._lock:
+			return {
+				'activos': getattr(settings, 'LIMITES_ACTIVOS', True),
+				'compartidos': getattr(settings, 'LIMITES_COMPARTIDOS', False),
+				'claves': len(self._ventanas),
+				'max_claves': getattr(settings, 'LIMITES_MAX_CLAVES', MAX_CLAVES_POR_DEFECTO),
+				'reglas': {
+					regla: dict(
+						intentos=intentos,
+						segundos=segundos,
+						**self._estadisticas.get(regla, {'permitidos': 0, 'rechazados': 0, 'desalojadas': 0}),
+					)
+					for regla, (intentos, segundos) in sorted(reglas.items())
+				},
+			}
+
+	def reiniciar(self):
+		with self._lock:
+			self._ventanas.clear()
+			self._estadisticas.clear()
+
+
+# Limitador del proceso actual.
+limitador = Limitador()
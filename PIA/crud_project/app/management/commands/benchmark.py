@@ -0,0 +1,230 @@
+"""
+Comando `python manage.py benchmark`.
+
+Mide el rendimiento de las rutas más usadas contra una base de datos de
+prueba desechable (la misma que usa `manage.py test`, creada a partir de
+`DATABASES['default']`: SQLite o Postgres según la configuración).
+
+Pasos:
+1. Crea la base de prueba y la llena con datos sintéticos a la escala pedida
+   (`--citas`, `--tratamientos`, `--usuarios`) usando `bulk_create` por lotes.
+2. Ejecuta cada escenario `--iteraciones` veces con el cliente de pruebas de
+   Django (sin red) y mide latencia (p50/p95/p99/max) y throughput.
+3. Imprime/guarda el resultado en JSON. Con `--comparar anterior.json` marca
+   los escenarios cuyo p95 empeoró más de `--tolerancia` % y termina con error.
+
+Escenarios: solicitar_cita, citas_listar, tratamientos_json, listar y login.
+"""
+
+import json
+import platform
+import random
+import time
+from datetime import timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+	CaptureQueriesContext,
+	override_settings,
+	setup_test_environment,
+	teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import CitaDental, Tratamiento, franja_de, normalizar_busqueda
+from app.roles import id_grupo
+
+LOTE = 5000
+PASSWORD = 'benchmark-123'
+
+
+def _percentil(valores, p):
+	if not valores:
+		return 0.0
+	ordenados = sorted(valores)
+	indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+	return ordenados[indice]
+
+
+class Command(BaseCommand):
+	help = 'Benchmark de las rutas críticas sobre una base de prueba con datos sintéticos (salida JSON).'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--citas', type=int, default=10000)
+		parser.add_argument('--tratamientos', type=int, default=200)
+		parser.add_argument('--usuarios', type=int, default=2000)
+		parser.add_argument('--iteraciones', type=int, default=200)
+		parser.add_argument('--iteraciones-login', type=int, default=20,
+			help='Login usa PBKDF2 y es mucho más lento; se mide con menos iteraciones.')
+		parser.add_argument('--semilla', type=int, default=1234)
+		parser.add_argument('--salida', help='Archivo donde guardar el JSON de resultados.')
+		parser.add_argument('--comparar', help='JSON de una corrida anterior para detectar regresiones.')
+		parser.add_argument('--tolerancia', type=float, default=20.0,
+			help='Porcentaje de aumento de p95 permitido al comparar (por defecto 20).')
+		parser.add_argument('--keepdb', action='store_true', help='Conservar la base de prueba entre corridas.')
+
+	def handle(self, *args, **options):
+		setup_test_environment()
+		nombre_original = connection.settings_dict['NAME']
+		connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+		try:
+			random.seed(options['semilla'])
+			cache.clear()
+			inicio = time.perf_counter()
+			self._sembrar(options)
+			segundos_siembra = time.perf_counter() - inicio
+			# Sin límite de intentos: el escenario `login` repite el mismo usuario.
+			with override_settings(LIMITES_ACTIVOS=False):
+				resultados = self._medir(options)
+		finally:
+			connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+			teardown_test_environment()
+
+		reporte = {
+			'fecha': timezone.now().isoformat(),
+			'backend': connection.vendor,
+			'django': django.get_version(),
+			'python': platform.python_version(),
+			'escala': {k: options[k] for k in ('citas', 'tratamientos', 'usuarios', 'iteraciones')},
+			'siembra_s': round(segundos_siembra, 2),
+			'escenarios': resultados,
+		}
+		texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+		if options['salida']:
+			with open(options['salida'], 'w', encoding='utf-8') as f:
+				f.write(texto)
+		self.stdout.write(texto)
+
+		if options['comparar']:
+			self._comparar(options['comparar'], resultados, options['tolerancia'])
+
+	# ------------------------------------------------------------------ datos
+
+	def _sembrar(self, options):
+		tratamientos = Tratamiento.objects.bulk_create(
+			Tratamiento(nombre=f'TRATAMIENTO {i}', descripcion=f'DESCRIPCION {i}', precio=100 + i)
+			for i in range(options['tratamientos'])
+		)
+		ids_tratamientos = [t.pk for t in tratamientos]
+
+		# Citas en el pasado, una por hora (la franja activa es única).
+		ahora = timezone.now().replace(minute=0, second=0, microsecond=0)
+		estatus = [c for c, _ in CitaDental.ESTATUS_CHOICES]
+		Relacion = CitaDental.tratamientos.through
+		total = options['citas']
+		for desde in range(0, total, LOTE):
+			citas = []
+			for i in range(desde, min(desde + LOTE, total)):
+				fecha = ahora - timedelta(hours=i + 1)
+				citas.append(CitaDental(
+					nombre_paciente=f'PACIENTE {i}',
+					nombre_busqueda=normalizar_busqueda(f'PACIENTE {i}'),
+					fecha_cita=fecha,
+					franja_hora=franja_de(fecha),
+					telefono='81%08d' % i,
+					telefono_busqueda='81%08d' % i,
+					estatus=random.choice(estatus),
+				))
+			citas = CitaDental.objects.bulk_create(citas)
+			if ids_tratamientos:
+				Relacion.objects.bulk_create(
+					Relacion(citadental_id=c.pk, tratamiento_id=t)
+					for c in citas
+					for t in random.sample(ids_tratamientos, min(2, len(ids_tratamientos)))
+				)
+
+		hash_password = make_password(PASSWORD)
+		usuarios = User.objects.bulk_create(
+			User(username=f'usuario{i}', password=hash_password) for i in range(options['usuarios'])
+		)
+		empleado = id_grupo('Empleado')
+		User.groups.through.objects.bulk_create(
+			User.groups.through(user_id=u.pk, group_id=empleado) for u in usuarios
+		)
+		self.admin = User.objects.create_superuser('benchmark', password=PASSWORD)
+
+	# -------------------------------------------------------------- escenarios
+
+	def _medir(self, options):
+		iteraciones = options['iteraciones']
+		anonimo = Client()
+		personal = Client()
+		personal.force_login(self.admin)
+		ids = list(Tratamiento.objects.values_list('pk', flat=True)[:2])
+		manana = (timezone.localtime() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+		contador = iter(range(10 ** 9))
+
+		def solicitar():
+			fecha = manana + timedelta(hours=next(contador))
+			return anonimo.post(reverse('solicitar_cita'), {
+				'nombre': 'Paciente benchmark',
+				'telefono': '8112345678',
+				'tratamiento[]': ids,
+				'fecha-cita': fecha.isoformat(),
+			})
+
+		def login():
+			return Client().post(reverse('login'), {'username': 'benchmark', 'password': PASSWORD})
+
+		escenarios = [
+			('solicitar_cita', solicitar, iteraciones),
+			('citas_listar', lambda: personal.get(reverse('citas_listar')), iteraciones),
+			('tratamientos_json', lambda: anonimo.get(reverse('api_tratamientos')), iteraciones),
+			('listar', lambda: personal.get(reverse('listar')), iteraciones),
+			('login', login, options['iteraciones_login']),
+		]
+		resultados = {}
+		for nombre, peticion, n in escenarios:
+			resultados[nombre] = self._medir_escenario(nombre, peticion, n)
+		return resultados
+
+	def _medir_escenario(self, nombre, peticion, iteraciones):
+		# Una petición de calentamiento que además cuenta las consultas SQL.
+		with CaptureQueriesContext(connection) as ctx:
+			response = peticion()
+		# `captured_queries` es una vista de `connection.queries_log`, que las
+		# peticiones siguientes rotan: se cuenta antes de medir.
+		consultas = len(ctx.captured_queries)
+		if response.status_code >= 400:
+			raise CommandError(f'{nombre}: respuesta {response.status_code}')
+
+		latencias = []
+		inicio = time.perf_counter()
+		for _ in range(iteraciones):
+			t0 = time.perf_counter()
+			peticion()
+			latencias.append((time.perf_counter() - t0) * 1000)
+		total = time.perf_counter() - inicio
+		return {
+			'iteraciones': iteraciones,
+			'consultas': consultas,
+			'rps': round(iteraciones / total, 1) if total else 0.0,
+			'p50_ms': round(_percentil(latencias, 50), 2),
+			'p95_ms': round(_percentil(latencias, 95), 2),
+			'p99_ms': round(_percentil(latencias, 99), 2),
+			'max_ms': round(max(latencias, default=0.0), 2),
+		}
+
+	# ------------------------------------------------------------ comparación
+
+	def _comparar(self, ruta, resultados, tolerancia):
+		with open(ruta, encoding='utf-8') as f:
+			anterior = json.load(f).get('escenarios', {})
+		regresiones = []
+		for nombre, actual in resultados.items():
+			previo = anterior.get(nombre)
+			if not previo or not previo.get('p95_ms'):
+				continue
+			cambio = (actual['p95_ms'] - previo['p95_ms']) / previo['p95_ms'] * 100
+			self.stderr.write(f'{nombre}: p95 {previo["p95_ms"]} -> {actual["p95_ms"]} ms ({cambio:+.1f} %)')
+			if cambio > tolerancia:
+				regresiones.append(nombre)
+		if regresiones:
+			raise CommandError('Regresión en: ' + ', '.join(regresiones))
@@ -0,0 +1,39 @@
+"""
+Comando `python manage.py busqueda`.
+
+- `busqueda <texto>`: ejecuta una búsqueda de pacientes (ver `app/busqueda.py`)
+  e imprime los resultados.
+- `busqueda --reindexar`: reconstruye la tabla FTS5 `app_busqueda_fts` (solo
+  SQLite). Necesario tras operaciones masivas que no disparan señales.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.busqueda import MIN_CARACTERES, buscar, reindexar_fts
+
+
+class Command(BaseCommand):
+	help = 'Busca pacientes en citas y reservaciones o reconstruye el índice FTS5.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('termino', nargs='?', help='Nombre, teléfono o correo a buscar.')
+		parser.add_argument('--reindexar', action='store_true', help='Reconstruye la tabla FTS5.')
+		parser.add_argument('--lote', type=int, default=2000, help='Filas por inserción al reindexar.')
+
+	def handle(self, *args, **options):
+		if options['reindexar']:
+			total = reindexar_fts(tamano_lote=options['lote'])
+			self.stdout.write(self.style.SUCCESS(f'Índice FTS reconstruido: {total} filas.'))
+			if not options['termino']:
+				return
+		if not options['termino']:
+			raise CommandError('Indique un texto a buscar o use --reindexar.')
+
+		resultado = buscar(options['termino'])
+		if resultado is None:
+			raise CommandError(f'Escriba al menos {MIN_CARACTERES} caracteres.')
+		self.stdout.write(f"Tipo de búsqueda: {resultado['tipo']}")
+		for cita in resultado['citas']:
+			self.stdout.write(f'  cita #{cita.pk}: {cita}')
+		for reservacion in resultado['reservaciones']:
+			self.stdout.write(f'  reservación #{reservacion.pk}: {reservacion}')
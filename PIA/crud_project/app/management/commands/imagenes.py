@@ -0,0 +1,68 @@
+"""
+Comando `python manage.py imagenes [img/nombre.png ...]`.
+
+Genera derivadas WebP/AVIF a varios anchos de las imágenes de
+`app/statics/img` (por defecto todas las PNG/JPG) en `img/derivadas/` y
+actualiza `derivadas.json` (ver `app/imagenes.py`). Correrlo al cambiar una
+imagen y antes de `collectstatic`:
+
+    python manage.py imagenes --anchos 480,960,1440 --formatos avif,webp
+
+Solo regenera las derivadas más viejas que su original (`--forzar` para todas).
+Requiere Pillow; sin soporte AVIF genera solo WebP.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import imagenes
+
+
+def _lista(valor):
+	return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+class Command(BaseCommand):
+	help = 'Genera derivadas WebP/AVIF a varios anchos de las imágenes estáticas.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('nombres', nargs='*', help='Rutas relativas a app/statics (p. ej. img/equipo1.png).')
+		parser.add_argument(
+			'--anchos', default=','.join(str(a) for a in getattr(settings, 'IMAGENES_ANCHOS', imagenes.ANCHOS_POR_DEFECTO)),
+			help='Anchos en píxeles separados por comas.',
+		)
+		parser.add_argument(
+			'--formatos', default=','.join(imagenes.FORMATOS_POR_DEFECTO),
+			help='Formatos separados por comas (avif, webp).',
+		)
+		parser.add_argument('--forzar', action='store_true', help='Regenera aunque la derivada esté al día.')
+
+	def handle(self, *args, **options):
+		if imagenes.Image is None:
+			raise CommandError('Se requiere Pillow: pip install Pillow')
+		try:
+			anchos = [int(ancho) for ancho in _lista(options['anchos'])]
+		except ValueError:
+			raise CommandError('--anchos debe ser una lista de enteros separados por comas.')
+		if not anchos or min(anchos) < 1:
+			raise CommandError('--anchos debe tener al menos un ancho mayor que 0.')
+		pedidos = _lista(options['formatos'])
+		desconocidos = set(pedidos) - set(imagenes.TIPOS)
+		if desconocidos:
+			raise CommandError(f"Formato no soportado: {', '.join(sorted(desconocidos))}.")
+		formatos = imagenes.formatos_disponibles(pedidos)
+		for formato in set(pedidos) - set(formatos):
+			self.stderr.write(self.style.WARNING(f'Pillow no puede escribir {formato.upper()}; se omite.'))
+		if not formatos:
+			raise CommandError('Ningún formato disponible.')
+
+		disponibles = imagenes.originales()
+		nombres = options['nombres'] or disponibles
+		faltantes = set(nombres) - set(disponibles)
+		if faltantes:
+			raise CommandError(f"No existen en {imagenes.directorio() / 'img'}: {', '.join(sorted(faltantes))}")
+
+		creadas, omitidas = imagenes.generar(nombres, anchos, formatos, options['forzar'])
+		self.stdout.write(self.style.SUCCESS(
+			f'{len(nombres)} imágenes: {creadas} derivadas generadas, {omitidas} al día.'
+		))
@@ -0,0 +1,49 @@
+"""
+Comando `python manage.py importar <modelo> <archivo>`.
+
+Importa citas, tratamientos o reservaciones desde CSV, JSON o JSON Lines con
+inserciones por lotes (ver `app/importacion.py`). Imprime en JSON los totales
+y los errores por fila.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importacion import FORMATOS, MODELOS, TAMANO_LOTE, importar, leer_filas
+
+
+class Command(BaseCommand):
+	help = 'Importa citas, tratamientos o reservaciones desde un archivo CSV/JSON (inserción por lotes).'
+
+	def add_arguments(self, parser):
+		parser.add_argument('modelo', choices=sorted(MODELOS))
+		parser.add_argument('archivo', help="Ruta del archivo o '-' para leer de stdin.")
+		parser.add_argument('--formato', choices=FORMATOS,
+			help='Por defecto se deduce de la extensión (.csv, .json, .jsonl).')
+		parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por bulk_create.')
+
+	def handle(self, *args, **options):
+		ruta = options['archivo']
+		formato = options['formato']
+		if formato is None:
+			sufijo = Path(ruta).suffix.lower()
+			formato = 'csv' if sufijo == '.csv' else 'json' if sufijo in ('.json', '.jsonl', '.ndjson') else None
+			if formato is None:
+				raise CommandError('No se pudo deducir el formato; use --formato.')
+
+		try:
+			archivo = sys.stdin if ruta == '-' else open(ruta, encoding='utf-8-sig', newline='')
+		except OSError as exc:
+			raise CommandError(f'No se pudo abrir {ruta}: {exc}')
+		try:
+			resultado = importar(options['modelo'], leer_filas(archivo, formato), tamano_lote=options['lote'])
+		except ValueError as exc:
+			raise CommandError(str(exc))
+		finally:
+			if archivo is not sys.stdin:
+				archivo.close()
+
+		self.stdout.write(json.dumps(resultado.a_dict(), indent=2, ensure_ascii=False))
@@ -0,0 +1,76 @@
+"""
+Comando `python manage.py limpiar_sesiones`.
+
+Borra las sesiones vencidas de `django_session` por lotes. Pensado para
+ejecutarse periódicamente (p. ej. cron cada hora):
+
+    0 * * * * python manage.py limpiar_sesiones --lote 1000 --pausa 0.1
+
+Diseño:
+- Igual que `clearsessions` pero sin un único `DELETE` de todas las vencidas:
+  cada lote selecciona hasta `--lote` claves con `expire_date < ahora` (índice
+  de `expire_date`) y las borra en su propia transacción, así el bloqueo de
+  escritura dura poco y las peticiones concurrentes no esperan.
+- `--pausa` segundos entre lotes deja pasar a otras escrituras (en SQLite hay
+  un solo escritor a la vez).
+- Con `SESION_PERFIL` `cache` o `cookies` no hay tabla que limpiar (la cache
+  expira sola y la cookie vive en el navegador). Con `cached_db` se limpia la
+  tabla; las entradas de cache expiran solas.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+TAMANO_LOTE = 1000
+
+MOTORES_CON_TABLA = (
+	'django.contrib.sessions.backends.db',
+	'django.contrib.sessions.backends.cached_db',
+)
+
+
+def limpiar_sesiones(tamano_lote=TAMANO_LOTE, pausa=0, max_lotes=None):
+	"""Borra sesiones vencidas por lotes. Devuelve `(sesiones_borradas, lotes)`."""
+	ahora = timezone.now()
+	total = lotes = 0
+	while max_lotes is None or lotes < max_lotes:
+		with transaction.atomic():
+			claves = list(
+				Session.objects.filter(expire_date__lt=ahora)
+				.values_list('session_key', flat=True)[:tamano_lote]
+			)
+			if not claves:
+				break
+			borradas, _ = Session.objects.filter(session_key__in=claves).delete()
+		total += borradas
+		lotes += 1
+		if len(claves) < tamano_lote:
+			break
+		if pausa:
+			time.sleep(pausa)
+	return total, lotes
+
+
+class Command(BaseCommand):
+	help = 'Borra por lotes las sesiones vencidas de la base de datos.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Sesiones por DELETE.')
+		parser.add_argument('--pausa', type=float, default=0, help='Segundos de espera entre lotes.')
+		parser.add_argument('--max-lotes', type=int, default=None, help='Detenerse tras este número de lotes.')
+
+	def handle(self, *args, **options):
+		if options['lote'] < 1:
+			raise CommandError('--lote debe ser mayor que 0.')
+		if options['pausa'] < 0:
+			raise CommandError('--pausa no puede ser negativa.')
+		if settings.SESSION_ENGINE not in MOTORES_CON_TABLA:
+			self.stdout.write(f'{settings.SESSION_ENGINE}: las sesiones no se guardan en la base; nada que limpiar.')
+			return
+		total, lotes = limpiar_sesiones(options['lote'], options['pausa'], options['max_lotes'])
+		self.stdout.write(f'{total} sesiones vencidas borradas en {lotes} lote(s).')
@@ -0,0 +1,33 @@
+"""
+Comando `python manage.py metricas`.
+
+Combina los volcados que cada proceso escribe en `METRICAS_DIR` (ver
+`app/metricas.py`) e imprime en JSON los percentiles por ruta.
+"""
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.metricas import leer_volcados
+
+
+class Command(BaseCommand):
+	help = 'Imprime en JSON los histogramas de latencia/consultas por ruta (de todos los procesos).'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--dir', help='Carpeta de volcados (por defecto settings.METRICAS_DIR).')
+		parser.add_argument('--limpiar', action='store_true', help='Borra los volcados después de leerlos.')
+
+	def handle(self, *args, **options):
+		directorio = options['dir'] or getattr(settings, 'METRICAS_DIR', None)
+		if not directorio:
+			raise CommandError('Defina METRICAS_DIR o use --dir.')
+		directorio = Path(directorio)
+		registro = leer_volcados(directorio)
+		self.stdout.write(json.dumps(registro.resumen(), indent=2, ensure_ascii=False))
+		if options['limpiar']:
+			for archivo in directorio.glob('metricas-*.json'):
+				archivo.unlink(missing_ok=True)
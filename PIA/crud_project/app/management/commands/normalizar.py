@@ -0,0 +1,80 @@
+"""
+Comando `python manage.py normalizar [modelo ...]`.
+
+Vuelve a normalizar (mayúsculas, sin espacios extremos) las columnas de los
+campos de `app/campos.py` en las filas existentes, p. ej. datos cargados con
+SQL directo o anteriores a esos campos.
+
+Diseño:
+- Actualización por conjuntos: `UPDATE ... SET col = UPPER(TRIM(col))` (la
+  expresión `Mayusculas`) por rangos de `id` de `--lote` filas, cada rango en
+  su propia transacción. No se cargan filas en Python.
+- Solo se escriben las filas que cambian (`WHERE col <> UPPER(TRIM(col))`).
+- Las columnas se descubren en los modelos: cualquier campo nuevo de tipo
+  `MayusculasCharField`/`MayusculasTextField` se incluye sin tocar el comando.
+- Al terminar se invalidan el catálogo y el resumen del dashboard.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from app.campos import Mayusculas, campos_mayusculas
+from app.catalogo import invalidar_catalogo
+from app.dashboard import invalidar_resumen
+
+TAMANO_LOTE = 5000
+
+
+def normalizar_tabla(modelo, campos, tamano_lote=TAMANO_LOTE):
+	"""Normaliza `campos` de `modelo` por rangos de id. Devuelve las filas cambiadas."""
+	limites = modelo.objects.aggregate(minimo=Min('pk'), maximo=Max('pk'))
+	if limites['minimo'] is None:
+		return 0
+	cambiados = Q()
+	for campo in campos:
+		# NULL se queda como está (sin el isnull, ~Q también incluiría los NULL).
+		cambiados |= Q(**{f'{campo}__isnull': False}) & ~Q(**{campo: Mayusculas(campo)})
+	valores = {campo: Mayusculas(campo) for campo in campos}
+
+	total = 0
+	for inicio in range(limites['minimo'], limites['maximo'] + 1, tamano_lote):
+		with transaction.atomic():
+			total += (
+				modelo.objects
+				.filter(pk__gte=inicio, pk__lt=inicio + tamano_lote)
+				.filter(cambiados)
+				.update(**valores)
+			)
+	return total
+
+
+class Command(BaseCommand):
+	help = 'Normaliza a mayúsculas las columnas de texto existentes con UPDATE por lotes.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('modelos', nargs='*', help='Modelos de `app` (por defecto todos los que tienen campos normalizados).')
+		parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas (rango de id) por UPDATE.')
+
+	def handle(self, *args, **options):
+		if options['lote'] < 1:
+			raise CommandError('--lote debe ser mayor que 0.')
+		modelos = {modelo._meta.model_name: modelo for modelo in apps.get_app_config('app').get_models()}
+		if options['modelos']:
+			try:
+				seleccion = [modelos[nombre.lower()] for nombre in options['modelos']]
+			except KeyError as exc:
+				raise CommandError(f'Modelo desconocido: {exc.args[0]}')
+		else:
+			seleccion = list(modelos.values())
+
+		for modelo in seleccion:
+			campos = campos_mayusculas(modelo)
+			if not campos:
+				continue
+			total = normalizar_tabla(modelo, campos, options['lote'])
+			self.stdout.write(f"{modelo._meta.label}: {total} filas normalizadas ({', '.join(campos)}).")
+
+		invalidar_catalogo()
+		invalidar_resumen()
@@ -0,0 +1,176 @@
+"""
+Registro de métricas por vista (histogramas en memoria del proceso).
+
+Lo alimenta `app.middleware.MetricasMiddleware` y lo consultan la vista
+`metricas_json` y el comando `python manage.py metricas`.
+
+Diseño:
+- Cada métrica es un `Histograma` con cubetas geométricas fijas (factor 1.25
+  entre 0.1 y ~100 000). La memoria es constante por ruta y dos histogramas se
+  combinan sumando cubetas, así que los volcados de varios procesos se pueden
+  mezclar. Los percentiles son aproximados (error < 25 % del valor).
+- Las métricas se agrupan por nombre de ruta (`url_name`), no por URL, para que
+  el número de claves no crezca con los ids de la URL.
+- Si `settings.METRICAS_DIR` está definido, cada proceso vuelca su registro a
+  `metricas-<pid>.json` cada `METRICAS_INTERVALO_VOLCADO` segundos; el comando
+  de gestión lee y combina esos archivos.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+METRICAS = ('total_ms', 'sql_ms', 'plantilla_ms', 'consultas')
+
+_LIMITES = []
+_limite = 0.1
+while _limite < 100000:
+	_LIMITES.append(round(_limite, 4))
+	_limite *= 1.25
+
+
+class Histograma:
+	"""Histograma de cubetas fijas con conteo, suma y máximo."""
+
+	def __init__(self):
+		self.cubetas = [0] * (len(_LIMITES) + 1)
+		self.total = 0
+		self.suma = 0.0
+		self.maximo = 0.0
+
+	def registrar(self, valor):
+		self.cubetas[bisect.bisect_left(_LIMITES, valor)] += 1
+		self.total += 1
+		self.suma += valor
+		if valor > self.maximo:
+			self.maximo = valor
+
+	def combinar(self, otro):
+		for i, n in enumerate(otro.cubetas):
+			self.cubetas[i] += n
+		self.total += otro.total
+		self.suma += otro.suma
+		self.maximo = max(self.maximo, otro.maximo)
+
+	def percentil(self, p):
+		if not self.total:
+			return 0.0
+		objetivo = p / 100 * self.total
+		acumulado = 0
+		for i, n in enumerate(self.cubetas):
+			acumulado += n
+			if acumulado >= objetivo:
+				# Límite superior de la cubeta, acotado por el máximo observado.
+				limite = _LIMITES[i] if i < len(_LIMITES) else self.maximo
+				return min(limite, self.maximo)
+		return self.maximo
+
+	def resumen(self):
+		return {
+			'p50': round(self.percentil(50), 2),
+			'p95': round(self.percentil(95), 2),
+			'p99': round(self.percentil(99), 2),
+			'max': round(self.maximo, 2),
+			'promedio': round(self.suma / self.total, 2) if self.total else 0.0,
+		}
+
+	def a_dict(self):
+		return {'cubetas': self.cubetas, 'total': self.total, 'suma': self.suma, 'maximo': self.maximo}
+
+	@classmethod
+	def desde_dict(cls, datos):
+		h = cls()
+		h.cubetas = list(datos['cubetas'])
+		h.total = datos['total']
+		h.suma = datos['suma']
+		h.maximo = datos['maximo']
+		return h
+
+
+class Registro:
+	"""Histogramas por ruta, seguro entre hilos."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._rutas = {}
+		self._ultimo_volcado = time.monotonic()
+
+	def registrar(self, ruta, valores):
+		with self._lock:
+			histogramas = self._rutas.get(ruta)
+			if histogramas is None:
+				histogramas = self._rutas[ruta] = {m: Histograma() for m in METRICAS}
+			for metrica, valor in valores.items():
+				histogramas[metrica].registrar(valor)
+		self._volcar_si_toca()
+
+	def combinar(self, datos):
+		"""Añade al registro un volcado (`a_dict()`) de otro proceso."""
+		with self._lock:
+			for ruta, metricas in datos.items():
+				destino = self._rutas.setdefault(ruta, {m: Histograma() for m in METRICAS})
+				for metrica, h in metricas.items():
+					if metrica in destino:
+						destino[metrica].combinar(Histograma.desde_dict(h))
+
+	def a_dict(self):
+		with self._lock:
+			return {
+				ruta: {m: h.a_dict() for m, h in metricas.items()}
+				for ruta, metricas in self._rutas.items()
+			}
+
+	def resumen(self):
+		"""`{ruta: {'peticiones': n, metrica: {p50, p95, p99, max, promedio}}}`."""
+		with self._lock:
+			return {
+				ruta: dict(
+					peticiones=metricas['total_ms'].total,
+					**{m: h.resumen() for m, h in metricas.items()},
+				)
+				for ruta, metricas in sorted(self._rutas.items())
+			}
+
+	def reiniciar(self):
+		with self._lock:
+			self._rutas.clear()
+
+	def _volcar_si_toca(self):
+		directorio = getattr(settings, 'METRICAS_DIR', None)
+		if not directorio:
+			return
+		ahora = time.monotonic()
+		if ahora - self._ultimo_volcado < getattr(settings, 'METRICAS_INTERVALO_VOLCADO', 30):
+			return
+		self._ultimo_volcado = ahora
+		volcar(self, directorio)
+
+
+def volcar(registro, directorio):
+	"""Escribe el registro en `<directorio>/metricas-<pid>.json` (escritura atómica)."""
+	directorio = Path(directorio)
+	directorio.mkdir(parents=True, exist_ok=True)
+	destino = directorio / f'metricas-{os.getpid()}.json'
+	temporal = destino.with_suffix('.tmp')
+	temporal.write_text(json.dumps(registro.a_dict()), encoding='utf-8')
+	os.replace(temporal, destino)
+
+
+def leer_volcados(directorio):
+	"""Combina en un `Registro` nuevo todos los volcados de `directorio`."""
+	registro = Registro()
+	for archivo in sorted(Path(directorio).glob('metricas-*.json')):
+		try:
+			registro.combinar(json.loads(archivo.read_text(encoding='utf-8')))
+		except (OSError, ValueError):
+			continue
+	return registro
+
+
+# Registro del proceso actual.
+registro = Registro()
@@ -0,0 +1,83 @@
+"""
+Middleware propios de la app.
+
+`MetricasMiddleware` mide cada request (tiempo total, número de consultas,
+tiempo en SQL y tiempo de render de plantillas), lo registra por nombre de
+ruta en `app.metricas.registro` y lo devuelve al navegador en la cabecera
+`Server-Timing` (visible en las DevTools).
+
+Se activa con `METRICAS_ACTIVAS = True` en `settings.py`. Si está desactivado,
+el constructor lanza `MiddlewareNotUsed` y Django lo quita de la cadena: no
+queda ningún costo por request.
+"""
+
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as _DjangoTemplate
+
+from .metricas import registro
+
+_actual = threading.local()
+
+
+def _medir_render(render):
+	# Envuelve `Template.render` del backend de Django (solo la plantilla de
+	# nivel superior; `extends`/`include` se renderizan dentro de esa llamada).
+	def _render(self, *args, **kwargs):
+		medicion = getattr(_actual, 'medicion', None)
+		if medicion is None:
+			return render(self, *args, **kwargs)
+		inicio = time.perf_counter()
+		try:
+			return render(self, *args, **kwargs)
+		finally:
+			medicion['plantilla_ms'] += (time.perf_counter() - inicio) * 1000
+	_render.medido = True
+	return _render
+
+
+class MetricasMiddleware:
+	def __init__(self, get_response):
+		if not getattr(settings, 'METRICAS_ACTIVAS', False):
+			raise MiddlewareNotUsed
+		self.get_response = get_response
+		if not getattr(_DjangoTemplate.render, 'medido', False):
+			_DjangoTemplate.render = _medir_render(_DjangoTemplate.render)
+
+	def __call__(self, request):
+		medicion = {'consultas': 0, 'sql_ms': 0.0, 'plantilla_ms': 0.0}
+		_actual.medicion = medicion
+
+		def _medir_sql(execute, sql, params, many, context):
+			inicio = time.perf_counter()
+			try:
+				return execute(sql, params, many, context)
+			finally:
+				medicion['consultas'] += 1
+				medicion['sql_ms'] += (time.perf_counter() - inicio) * 1000
+
+		inicio = time.perf_counter()
+		try:
+			with ExitStack() as stack:
+				for alias in connections:
+					stack.enter_context(connections[alias].execute_wrapper(_medir_sql))
+				response = self.get_response(request)
+		finally:
+			_actual.medicion = None
+		medicion['total_ms'] = (time.perf_counter() - inicio) * 1000
+
+		match = getattr(request, 'resolver_match', None)
+		ruta = (match.url_name or match.view_name) if match else 'sin_ruta'
+		registro.registrar(ruta, medicion)
+
+		response['Server-Timing'] = ', '.join([
+			'sql;dur=%.1f;desc="%d consultas"' % (medicion['sql_ms'], medicion['consultas']),
+			'tpl;dur=%.1f' % medicion['plantilla_ms'],
+			'total;dur=%.1f' % medicion['total_ms'],
+		])
+		return response
@@ -1,28 +1,36 @@
 from django.db import migrations
+from django.db.models import Func, Q
+
+
+def _mayusculas(valor):
+    if isinstance(valor, str):
+        return valor.strip().upper()
+    return valor
+
 
 def uppercase_text(apps, schema_editor):
-    Tratamiento = apps.get_model('app', 'Tratamiento')
-    CitaDental = apps.get_model('app', 'CitaDental')
-    for t in Tratamiento.objects.all():
-        nombre = (t.nombre or '').upper()
-        descripcion = (t.descripcion or '')
-        descripcion = descripcion.upper() if descripcion else descripcion
-        if t.nombre != nombre or t.descripcion != descripcion:
-            t.nombre = nombre
-            t.descripcion = descripcion
-            t.save(update_fields=['nombre', 'descripcion'])
-    for c in CitaDental.objects.all():
-        nombre = (c.nombre_paciente or '').upper()
-        estatus = (c.estatus or '').upper()
-        update_fields = []
-        if c.nombre_paciente != nombre:
-            c.nombre_paciente = nombre
-            update_fields.append('nombre_paciente')
-        if c.estatus != estatus:
-            c.estatus = estatus
-            update_fields.append('estatus')
-        if update_fields:
-            c.save(update_fields=update_fields)
+    # Un UPDATE por tabla en lugar de cargar cada fila y guardarla una por una.
+    # SQLite solo convierte ASCII con UPPER(), así que ahí se registra una
+    # función con la misma regla que Python (`str.strip().upper()`).
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        connection.connection.create_function('APP_MAYUSCULAS', 1, _mayusculas, deterministic=True)
+        template = 'APP_MAYUSCULAS(%(expressions)s)'
+    else:
+        template = 'UPPER(TRIM(%(expressions)s))'
+
+    def mayusculas(campo):
+        return Func(campo, template=template)
+
+    def actualizar(modelo, campos):
+        cambiados = Q()
+        for campo in campos:
+            cambiados |= Q(**{f'{campo}__isnull': False}) & ~Q(**{campo: mayusculas(campo)})
+        modelo.objects.filter(cambiados).update(**{campo: mayusculas(campo) for campo in campos})
+
+    actualizar(apps.get_model('app', 'Tratamiento'), ['nombre', 'descripcion'])
+    actualizar(apps.get_model('app', 'CitaDental'), ['nombre_paciente', 'estatus'])
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Trunc
+
+
+def backfill_franja_hora(apps, schema_editor):
+    CitaDental = apps.get_model('app', 'CitaDental')
+    # Un solo UPDATE para toda la tabla (sin recorrer filas en Python).
+    CitaDental.objects.update(franja_hora=Trunc('fecha_cita', 'hour'))
+    # Históricos con choque de horario: se conserva la franja en la cita más
+    # antigua (menor id) y las demás quedan en NULL para que la restricción
+    # única pueda crearse.
+    duplicadas = (
+        CitaDental.objects.exclude(estatus='CANCELADA')
+        .exclude(franja_hora=None)
+        .values('franja_hora')
+        .annotate(total=Count('id'), primera=Min('id'))
+        .filter(total__gt=1)
+    )
+    for fila in duplicadas:
+        (
+            CitaDental.objects.filter(franja_hora=fila['franja_hora'])
+            .exclude(estatus='CANCELADA')
+            .exclude(pk=fila['primera'])
+            .update(franja_hora=None)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_uppercase_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citadental',
+            name='franja_hora',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_franja_hora, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='citadental',
+            constraint=models.UniqueConstraint(condition=models.Q(('estatus', 'CANCELADA'), _negated=True), fields=('franja_hora',), name='citadental_franja_activa_unica'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_citadental_franja_hora'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='citadental',
+            name='nombre_paciente',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='citadental',
+            index=models.Index(fields=['-fecha_cita', '-id'], name='citadental_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citadental',
+            index=models.Index(fields=['estatus', '-fecha_cita', '-id'], name='citadental_estatus_fecha_idx'),
+        ),
+    ]
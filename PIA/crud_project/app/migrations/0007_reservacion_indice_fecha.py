@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_citadental_indices_listado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservacion',
+            index=models.Index(fields=['-fecha_reservacion', '-id'], name='reservacion_fecha_id_idx'),
+        ),
+    ]
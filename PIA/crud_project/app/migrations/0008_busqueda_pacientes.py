@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:31
+
+import unicodedata
+
+from django.db import migrations, models
+from django.db.utils import DatabaseError
+
+LOTE = 2000
+
+
+def _normalizar(valor):
+    # Copia de `app.models.normalizar_busqueda` (las migraciones no dependen
+    # del código actual de la app).
+    if not valor:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(valor))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.upper().split())
+
+
+def backfill_nombre_busqueda(apps, schema_editor):
+    # El plegado de acentos no tiene equivalente SQL portable: se calcula en
+    # Python y se escribe con `bulk_update` por lotes.
+    for modelo, campo in (('CitaDental', 'nombre_paciente'), ('Reservacion', 'nombre_cliente')):
+        Modelo = apps.get_model('app', modelo)
+        lote = []
+        for obj in Modelo.objects.only('pk', campo).iterator(chunk_size=LOTE):
+            obj.nombre_busqueda = _normalizar(getattr(obj, campo))
+            lote.append(obj)
+            if len(lote) >= LOTE:
+                Modelo.objects.bulk_update(lote, ['nombre_busqueda'])
+                lote = []
+        if lote:
+            Modelo.objects.bulk_update(lote, ['nombre_busqueda'])
+
+
+def crear_tabla_fts(apps, schema_editor):
+    # Tabla FTS5 opcional para `app/busqueda.py`; solo en SQLite con FTS5.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS app_busqueda_fts "
+            "USING fts5(texto, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except DatabaseError:
+        pass
+
+
+def borrar_tabla_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS app_busqueda_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_reservacion_indice_fecha'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citadental',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='reservacion',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='citadental',
+            index=models.Index(fields=['telefono'], name='citadental_telefono_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citadental',
+            index=models.Index(fields=['correo'], name='citadental_correo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservacion',
+            index=models.Index(fields=['telefono'], name='reservacion_telefono_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservacion',
+            index=models.Index(fields=['correo'], name='reservacion_correo_idx'),
+        ),
+        migrations.RunPython(backfill_nombre_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_tabla_fts, borrar_tabla_fts),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:36
+
+import app.campos
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_busqueda_pacientes'),
+    ]
+
+    # Solo cambia la clase Python del campo (normalización en `app/campos.py`);
+    # la columna es la misma, así que no se toca la base de datos (en SQLite un
+    # AlterField reconstruiría la tabla completa).
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='citadental',
+                    name='estatus',
+                    field=app.campos.MayusculasCharField(choices=[('PENDIENTE', 'Pendiente'), ('CONFIRMADA', 'Confirmada'), ('CANCELADA', 'Cancelada'), ('ATENDIDA', 'Atendida')], default='PENDIENTE', max_length=20),
+                ),
+                migrations.AlterField(
+                    model_name='citadental',
+                    name='nombre_paciente',
+                    field=app.campos.MayusculasCharField(db_index=True, max_length=200),
+                ),
+                migrations.AlterField(
+                    model_name='tratamiento',
+                    name='descripcion',
+                    field=app.campos.MayusculasTextField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='tratamiento',
+                    name='nombre',
+                    field=app.campos.MayusculasCharField(max_length=150),
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
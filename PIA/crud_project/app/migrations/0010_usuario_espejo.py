@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def enlazar_por_email(apps, schema_editor):
+    # Los espejos creados antes de este campo se enlazan a su `User` por email
+    # (un solo UPDATE). Los que no coinciden quedan sin enlazar.
+    Usuario = apps.get_model('app', 'Usuario')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    cuenta = User.objects.filter(email=OuterRef('email')).order_by('pk').values('pk')[:1]
+    Usuario.objects.filter(user__isnull=True, email__isnull=False).update(user=Subquery(cuenta))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_campos_mayusculas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='espejo', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(enlazar_por_email, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:09
+
+import re
+
+from django.db import migrations, models
+
+LOTE = 2000
+
+
+def _telefono(valor):
+    # Copias de `app.models.normalizar_telefono`/`normalizar_correo` (las
+    # migraciones no dependen del código actual de la app).
+    return re.sub(r'\D', '', str(valor or ''))
+
+
+def _correo(valor):
+    return str(valor or '').strip().lower()
+
+
+def backfill_claves_contacto(apps, schema_editor):
+    # Quitar separadores no tiene equivalente SQL portable: se calcula en
+    # Python y se escribe con `bulk_update` por lotes.
+    campos = ['telefono_busqueda', 'correo_busqueda']
+    for modelo in ('CitaDental', 'Reservacion'):
+        Modelo = apps.get_model('app', modelo)
+        lote = []
+        filas = Modelo.objects.exclude(telefono__isnull=True, correo__isnull=True)
+        for obj in filas.only('pk', 'telefono', 'correo').iterator(chunk_size=LOTE):
+            obj.telefono_busqueda = _telefono(obj.telefono)
+            obj.correo_busqueda = _correo(obj.correo)
+            lote.append(obj)
+            if len(lote) >= LOTE:
+                Modelo.objects.bulk_update(lote, campos)
+                lote = []
+        if lote:
+            Modelo.objects.bulk_update(lote, campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_usuario_espejo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='citadental',
+            name='citadental_telefono_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='citadental',
+            name='citadental_correo_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservacion',
+            name='reservacion_telefono_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservacion',
+            name='reservacion_correo_idx',
+        ),
+        migrations.AddField(
+            model_name='citadental',
+            name='telefono_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='citadental',
+            name='correo_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='reservacion',
+            name='telefono_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='reservacion',
+            name='correo_busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.RunPython(backfill_claves_contacto, migrations.RunPython.noop),
+    ]
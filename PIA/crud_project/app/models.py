@@ -1,5 +1,5 @@
 
-# Modelos del proyecto: Tratamiento, CitaDental, Usuario.
+# Modelos del proyecto: Tratamiento, CitaDental, Reservacion, Usuario.
 #
 # Este módulo contiene las entidades persistidas en la base de datos.
 # Los comentarios en cada clase explican por qué se eligieron ciertos tipos
@@ -13,16 +13,47 @@
 # - Campos como `DateTimeField` representan un momento específico; para
 #   búsquedas por hora puede ser útil normalizar o indexar según requisitos.
 
+import re
+import unicodedata
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from .campos import MayusculasCharField, MayusculasTextField
+
+
+def normalizar_busqueda(value):
+	# Clave de búsqueda: sin acentos, en mayúsculas y con espacios simples
+	# ("  José  Pérez" -> "JOSE PEREZ"). Se guarda en `nombre_busqueda`.
+	if not value:
+		return ''
+	descompuesto = unicodedata.normalize('NFKD', str(value))
+	sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+	return ' '.join(sin_acentos.upper().split())
+
 
+def normalizar_telefono(value):
+	# Clave de búsqueda del teléfono: solo dígitos ("(81) 1234-5678" ->
+	# "8112345678"). Se guarda en `telefono_busqueda`.
+	return re.sub(r'\D', '', str(value or ''))
 
 
-def _upper_or_none(value):
-	# Helper sencillo: si el valor es string, limpiar espacios y convertir
-	# a mayúsculas. Usado para normalizar texto antes de persistirlo.
-	if isinstance(value, str):
-		return value.strip().upper()
-	return value
+def normalizar_correo(value):
+	# Clave de búsqueda del correo: sin espacios y en minúsculas. Se guarda en
+	# `correo_busqueda`; `correo` conserva lo que se capturó.
+	return str(value or '').strip().lower()
+
+
+def franja_de(fecha):
+	# Clave de franja horaria: `fecha` truncada a la hora en la zona horaria
+	# actual. Dos citas con la misma franja ocupan el mismo horario.
+	if fecha is None:
+		return None
+	if timezone.is_naive(fecha):
+		fecha = timezone.make_aware(fecha)
+	return timezone.localtime(fecha).replace(minute=0, second=0, microsecond=0)
 
 
 
@@ -36,23 +67,17 @@ def _upper_or_none(value):
 # Notas:
 # - `precio` usa `max_digits=10` y `decimal_places=2` para cubrir precios
 #   con dos decimales (moneda). Ajustar según rango de precios esperado.
-# - `save()` sobrescrito normaliza texto (mayúsculas) para consistencia.
+# - `nombre` y `descripcion` se guardan en mayúsculas (campos de `app/campos.py`),
+#   también con `bulk_create()`/`update()`.
 
 class Tratamiento(models.Model):
-	nombre = models.CharField(max_length=150)
-	descripcion = models.TextField(blank=True, null=True)
+	nombre = MayusculasCharField(max_length=150)
+	descripcion = MayusculasTextField(blank=True, null=True)
 	precio = models.DecimalField(max_digits=10, decimal_places=2)
 
 	def __str__(self):
 		return self.nombre
 
-	def save(self, *args, **kwargs):
-		# Normalizar texto antes de persistir: útil para búsquedas y presentación.
-		self.nombre = _upper_or_none(self.nombre)
-		if self.descripcion:
-			self.descripcion = _upper_or_none(self.descripcion)
-		super().save(*args, **kwargs)
-
 
 
 # Modelo que representa una cita dental asociada a uno o más tratamientos.
@@ -66,9 +91,24 @@ class Tratamiento(models.Model):
 #   que no siempre proporcionen contacto.
 #
 # Consideraciones:
-# - No existe una restricción de unicidad en `fecha_cita` -> se pueden crear
-#   colisiones de horario; si el negocio requiere evitar reservas simultáneas,
-#   agregue una restricción o gestione a nivel de vista/transaction.
+# - `franja_hora` guarda `fecha_cita` truncada a la hora y se calcula en
+#   `save()`. Está indexada y tiene una restricción única parcial (citas no
+#   canceladas), así que un choque de horario se detecta con una sola búsqueda
+#   en el índice y la base de datos rechaza las reservas simultáneas. Quien
+#   guarde una cita debe atrapar `IntegrityError` (la franja pudo ocuparse
+#   mientras tanto, p. ej. al reactivar una cita cancelada). Las citas que la
+#   migración 0005 dejó con franja NULL la conservan hasta reprogramarse.
+# - Índices compuestos `(fecha_cita, id)` y `(estatus, fecha_cita, id)` respaldan
+#   la paginación por cursor del listado; `nombre_paciente` está indexado para
+#   búsquedas por prefijo.
+# - `nombre_busqueda` (nombre sin acentos, en mayúsculas), `telefono_busqueda`
+#   (solo dígitos) y `correo_busqueda` (minúsculas) están indexados y respaldan
+#   la búsqueda de pacientes (`app/busqueda.py`); se calculan en `save()`.
+# - `nombre_paciente` y `estatus` se normalizan a mayúsculas en el campo
+#   (`app/campos.py`), también con operaciones masivas.
+# - `QuerySet.update()`/`bulk_create()` no pasan por `save()`: quien los use
+#   debe calcular `franja_hora` con `franja_de()` y las claves de búsqueda con
+#   `normalizar_busqueda()`, `normalizar_telefono()` y `normalizar_correo()`.
 
 
 class CitaDental(models.Model):
@@ -84,7 +124,7 @@ class CitaDental(models.Model):
 		(ESTATUS_ATENDIDA, 'Atendida'),
 	]
 
-	nombre_paciente = models.CharField(max_length=200)
+	nombre_paciente = MayusculasCharField(max_length=200, db_index=True)
 	tratamientos = models.ManyToManyField(
 		Tratamiento,
 		blank=True,
@@ -94,17 +134,120 @@ class CitaDental(models.Model):
 	fecha_cita = models.DateTimeField()
 	telefono = models.CharField(max_length=30, blank=True, null=True)
 	correo = models.EmailField(blank=True, null=True)
-	estatus = models.CharField(max_length=20, choices=ESTATUS_CHOICES, default=ESTATUS_PENDIENTE)
+	estatus = MayusculasCharField(max_length=20, choices=ESTATUS_CHOICES, default=ESTATUS_PENDIENTE)
+	franja_hora = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+	nombre_busqueda = models.CharField(max_length=200, blank=True, default='', editable=False, db_index=True)
+	telefono_busqueda = models.CharField(max_length=30, blank=True, default='', editable=False, db_index=True)
+	correo_busqueda = models.CharField(max_length=254, blank=True, default='', editable=False, db_index=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(
+				fields=['franja_hora'],
+				condition=~Q(estatus='CANCELADA'),
+				name='citadental_franja_activa_unica',
+			),
+		]
+		indexes = [
+			# Paginación por cursor del listado: ORDER BY fecha_cita DESC, id DESC.
+			models.Index(fields=['-fecha_cita', '-id'], name='citadental_fecha_id_idx'),
+			# Mismo orden filtrando por estatus.
+			models.Index(fields=['estatus', '-fecha_cita', '-id'], name='citadental_estatus_fecha_idx'),
+		]
 
 	def __str__(self):
 		fecha = self.fecha_cita.strftime('%Y-%m-%d %H:%M') if self.fecha_cita else 'SIN FECHA'
 		return f"{self.nombre_paciente} - {fecha}"
 
 	def save(self, *args, **kwargs):
-		# Normalizar nombre del paciente y estado antes de guardar.
-		self.nombre_paciente = _upper_or_none(self.nombre_paciente)
-		if self.estatus:
-			self.estatus = _upper_or_none(self.estatus)
+		# Franja previa (la cargada de la BD) para invalidar la disponibilidad
+		# del día anterior si la cita cambia de fecha.
+		self._franja_anterior = self.franja_hora
+		update_fields = kwargs.get('update_fields')
+		# Las citas históricas que la migración 0005 dejó sin franja (choques
+		# previos a la restricción) la conservan en NULL: solo se calcula al
+		# crear, si ya tenía franja o al reprogramar (`update_fields` con
+		# `fecha_cita`, como hace `citas_editar`).
+		if (
+			self._state.adding or self.franja_hora is not None
+			or (update_fields is not None and 'fecha_cita' in update_fields)
+		):
+			self.franja_hora = franja_de(self.fecha_cita)
+		self.nombre_busqueda = normalizar_busqueda(self.nombre_paciente)
+		self.telefono_busqueda = normalizar_telefono(self.telefono)
+		self.correo_busqueda = normalizar_correo(self.correo)
+		if update_fields is not None:
+			update_fields = set(update_fields)
+			if 'fecha_cita' in update_fields:
+				update_fields.add('franja_hora')
+			if 'nombre_paciente' in update_fields:
+				update_fields.add('nombre_busqueda')
+			if 'telefono' in update_fields:
+				update_fields.add('telefono_busqueda')
+			if 'correo' in update_fields:
+				update_fields.add('correo_busqueda')
+			kwargs['update_fields'] = update_fields
+		super().save(*args, **kwargs)
+
+
+
+# Reservación de un cliente (eventos/visitas con número de asistentes).
+#
+# - Comparte la convención de `estatus` con `CitaDental` (constantes + choices).
+# - `created_at` se llena automáticamente al crear el registro.
+# - Índice `(fecha_reservacion, id)` para el listado paginado por cursor.
+# - `nombre_busqueda`, `telefono_busqueda` y `correo_busqueda` (calculados en
+#   `save()`) respaldan la búsqueda de clientes, igual que en `CitaDental`.
+
+
+class Reservacion(models.Model):
+	ESTATUS_PENDIENTE = 'PENDIENTE'
+	ESTATUS_CONFIRMADA = 'CONFIRMADA'
+	ESTATUS_CANCELADA = 'CANCELADA'
+	ESTATUS_LISTA = 'LISTA'
+
+	ESTATUS_CHOICES = [
+		(ESTATUS_PENDIENTE, 'Pendiente'),
+		(ESTATUS_CONFIRMADA, 'Confirmada'),
+		(ESTATUS_CANCELADA, 'Cancelada'),
+		(ESTATUS_LISTA, 'Lista'),
+	]
+
+	nombre_cliente = models.CharField(max_length=200)
+	fecha_reservacion = models.DateTimeField()
+	telefono = models.CharField(max_length=30, blank=True, null=True)
+	correo = models.EmailField(blank=True, null=True)
+	asistentes = models.PositiveIntegerField(default=0)
+	estatus = models.CharField(max_length=20, choices=ESTATUS_CHOICES, default=ESTATUS_PENDIENTE)
+	created_at = models.DateTimeField(auto_now_add=True)
+	nombre_busqueda = models.CharField(max_length=200, blank=True, default='', editable=False, db_index=True)
+	telefono_busqueda = models.CharField(max_length=30, blank=True, default='', editable=False, db_index=True)
+	correo_busqueda = models.CharField(max_length=254, blank=True, default='', editable=False, db_index=True)
+
+	class Meta:
+		indexes = [
+			# Paginación por cursor del listado: ORDER BY fecha_reservacion DESC, id DESC.
+			models.Index(fields=['-fecha_reservacion', '-id'], name='reservacion_fecha_id_idx'),
+		]
+
+	def __str__(self):
+		fecha = self.fecha_reservacion.strftime('%Y-%m-%d %H:%M') if self.fecha_reservacion else 'SIN FECHA'
+		return f"{self.nombre_cliente} - {fecha}"
+
+	def save(self, *args, **kwargs):
+		self.nombre_busqueda = normalizar_busqueda(self.nombre_cliente)
+		self.telefono_busqueda = normalizar_telefono(self.telefono)
+		self.correo_busqueda = normalizar_correo(self.correo)
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None:
+			update_fields = set(update_fields)
+			if 'nombre_cliente' in update_fields:
+				update_fields.add('nombre_busqueda')
+			if 'telefono' in update_fields:
+				update_fields.add('telefono_busqueda')
+			if 'correo' in update_fields:
+				update_fields.add('correo_busqueda')
+			kwargs['update_fields'] = update_fields
 		super().save(*args, **kwargs)
 
 
@@ -119,9 +262,19 @@ class CitaDental(models.Model):
 # - El campo `email` es `unique=True` para evitar duplicados en la tabla.
 #   Sin embargo, `null=True, blank=True` permite registros sin email —
 #   considere exigir email si es un identificador principal.
+# - Es un espejo de `User`: `user` apunta a la cuenta y `password` guarda el
+#   mismo hash. Solo se escribe desde `app/cuentas.py`, que además usa la
+#   restricción única de `email` para rechazar correos repetidos al registrar.
 
 
 class Usuario(models.Model):
+	user = models.OneToOneField(
+		settings.AUTH_USER_MODEL,
+		null=True,
+		blank=True,
+		on_delete=models.CASCADE,
+		related_name='espejo',
+	)
 	email = models.EmailField(unique=True, null=True, blank=True)
 	password = models.CharField(max_length=128)
 	created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,90 @@
+"""
+Paginación por cursor (keyset) para listados ordenados por fecha.
+
+En lugar de `OFFSET`, cada página se pide "después de" (o "antes de") la
+última fila vista, comparando la tupla `(campo_fecha, id)`. Con un índice
+sobre esas columnas el costo de cada página es constante aunque la tabla
+crezca, y no se cuentan filas.
+
+El cursor es opaco para el cliente: `fecha ISO|id` codificado en base64 url-safe.
+"""
+
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class PaginaKeyset:
+	"""Filas de una página y cursores para la siguiente/anterior (o None)."""
+
+	def __init__(self, items, siguiente=None, anterior=None):
+		self.items = items
+		self.siguiente = siguiente
+		self.anterior = anterior
+
+	def __iter__(self):
+		return iter(self.items)
+
+	def __len__(self):
+		return len(self.items)
+
+
+def codificar_cursor(valor, pk):
+	texto = f'{valor.isoformat()}|{pk}'
+	return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+	"""Devuelve `(datetime, pk)` o None si el cursor no es válido."""
+	if not cursor:
+		return None
+	try:
+		relleno = '=' * (-len(cursor) % 4)
+		texto = base64.urlsafe_b64decode(cursor + relleno).decode('utf-8')
+		valor, pk = texto.rsplit('|', 1)
+		fecha = parse_datetime(valor)
+		if fecha is None:
+			return None
+		return fecha, int(pk)
+	except (ValueError, UnicodeDecodeError):
+		return None
+
+
+def paginar_keyset(qs, campo, despues=None, antes=None, tamano=25):
+	"""Pagina `qs` en orden descendente por `(campo, id)`.
+
+	- `despues`: cursor de la última fila de la página anterior (avanzar).
+	- `antes`: cursor de la primera fila de la página siguiente (retroceder).
+	Un cursor inválido se ignora y se devuelve la primera página.
+	"""
+	cursor_despues = decodificar_cursor(despues)
+	cursor_antes = None if cursor_despues else decodificar_cursor(antes)
+
+	if cursor_antes:
+		valor, pk = cursor_antes
+		filas = list(
+			qs.filter(Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk}))
+			.order_by(campo, 'pk')[:tamano + 1]
+		)
+		hay_anterior = len(filas) > tamano
+		items = list(reversed(filas[:tamano]))
+		hay_siguiente = True
+	else:
+		if cursor_despues:
+			valor, pk = cursor_despues
+			qs = qs.filter(Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'pk__lt': pk}))
+		filas = list(qs.order_by(f'-{campo}', '-pk')[:tamano + 1])
+		hay_siguiente = len(filas) > tamano
+		items = filas[:tamano]
+		hay_anterior = cursor_despues is not None
+
+	pagina = PaginaKeyset(items=items)
+	if items:
+		if hay_siguiente:
+			ultimo = items[-1]
+			pagina.siguiente = codificar_cursor(getattr(ultimo, campo), ultimo.pk)
+		if hay_anterior:
+			primero = items[0]
+			pagina.anterior = codificar_cursor(getattr(primero, campo), primero.pk)
+	return pagina
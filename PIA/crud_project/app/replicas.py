@@ -0,0 +1,121 @@
+"""
+Lecturas en una réplica de solo lectura (`DATABASES['replica']`).
+
+Se activa definiendo `DATABASE_REPLICA_URL` (ver `settings.py`); sin réplica
+todo sigue yendo a 'default' y el middleware se desactiva.
+
+Diseño:
+- `RouterReplica` manda todas las escrituras a 'default'. Las lecturas van a
+  la réplica solo dentro de las vistas marcadas con `@lectura_en_replica`
+  (peticiones GET/HEAD). Fuera de ellas, p. ej. al validar un choque de
+  horario antes de guardar una cita, se lee de la primaria.
+- Leer lo propio (read-your-writes): `ReplicaMiddleware` marca con la cookie
+  `app_primaria` al navegador que hizo una petición de escritura (POST, PUT,
+  PATCH, DELETE). Durante `REPLICA_LECTURA_PROPIA` segundos sus lecturas van a
+  la primaria, así ve sus cambios aunque la réplica vaya atrasada.
+- Las caches compartidas (catálogo, dashboard, disponibilidad, precios) se
+  llenan dentro de `en_primaria()`: un dato atrasado leído de la réplica justo
+  después de invalidar quedaría cacheado para todos.
+- El alias de lectura se guarda en una `ContextVar`, así cada hilo o tarea
+  tiene el suyo.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS_REPLICA = 'replica'
+COOKIE_PRIMARIA = 'app_primaria'
+LECTURA_PROPIA_POR_DEFECTO = 10
+
+_METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+
+def replica_configurada():
+	"""True si hay alias 'replica' y apunta a otra base que 'default'.
+
+	En pruebas la réplica es un espejo (`TEST['MIRROR']`) de la base de pruebas
+	de 'default', fuera de la transacción de cada `TestCase`; ahí se lee de
+	'default', que es la misma base.
+	"""
+	if ALIAS_REPLICA not in settings.DATABASES:
+		return False
+	return connections[ALIAS_REPLICA].settings_dict['NAME'] != connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+
+@contextmanager
+def _leer_de(alias):
+	token = _alias_lectura.set(alias)
+	try:
+		yield
+	finally:
+		_alias_lectura.reset(token)
+
+
+def en_primaria():
+	"""Context manager: las lecturas dentro del bloque van a 'default'."""
+	return _leer_de(None)
+
+
+def lectura_en_replica(view_func):
+	"""Decorador para vistas de solo lectura: sus consultas van a la réplica.
+
+	No aplica a métodos de escritura ni a navegadores con la cookie
+	`app_primaria` (escribieron hace poco).
+	"""
+	@wraps(view_func)
+	def _wrapped(request, *args, **kwargs):
+		if (
+			request.method not in ('GET', 'HEAD')
+			or COOKIE_PRIMARIA in request.COOKIES
+			or not replica_configurada()
+		):
+			return view_func(request, *args, **kwargs)
+		with _leer_de(ALIAS_REPLICA):
+			return view_func(request, *args, **kwargs)
+	return _wrapped
+
+
+class RouterReplica:
+	"""Router de `DATABASE_ROUTERS`: lecturas según el contexto, escrituras a 'default'."""
+
+	def db_for_read(self, model, **hints):
+		# None: Django usa la base de la instancia relacionada o 'default'.
+		return _alias_lectura.get()
+
+	def db_for_write(self, model, **hints):
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1, obj2, **hints):
+		alias = {DEFAULT_DB_ALIAS, ALIAS_REPLICA}
+		if obj1._state.db in alias and obj2._state.db in alias:
+			return True
+		return None
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		# La réplica recibe el esquema por replicación, no por `migrate`.
+		if db == ALIAS_REPLICA:
+			return False
+		return None
+
+
+class ReplicaMiddleware:
+	"""Marca con `app_primaria` a quien hace una petición de escritura."""
+
+	def __init__(self, get_response):
+		if not replica_configurada():
+			raise MiddlewareNotUsed
+		self.get_response = get_response
+		self.segundos = getattr(settings, 'REPLICA_LECTURA_PROPIA', LECTURA_PROPIA_POR_DEFECTO)
+
+	def __call__(self, request):
+		response = self.get_response(request)
+		if request.method not in _METODOS_LECTURA:
+			response.set_cookie(COOKIE_PRIMARIA, '1', max_age=self.segundos, httponly=True, samesite='Lax')
+		return response
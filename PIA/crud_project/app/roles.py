@@ -0,0 +1,152 @@
+"""
+Resolución de roles (grupos) del usuario.
+
+Un único punto para saber a qué grupos pertenece un usuario. Lo comparten
+el context processor `user_roles`, el decorador `group_required` y las vistas
+que necesitan banderas de rol (p. ej. `listar`).
+
+Cómo evita consultas repetidas:
+- Los nombres de grupo se cargan con una sola consulta y se guardan en el
+  propio objeto `user` (vive lo que dura la request).
+- Solo con `settings.ROLES_CACHE_COMPARTIDA` se guardan además en la cache de
+  Django por usuario, entre requests. Requiere una cache compartida por todos
+  los procesos (Redis, Memcached): con `LocMemCache` cada proceso tendría su
+  copia e `invalidar_roles` solo limpiaría la del proceso que hizo el cambio,
+  así que los demás seguirían autorizando con grupos revocados.
+- La clave de cada usuario incluye una versión que `invalidar_roles`
+  (conectado a `m2m_changed` en `signals.py`) reemplaza por un valor nuevo y
+  único con `cache.set()`. Si la versión se pierde (expulsada de la cache) se
+  genera otra nueva, nunca se vuelve a una anterior.
+
+Grupos base:
+- Los cuatro grupos de `GRUPOS_BASE` se crean una sola vez tras `migrate`
+  (`ensure_default_groups`, conectado a `post_migrate`), no en cada request.
+- `id_grupo()` resuelve nombre -> id desde un mapa en memoria del proceso,
+  así que asignar grupos no vuelve a consultar la tabla `auth_group`.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+ROL_ADMIN = 'Administrador'
+ROL_EMPLEADO = 'Empleado'
+PERMISO_CITAS = 'Permiso Citas'
+PERMISO_TRATAMIENTOS = 'Permiso Tratamientos'
+
+GRUPOS_BASE = (ROL_ADMIN, ROL_EMPLEADO, PERMISO_CITAS, PERMISO_TRATAMIENTOS)
+
+# Tiempo de vida (segundos) de los grupos cacheados por usuario.
+ROLES_CACHE_TIMEOUT = 300
+
+_ATTR_REQUEST = '_nombres_grupos'
+
+
+def _version_key(user_id):
+	return f'app:roles:{user_id}:version'
+
+
+def _grupos_key(user_id, version):
+	return f'app:roles:{user_id}:v{version}'
+
+
+def nombres_grupos(user):
+	"""Devuelve un `frozenset` con los nombres de grupo del usuario."""
+	if user is None or not user.is_authenticated:
+		return frozenset()
+	nombres = getattr(user, _ATTR_REQUEST, None)
+	if nombres is not None:
+		return nombres
+
+	if getattr(settings, 'ROLES_CACHE_COMPARTIDA', False):
+		version = cache.get_or_set(_version_key(user.pk), _nueva_version, None)
+		key = _grupos_key(user.pk, version)
+		nombres = cache.get(key)
+		if nombres is None:
+			nombres = _consultar_grupos(user)
+			cache.set(key, nombres, ROLES_CACHE_TIMEOUT)
+	else:
+		nombres = _consultar_grupos(user)
+	setattr(user, _ATTR_REQUEST, nombres)
+	return nombres
+
+
+def _consultar_grupos(user):
+	# Siempre de la primaria: decide permisos y puede cachearse entre peticiones.
+	return frozenset(user.groups.using(DEFAULT_DB_ALIAS).values_list('name', flat=True))
+
+
+def _nueva_version():
+	return uuid.uuid4().hex
+
+
+def tiene_grupo(user, *nombres):
+	"""True si el usuario pertenece a al menos uno de los grupos indicados."""
+	return not nombres_grupos(user).isdisjoint(nombres)
+
+
+def banderas_roles(user):
+	"""Banderas de rol usadas por plantillas y vistas.
+
+	- `is_admin`: superuser o grupo 'Administrador'.
+	- `is_employee`: grupo 'Empleado'.
+	- `can_view_citas`: administrador o grupo 'Permiso Citas'.
+	- `can_manage_tratamientos`: administrador o grupo 'Permiso Tratamientos'.
+	"""
+	if user is None or not user.is_authenticated:
+		return {
+			'is_admin': False,
+			'is_employee': False,
+			'can_view_citas': False,
+			'can_manage_tratamientos': False,
+		}
+	grupos = nombres_grupos(user)
+	is_admin = user.is_superuser or ROL_ADMIN in grupos
+	return {
+		'is_admin': is_admin,
+		'is_employee': ROL_EMPLEADO in grupos,
+		'can_view_citas': is_admin or PERMISO_CITAS in grupos,
+		'can_manage_tratamientos': is_admin or PERMISO_TRATAMIENTOS in grupos,
+	}
+
+
+def invalidar_roles(user_id, user=None):
+	"""Invalida los grupos cacheados de un usuario (tras cambiar sus grupos)."""
+	if getattr(settings, 'ROLES_CACHE_COMPARTIDA', False):
+		cache.set(_version_key(user_id), _nueva_version(), None)
+	if user is not None and hasattr(user, _ATTR_REQUEST):
+		delattr(user, _ATTR_REQUEST)
+
+
+# Mapa nombre -> id de grupo, compartido por todo el proceso.
+_ids_grupos = {}
+
+
+def ensure_default_groups(**kwargs):
+	"""Garantiza que existan los grupos base y llena el mapa nombre -> id.
+
+	Se ejecuta tras `migrate` (señal `post_migrate`); acepta `**kwargs` para
+	poder conectarse directamente como receptor.
+	"""
+	for nombre in GRUPOS_BASE:
+		grupo, _ = Group.objects.get_or_create(name=nombre)
+		_ids_grupos[nombre] = grupo.pk
+
+
+def id_grupo(nombre):
+	"""Devuelve el id del grupo `nombre` usando el mapa en memoria."""
+	gid = _ids_grupos.get(nombre)
+	if gid is None:
+		# Primera vez en este proceso (o tras borrar el grupo): se resuelve
+		# una vez y queda memorizado.
+		gid = Group.objects.get_or_create(name=nombre)[0].pk
+		_ids_grupos[nombre] = gid
+	return gid
+
+
+def olvidar_ids_grupos(**kwargs):
+	"""Vacía el mapa nombre -> id (p. ej. si se borra un grupo)."""
+	_ids_grupos.clear()
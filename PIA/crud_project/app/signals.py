@@ -0,0 +1,72 @@
+"""
+Señales de la app.
+
+Se conectan desde `AppConfig.ready()` (ver `apps.py`) con importación local
+para evitar importaciones circulares durante el arranque.
+"""
+
+from django.contrib.auth.models import Group, User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+
+from .busqueda import quitar_fts, sincronizar_fts
+from .campos import registrar_funciones_sqlite
+from .catalogo import invalidar_catalogo
+from .dashboard import invalidar_resumen
+from .disponibilidad import invalidar_cita
+from .models import CitaDental, Reservacion, Tratamiento
+from .roles import ensure_default_groups, invalidar_roles, olvidar_ids_grupos
+
+
+def _grupos_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+	# Cualquier cambio en `user.groups` (assign_user_groups, admin, shell)
+	# invalida la cache de roles de los usuarios afectados.
+	if not reverse:
+		if action in ('post_add', 'post_remove', 'post_clear'):
+			invalidar_roles(instance.pk, instance)
+		return
+	# Cambios desde el lado del grupo (`group.user_set`): pk_set son usuarios.
+	if action == 'pre_clear':
+		pk_set = set(instance.user_set.values_list('pk', flat=True))
+	elif action not in ('post_add', 'post_remove'):
+		return
+	for user_id in pk_set or ():
+		invalidar_roles(user_id)
+
+
+def _post_migrate(sender, app_config, **kwargs):
+	# Sembrar los grupos base una sola vez, tras migrar esta app.
+	if app_config.name == 'app':
+		ensure_default_groups()
+
+
+def connect_handlers():
+	post_migrate.connect(_post_migrate, dispatch_uid='app.signals.post_migrate')
+	# Función SQL `APP_MAYUSCULAS` para normalizar por conjuntos en SQLite.
+	connection_created.connect(registrar_funciones_sqlite, dispatch_uid='app.signals.funciones_sqlite')
+	post_delete.connect(
+		olvidar_ids_grupos,
+		sender=Group,
+		dispatch_uid='app.signals.olvidar_ids_grupos',
+	)
+	# Cualquier alta, cambio o baja de un tratamiento invalida el catálogo cacheado.
+	post_save.connect(invalidar_catalogo, sender=Tratamiento, dispatch_uid='app.signals.catalogo_save')
+	post_delete.connect(invalidar_catalogo, sender=Tratamiento, dispatch_uid='app.signals.catalogo_delete')
+	# Guardar o eliminar una cita libera/ocupa horarios de su día.
+	post_save.connect(invalidar_cita, sender=CitaDental, dispatch_uid='app.signals.disponibilidad_save')
+	post_delete.connect(invalidar_cita, sender=CitaDental, dispatch_uid='app.signals.disponibilidad_delete')
+	# Índice FTS5 de búsqueda (solo hace algo con BUSQUEDA_FTS activado).
+	for modelo in (CitaDental, Reservacion):
+		uid = f'app.signals.busqueda_{modelo._meta.model_name}'
+		post_save.connect(sincronizar_fts, sender=modelo, dispatch_uid=f'{uid}_save')
+		post_delete.connect(quitar_fts, sender=modelo, dispatch_uid=f'{uid}_delete')
+	# Los contadores del dashboard dependen de citas, tratamientos y reservaciones.
+	for modelo in (CitaDental, Tratamiento, Reservacion):
+		uid = f'app.signals.resumen_{modelo._meta.model_name}'
+		post_save.connect(invalidar_resumen, sender=modelo, dispatch_uid=f'{uid}_save')
+		post_delete.connect(invalidar_resumen, sender=modelo, dispatch_uid=f'{uid}_delete')
+	m2m_changed.connect(
+		_grupos_cambiados,
+		sender=User.groups.through,
+		dispatch_uid='app.signals.grupos_cambiados',
+	)
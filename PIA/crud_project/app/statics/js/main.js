@@ -8,7 +8,8 @@
      (modo oscuro, navegación activa, slider de tratamientos).
 
  Principales responsabilidades por sección:
- - Carga de datos: realiza `fetch` a `/api/tratamientos/` para obtener los tratamientos.
+ - Carga de datos: lee los tratamientos incrustados en `#tratamientos-data` (json_script de la
+     vista `index`); solo si no existen hace `fetch` a `/api/tratamientos/`.
  - Renderizado: crea dinámicamente tarjetas, select y checkboxes de tratamientos.
  - Validaciones cliente: valida inputs para mejorar UX (teléfono, email, fecha, max 2 tratamientos).
      OJO: Estas validaciones son solo de UX; las validaciones definitivas se realizan en el servidor
@@ -32,8 +33,8 @@
  Uso: el script se inicializa en `DOMContentLoaded` llamando a `loadTratamientosAndInit()`.
 */
 (function(){
-    // Cargaremos los tratamientos desde el backend (DB) vía fetch.
-    // El arreglo quedará vacío hasta que se carguen los datos desde /api/tratamientos/.
+    // Los tratamientos vienen incrustados en la página (`#tratamientos-data`) o,
+    // si faltan, se cargan desde /api/tratamientos/ vía fetch.
     let tratamientos = [];
     const TREATMENTS_PER_PAGE = 4;
     let tratamientoPages = [];
@@ -214,11 +215,13 @@
     // - Nota: no valida la integridad de los objetos `tratamiento` (se asume formato correcto desde la API).
 
     // Cotizador
-    // Cotizador: ahora trabaja con un select (un solo tratamiento seleccionado)
+    // Cotizador: trabaja con un select (un solo tratamiento seleccionado) y pide el
+    // cálculo al servidor (`/api/cotizar/`), que usa los precios vigentes y las
+    // reglas de descuento; aquí solo se muestran los importes recibidos.
     function setupCotizador(){
         const form = document.getElementById('form-cotizacion');
         const output = document.getElementById('cotizacion-output');
-        form.addEventListener('submit', function(e){
+        form.addEventListener('submit', async function(e){
             e.preventDefault();
             const selectedId = parseInt(document.getElementById('tratamiento-select').value);
             if(!selectedId){
@@ -232,31 +235,47 @@
             }
             const cantidad = parseInt(document.getElementById('cantidad').value) || 1;
             const descuento = parseInt(document.querySelector('input[name=descuento]:checked').value) || 0;
-            // Usar precio base (promedio) para cálculo — es más representativo del valor real
-            const precioUnitario = tratamiento.precio;
-            const subtotal = precioUnitario * cantidad;
-            const ahorro = subtotal * (descuento/100);
-            const totalConDesc = subtotal - ahorro;
-
-            // Mostrar detalles en pantalla
-            const detalles = `\n                <p><strong>Tratamiento:</strong> ${tratamiento.nombre}</p>\n                <p><strong>Precio unitario (base):</strong> $${precioUnitario.toFixed(2)} MXN</p>\n                <p><strong>Rango estimado:</strong> ${tratamiento.precioTexto}</p>\n                <p><strong>Cantidad/unidades:</strong> ${cantidad}</p>\n                <p><strong>Subtotal:</strong> $${subtotal.toFixed(2)} MXN</p>\n                <p><strong>Descuento aplicado:</strong> ${descuento}% ( - $${ahorro.toFixed(2)} MXN )</p>\n                <h4>El costo total estimado es: $${totalConDesc.toFixed(2)} MXN</h4>\n            `;
+
+            let cotizacion = null;
+            try{
+                const resp = await fetch(form.dataset.api || '/api/cotizar/', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({items: [{id: selectedId, cantidad: cantidad}], descuento: descuento}),
+                });
+                cotizacion = await resp.json();
+                if(!resp.ok){
+                    output.textContent = cotizacion.error || 'No se pudo calcular la cotización.';
+                    return;
+                }
+            }catch(err){
+                console.warn('No se pudo calcular la cotización:', err);
+                output.textContent = 'No se pudo calcular la cotización. Intente de nuevo.';
+                return;
+            }
+
+            // Mostrar detalles en pantalla (importes calculados por el servidor)
+            const linea = cotizacion.lineas[0];
+            const desc = cotizacion.descuento;
+            const regla = desc.regla ? ` — ${desc.regla}` : '';
+            const detalles = `\n                <p><strong>Tratamiento:</strong> ${linea.nombre}</p>\n                <p><strong>Precio unitario (base):</strong> $${linea.precio_unitario} MXN</p>\n                <p><strong>Rango estimado:</strong> ${tratamiento.precioTexto}</p>\n                <p><strong>Cantidad/unidades:</strong> ${linea.cantidad}</p>\n                <p><strong>Subtotal:</strong> $${cotizacion.subtotal} MXN</p>\n                <p><strong>Descuento aplicado:</strong> ${desc.porcentaje}%${regla} ( - $${desc.monto} MXN )</p>\n                <h4>El costo total estimado es: $${cotizacion.total} MXN</h4>\n            `;
             output.innerHTML = detalles;
             // Mensaje adicional en alerta para visibilidad inmediata
-            alert('Cotización: $' + totalConDesc.toFixed(2) + ' MXN (ver detalles en la sección de cotización)');
+            alert('Cotización: $' + cotizacion.total + ' MXN (ver detalles en la sección de cotización)');
         });
     }
 
     // setupCotizador()
     // - Propósito: calcular y mostrar una cotización rápida basada en el tratamiento seleccionado,
     //   la cantidad y el descuento elegido.
-    // - Validaciones cliente: obliga a seleccionar un tratamiento; calcula usando `tratamiento.precio`.
+    // - Validaciones cliente: obliga a seleccionar un tratamiento; el cálculo (Decimal, reglas de
+    //   descuento) lo hace el servidor en `/api/cotizar/`.
     // - Resultado: muestra HTML con detalles y muestra un alert con el total estimado.
-    // - Importante: los precios y disponibilidad deben validarse en el servidor antes de cualquier cobro.
 
     // Solicitud de cita (vinculada a CitaDental)
     // - Renderiza checkboxes de tratamientos (desde `tratamientos`)
     // - Permite seleccionar hasta 2 tratamientos
-    // - Valida que no haya otra cita a la misma hora (comparando año/mes/día/hora)
+    // - Deshabilita los horarios ya ocupados (consulta `/api/disponibilidad/` por día)
     // - Guarda la cita en localStorage bajo la clave 'citas' (simulación de backend)
     function setupAppointmentForm(){
         const form = document.getElementById('appointment-form');
@@ -279,6 +298,52 @@
             checkboxesContainer.appendChild(wrapper);
         });
 
+        // Horarios: al elegir el día se consultan las horas libres y se
+        // deshabilitan las ocupadas, antes de enviar el formulario.
+        if(dateInput){
+            const hoy = new Date();
+            dateInput.min = `${hoy.getFullYear()}-${String(hoy.getMonth() + 1).padStart(2, '0')}-${String(hoy.getDate()).padStart(2, '0')}`;
+            dateInput.addEventListener('change', () => cargarHorarios(dateInput.value));
+        }
+
+        async function cargarHorarios(dia){
+            if(!timeInput) return;
+            timeInput.innerHTML = '';
+            timeInput.disabled = true;
+            if(!dia){
+                timeInput.add(new Option('Elige primero el día', ''));
+                return;
+            }
+            let info = null;
+            try{
+                const resp = await fetch(`/api/disponibilidad/?desde=${dia}&hasta=${dia}`);
+                if(resp.ok){
+                    const data = await resp.json();
+                    info = (data.dias || []).find(d => d.fecha === dia) || {libres: [], ocupadas: []};
+                }
+            }catch(err){
+                console.warn('No se pudo consultar la disponibilidad:', err);
+            }
+            if(dateInput.value !== dia) return; // el usuario cambió de día mientras tanto
+            if(!info){
+                timeInput.add(new Option('No se pudo consultar la disponibilidad', ''));
+                return;
+            }
+            const horas = info.libres.map(h => [h, false]).concat(info.ocupadas.map(h => [h, true]));
+            horas.sort((a, b) => a[0].localeCompare(b[0]));
+            if(info.libres.length === 0){
+                timeInput.add(new Option('Sin horarios libres este día', ''));
+            }else{
+                timeInput.add(new Option('Selecciona una hora', ''));
+            }
+            horas.forEach(([hora, ocupada]) => {
+                const opcion = new Option(ocupada ? `${hora} (ocupado)` : hora, hora);
+                opcion.disabled = ocupada;
+                timeInput.add(opcion);
+            });
+            timeInput.disabled = info.libres.length === 0;
+        }
+
         // Enforce max 2 checkboxes selected
         checkboxesContainer.addEventListener('change', function(e){
             const checked = checkboxesContainer.querySelectorAll('input[type=checkbox]:checked');
@@ -342,11 +407,54 @@
                 return;
             }
 
-            // No localStorage save anymore - submission will be handled server-side.
-            // Optionally, we could disable the submit button here to avoid double submits.
-            // Allow the form to submit normally to Django view which will perform server-side checks.
+            // Envío asíncrono a la API JSON: una respuesta pequeña en lugar de
+            // redirigir y recargar toda la página. Sin `fetch` (o sin
+            // `data-api`) se deja el envío tradicional del formulario.
+            if(!window.fetch || !form.dataset.api) return;
+            e.preventDefault();
+            enviarSolicitud({
+                nombre: nombre,
+                telefono: telefono,
+                correo: correo,
+                tratamientos: selected,
+                fecha_cita: fechaVal,
+            });
         });
 
+        async function enviarSolicitud(datos){
+            const boton = form.querySelector('button[type=submit]');
+            const csrf = form.querySelector('input[name=csrfmiddlewaretoken]');
+            if(boton) boton.disabled = true;
+            try{
+                const resp = await fetch(form.dataset.api, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': csrf ? csrf.value : '',
+                    },
+                    body: JSON.stringify(datos),
+                });
+                const data = await resp.json().catch(() => ({}));
+                if(resp.ok){
+                    showAlert(data.mensaje || 'La cita fue solicitada correctamente.', 'success');
+                    form.reset();
+                    cargarHorarios('');
+                    return;
+                }
+                const errores = Object.values(data.errores || {});
+                showAlert(errores.length ? errores.join(' ') : 'No se pudo registrar la cita.', 'danger');
+                if(resp.status === 409 && dateInput){
+                    // La hora se ocupó mientras tanto: refrescar los horarios del día.
+                    cargarHorarios(dateInput.value);
+                }
+            }catch(err){
+                console.warn('No se pudo enviar la solicitud:', err);
+                showAlert('No se pudo enviar la solicitud. Intente de nuevo.', 'danger');
+            }finally{
+                if(boton) boton.disabled = false;
+            }
+        }
+
         function showAlert(msg, type){
             if(alertBox){
                 alertBox.style.display = 'block';
@@ -366,36 +474,41 @@
     //   * máximo 2 tratamientos seleccionados (en el DOM)
     //   * `fecha` y `hora` presentes y parseables
     //   * `correo` (si existe) coincide con `emailRegex`
-    // - Nota importante: la comprobación de citas duplicadas por hora NO se hace aquí en el cliente,
-    //   sino en el servidor (Django) — el cliente solo prepara `fecha-cita` en formato ISO para el envío.
+    // - Horarios: al cambiar el día se llama a `/api/disponibilidad/` y el select `#hora-cita`
+    //   muestra las horas del horario de atención con las ocupadas deshabilitadas.
+    // - Nota importante: la comprobación definitiva de citas duplicadas por hora se hace en el
+    //   servidor (Django) — el cliente solo prepara `fecha-cita` en formato ISO para el envío.
     // - Comportamiento: si la validación cliente falla se previene el submit y se muestra alerta; si pasa,
-    //   se permite el envío tradicional al servidor que realizará validaciones definitivas.
+    //   se envía con `fetch` a la API JSON (`data-api` del formulario, `/api/citas/`), que aplica las
+    //   mismas validaciones que `solicitar_cita` y responde con errores por campo. Si `fetch` no está
+    //   disponible se usa el envío tradicional del formulario.
 
     // Galería simple
     function renderGaleria(){
         const grid = document.getElementById('galeria-grid');
-        // Use local images from assets/img for the gallery carousel
-        // Only use images that start with 'equipo' or 'instalaciones'
-        // Usar rutas absolutas al static para evitar problemas de resolución
-        const urls = [
-            '/static/img/equipo1.png',
-            '/static/img/equipo2.png',
-            '/static/img/equipo3.png',
-            '/static/img/instalaciones1.png',
-            '/static/img/instalaciones2.png',
-            '/static/img/instalaciones3.png',
-            '/static/img/instalaciones4.png'
-        ];
+        // Imágenes incrustadas por la plantilla (`#galeria-data`): URL del original
+        // (con hash de collectstatic) y fuentes WebP/AVIF con srcset.
+        // Sin ese bloque se usan los originales de /static/img/.
+        const imagenes = readEmbeddedGaleria() || [
+            'equipo1', 'equipo2', 'equipo3',
+            'instalaciones1', 'instalaciones2', 'instalaciones3', 'instalaciones4'
+        ].map(nombre => ({src: `/static/img/${nombre}.png`, fuentes: []}));
 
         const indicators = document.getElementById('galeria-indicators');
         grid.innerHTML = '';
         indicators.innerHTML = '';
 
-        urls.forEach((u, idx) => {
+        imagenes.forEach((imagen, idx) => {
             const item = document.createElement('div');
             item.className = 'carousel-item' + (idx === 0 ? ' active' : '');
+            // La primera se ve al cargar; las demás se descargan al acercarse.
+            const carga = idx === 0 ? 'eager' : 'lazy';
+            const medidas = imagen.ancho && imagen.alto ? ` width="${imagen.ancho}" height="${imagen.alto}"` : '';
+            const fuentes = (imagen.fuentes || [])
+                .map(f => `<source type="${f.tipo}" srcset="${f.srcset}" sizes="100vw">`)
+                .join('');
             item.innerHTML = `
-                <img src="${u}" class="gallery-img d-block w-100" loading="lazy" alt="Galería ${idx+1}">
+                <picture>${fuentes}<img src="${imagen.src}" class="gallery-img d-block w-100" loading="${carga}" decoding="async"${medidas} alt="Galería ${idx+1}"></picture>
             `;
             grid.appendChild(item);
 
@@ -436,7 +549,9 @@
 
     // renderGaleria()
     // - Propósito: construir una galería/carousel a partir de rutas estáticas a imágenes.
-    // - Requiere que las imágenes estén disponibles en `/static/img/`.
+    // - Lee las imágenes de `#galeria-data` (etiqueta `{% imagenes_galeria %}`): cada item es un
+    //   `<picture>` con fuentes AVIF/WebP por ancho (`manage.py imagenes`) y carga diferida.
+    // - Sin ese bloque usa los originales de `/static/img/`.
     // - Inicializa el componente Bootstrap Carousel y gestiona indicadores.
 
     // Testimonios
@@ -569,20 +684,53 @@
     // - Propósito: resaltar el enlace de navegación correspondiente a la sección visible en pantalla.
     // - Usa offset para compensar headers fijos y recalcula en `scroll` y `resize`.
 
-    // Cargar tratamientos desde el backend y luego inicializar la app
-    async function loadTratamientosAndInit(){
+    // Lee las imágenes de la galería incrustadas por el servidor (json_script).
+    // Devuelve null si no existen o no son válidas.
+    function readEmbeddedGaleria(){
+        const el = document.getElementById('galeria-data');
+        if(!el) return null;
         try{
-            const resp = await fetch('/api/tratamientos/');
-            if(resp.ok){
-                const data = await resp.json();
-                // normalize precios (ya vienen como number desde el servidor)
-                tratamientos = Array.isArray(data) ? data : [];
-            }else{
+            const data = JSON.parse(el.textContent);
+            return Array.isArray(data) && data.length ? data : null;
+        }catch(err){
+            console.warn('Galería incrustada inválida', err);
+            return null;
+        }
+    }
+
+    // Lee el catálogo incrustado por el servidor (json_script). Devuelve null si no existe
+    // o no es válido, para que el llamador recurra al fetch.
+    function readEmbeddedTratamientos(){
+        const el = document.getElementById('tratamientos-data');
+        if(!el) return null;
+        try{
+            const data = JSON.parse(el.textContent);
+            return Array.isArray(data) ? data : null;
+        }catch(err){
+            console.warn('Catálogo incrustado inválido:', err);
+            return null;
+        }
+    }
+
+    // Cargar tratamientos (incrustados o desde el backend) y luego inicializar la app
+    async function loadTratamientosAndInit(){
+        const embedded = readEmbeddedTratamientos();
+        if(embedded){
+            tratamientos = embedded;
+        }else{
+            try{
+                const resp = await fetch('/api/tratamientos/');
+                if(resp.ok){
+                    const data = await resp.json();
+                    // normalize precios (ya vienen como number desde el servidor)
+                    tratamientos = Array.isArray(data) ? data : [];
+                }else{
+                    tratamientos = [];
+                }
+            }catch(err){
+                console.warn('No se pudieron cargar los tratamientos:', err);
                 tratamientos = [];
             }
-        }catch(err){
-            console.warn('No se pudieron cargar los tratamientos:', err);
-            tratamientos = [];
         }
 
         // Inicializar componentes que dependen de tratamientos
@@ -599,7 +747,8 @@
 
     // Punto de entrada
     // - Se espera que el DOM esté cargado antes de inicializar: se llama a `loadTratamientosAndInit()`.
-    // - `loadTratamientosAndInit()` realiza fetch a `/api/tratamientos/`, crea la UI y enlaza eventos.
+    // - `loadTratamientosAndInit()` toma los tratamientos incrustados (o hace fetch a
+    //   `/api/tratamientos/` si faltan), crea la UI y enlaza eventos.
     document.addEventListener('DOMContentLoaded', loadTratamientosAndInit);
 
 })();
@@ -0,0 +1,69 @@
+"""
+Etiquetas de plantilla para imágenes y videos de la landing.
+
+`{% load medios %}` y luego:
+- `{% imagen 'img/equipo2.png' alt='Equipo dental' class='img-fluid' sizes='50vw' %}`:
+  `<picture>` con fuentes AVIF/WebP (`srcset` por ancho), `loading="lazy"`,
+  `decoding="async"` y `width`/`height` del original (evita saltos de
+  diseño). Sin derivadas genera solo el `<img>` con el original.
+- `{% imagenes_galeria 'img/a.png' 'img/b.png' as galeria %}`: los mismos
+  datos como lista, para pasarlos a JS con `json_script` (galería de `main.js`).
+- `{% video_atributos 'img/poster.png' %}`: `autoplay`/`preload`/`poster` de
+  un `<video>` según `VIDEO_AUTOPLAY`, `VIDEO_PRELOAD` y `VIDEO_POSTER_ANCHO`.
+"""
+
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from app.imagenes import datos_imagen, url_poster
+
+register = template.Library()
+
+SIZES_POR_DEFECTO = '100vw'
+
+
+@register.simple_tag
+def imagen(nombre, alt='', sizes=SIZES_POR_DEFECTO, lazy=True, **atributos):
+	datos = datos_imagen(nombre)
+	extras = dict(atributos)
+	if datos['ancho'] and datos['alto']:
+		extras.setdefault('width', datos['ancho'])
+		extras.setdefault('height', datos['alto'])
+	if lazy:
+		extras.setdefault('loading', 'lazy')
+	extras.setdefault('decoding', 'async')
+	img = format_html(
+		'<img src="{}" alt="{}"{}>',
+		datos['src'],
+		alt,
+		format_html_join('', ' {}="{}"', sorted(extras.items())),
+	)
+	if not datos['fuentes']:
+		return img
+	fuentes = format_html_join(
+		'',
+		'<source type="{}" srcset="{}" sizes="{}">',
+		((fuente['tipo'], fuente['srcset'], sizes) for fuente in datos['fuentes']),
+	)
+	return format_html('<picture>{}{}</picture>', fuentes, img)
+
+
+@register.simple_tag
+def imagenes_galeria(*nombres):
+	return [datos_imagen(nombre) for nombre in nombres]
+
+
+@register.simple_tag
+def video_atributos(poster=None):
+	atributos = []
+	if getattr(settings, 'VIDEO_AUTOPLAY', True):
+		atributos.append(('autoplay', None))
+	atributos.append(('preload', getattr(settings, 'VIDEO_PRELOAD', 'metadata')))
+	ancho = getattr(settings, 'VIDEO_POSTER_ANCHO', 1440)
+	if poster and ancho:
+		atributos.append(('poster', url_poster(poster, ancho)))
+	return format_html_join(
+		' ', '{}{}',
+		((nombre, format_html('="{}"', valor) if valor is not None else '') for nombre, valor in atributos),
+	)
@@ -21,6 +21,9 @@ urlpatterns = [
     path('eliminar/<int:id>/', views.eliminar, name='eliminar'),
     # Rutas para Citas (CRUD)
     path('citas/', views.citas_listar, name='citas_listar'),
+    # Búsqueda de pacientes en citas y reservaciones
+    path('buscar/', views.buscar, name='buscar'),
+    path('citas/exportar/', views.citas_exportar, name='citas_exportar'),
     path('citas/crear/', views.citas_crear, name='citas_crear'),
     path('citas/editar/<int:id>/', views.citas_editar, name='citas_editar'),
     path('citas/eliminar/<int:id>/', views.citas_eliminar, name='citas_eliminar'),
@@ -32,6 +35,7 @@ urlpatterns = [
     path('tratamientos/eliminar/<int:id>/', views.tratamientos_eliminar, name='tratamientos_eliminar'),
     # Rutas para Reservaciones (CRUD)
     path('reservaciones/', views.reservaciones_listar, name='reservaciones_listar'),
+    path('reservaciones/exportar/', views.reservaciones_exportar, name='reservaciones_exportar'),
     path('reservaciones/crear/', views.reservaciones_crear, name='reservaciones_crear'),
     path('reservaciones/editar/<int:id>/', views.reservaciones_editar, name='reservaciones_editar'),
     path('reservaciones/eliminar/<int:id>/', views.reservaciones_eliminar, name='reservaciones_eliminar'),
@@ -41,10 +45,20 @@ urlpatterns = [
     path('usuarios/crear/', views.usuarios_crear, name='usuarios_crear'),
     path('usuarios/editar/<int:id>/', views.usuarios_editar, name='usuarios_editar'),
     path('usuarios/eliminar/<int:id>/', views.usuarios_eliminar, name='usuarios_eliminar'),
+    # Importación masiva de datos (CSV / JSON)
+    path('importar/', views.importar_datos, name='importar_datos'),
     # Solicitar cita (form tradicional POST)
     path('solicitar-cita/', views.solicitar_cita, name='solicitar_cita'),
+    # API: solicitar cita (JSON, usada por main.js con fetch)
+    path('api/citas/', views.api_solicitar_cita, name='api_solicitar_cita'),
     # API: lista de tratamientos (JSON)
     path('api/tratamientos/', views.tratamientos_json, name='api_tratamientos'),
+    # API: cotizador (cálculo de precios en el servidor)
+    path('api/cotizar/', views.api_cotizar, name='api_cotizar'),
+    # API: horarios libres para citas (JSON)
+    path('api/disponibilidad/', views.disponibilidad_json, name='api_disponibilidad'),
+    # API: métricas de rendimiento por ruta (solo personal)
+    path('api/metricas/', views.metricas_json, name='api_metricas'),
     # Registro de usuario (signup)
     path('accounts/signup/', views.signup, name='signup'),
 ]
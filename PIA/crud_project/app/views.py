@@ -8,29 +8,53 @@ Notas rápidas:
 - Muchas vistas usan `messages` para feedback al usuario.
 - Se usan decoradores de autorización (`login_required` y `group_required`)
   para restringir el acceso a ciertas acciones administrativas.
+- Las vistas de solo lectura (landing, listados, búsqueda y APIs GET) llevan
+  `@lectura_en_replica`: con réplica configurada sus consultas van a ella
+  (ver `app/replicas.py`).
 """
 
+import json
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 from functools import wraps
+from urllib.parse import urlencode
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate
 from django.contrib.auth import login as auth_login
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import make_password
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
 from django.core.validators import validate_email
-from django.db import transaction
-from django.http import HttpResponseForbidden, JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-
-from .models import CitaDental, Reservacion, Tratamiento, Usuario
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
+
+from . import exportacion
+from .busqueda import MIN_CARACTERES, buscar as buscar_pacientes
+from .catalogo import catalogo_tratamientos
+from .cotizador import CotizacionInvalida, cotizar, cotizar_lote
+from .cuentas import CuentaDuplicada, crear_cuenta, guardar_cuenta
+from .dashboard import resumen_dashboard
+from .disponibilidad import MAX_ANTICIPACION, MAX_DIAS, disponibilidad
+from .importacion import FORMATOS, MODELOS, abrir_texto, importar, leer_filas
+from .limites import ip_cliente, limitador
+from .metricas import registro as registro_metricas
+from .models import CitaDental, Reservacion, Tratamiento, franja_de
+from .paginacion import paginar_keyset
+from .replicas import lectura_en_replica
+from .roles import banderas_roles, id_grupo, nombres_grupos, tiene_grupo
 
 # ======= Resumen de dependencias y modelos =======
-# - `CitaDental`, `Reservacion`, `Tratamiento`, `Usuario`: modelos usados en las vistas.
+# - `CitaDental`, `Reservacion`, `Tratamiento`: modelos usados en las vistas; `User` y su
+#   espejo `Usuario` se escriben con `app.cuentas`.
 # - Utilizamos utilidades de Django: `messages`, `auth`, `decorators`, `transaction`.
 # - Las vistas devuelven `render`, `redirect` o `JsonResponse` según corresponda.
 
@@ -51,14 +75,91 @@ def _is_past_day(dt_obj):
 	return target_date < today
 
 
+@lectura_en_replica
 def index(request):
 	"""Renderiza la landing page (index.html) ubicada en `app/templates/index.html`."""
-	return render(request, 'index.html')
+	return render(request, 'index.html', {'tratamientos': catalogo_tratamientos()['data']})
 
 # Public view - Página principal
 # - Método: GET
 # - Template: `index.html`
 # - No requiere autenticación.
+# - Incrusta el catálogo de tratamientos (misma cache que `/api/tratamientos/`) con
+#   `json_script`, así `main.js` no necesita una segunda petición para pintarlo.
+
+
+_FALTAN_DATOS = 'Faltan datos requeridos. Por favor complete nombre, teléfono, fecha y al menos un tratamiento.'
+_HORARIO_OCUPADO = 'Ya existe una cita en esa hora. Elija otro horario.'
+_CITA_SOLICITADA = 'La cita fue solicitada correctamente. Nos pondremos en contacto para confirmar.'
+
+
+def _validar_solicitud_cita(nombre, telefono, correo, tratamientos_ids, fecha_val):
+	"""Valida una solicitud pública de cita (formulario o JSON).
+
+	Devuelve `(fecha, ids_tratamientos, errores)`; `errores` es un dict
+	`{campo: mensaje}` en el orden en que se validan los campos.
+	"""
+	errores = {}
+	if not nombre:
+		errores['nombre'] = 'El nombre es obligatorio.'
+	if not telefono:
+		errores['telefono'] = 'El teléfono es obligatorio.'
+
+	ids = []
+	if not tratamientos_ids:
+		errores['tratamientos'] = 'Seleccione al menos un tratamiento.'
+	elif len(tratamientos_ids) > 2:
+		errores['tratamientos'] = 'Sólo se permiten hasta 2 tratamientos por solicitud.'
+	else:
+		try:
+			ids = [int(i) for i in tratamientos_ids]
+		except (TypeError, ValueError):
+			errores['tratamientos'] = 'Tratamiento inválido.'
+
+	if correo:
+		try:
+			validate_email(correo)
+		except ValidationError:
+			errores['correo'] = 'El correo proporcionado no es válido.'
+
+	fecha = None
+	if not fecha_val:
+		errores['fecha_cita'] = 'La fecha es obligatoria.'
+	else:
+		try:
+			fecha = parse_datetime(fecha_val) or datetime.fromisoformat(fecha_val)
+		except (TypeError, ValueError):
+			fecha = None
+		if fecha is None:
+			errores['fecha_cita'] = 'Formato de fecha inválido.'
+		elif _is_past_day(fecha):
+			errores['fecha_cita'] = 'La fecha debe ser igual o posterior a hoy.'
+	return fecha, ids, errores
+
+# Helper - Validación de la solicitud pública de cita
+# - Compartido por `solicitar_cita` (formulario) y `api_solicitar_cita` (JSON) para
+#   que ambos apliquen exactamente las mismas reglas y mensajes.
+
+
+def _crear_cita_publica(nombre, telefono, correo, fecha, tratamientos_ids):
+	"""Crea la cita y asocia sus tratamientos en una transacción.
+
+	Lanza `IntegrityError` si la franja horaria ya está ocupada.
+	"""
+	# El choque de horario (mismo año/mes/día/hora) lo rechaza la restricción
+	# única sobre `franja_hora`, también entre solicitudes simultáneas; los ids
+	# de tratamiento inexistentes se ignoran.
+	with transaction.atomic():
+		cita = CitaDental.objects.create(
+			nombre_paciente=nombre,
+			fecha_cita=fecha,
+			telefono=telefono,
+			correo=correo or None,
+		)
+		tratamientos_objs = Tratamiento.objects.filter(id__in=tratamientos_ids)[:2]
+		if tratamientos_objs:
+			cita.tratamientos.set(tratamientos_objs)
+	return cita
 
 
 def solicitar_cita(request):
@@ -78,92 +179,196 @@ def solicitar_cita(request):
 
 	# Validaciones básicas
 	if not nombre or not telefono or not fecha_val or not tratamientos_ids:
-		messages.error(request, 'Faltan datos requeridos. Por favor complete nombre, teléfono, fecha y al menos un tratamiento.')
+		messages.error(request, _FALTAN_DATOS)
 		return redirect('home')
 
+	fecha, tratamientos_ids, errores = _validar_solicitud_cita(nombre, telefono, correo, tratamientos_ids, fecha_val)
+	if errores:
+		messages.error(request, next(iter(errores.values())))
+		return redirect('home')
+
+	try:
+		_crear_cita_publica(nombre, telefono, correo, fecha, tratamientos_ids)
+	except IntegrityError:
+		messages.error(request, _HORARIO_OCUPADO)
+		return redirect('home')
+
+	messages.success(request, _CITA_SOLICITADA)
+	return redirect('home')
+
 # Vista pública para solicitar cita
 # - Recibe datos por POST provenientes del formulario público.
-# - Valida campos mínimos, formato de correo y fecha futura.
-# - Evita duplicados por hora: si ya hay una cita a la misma hora devuelve error.
+# - Valida campos mínimos, formato de correo y fecha futura (`_validar_solicitud_cita`).
+# - Evita duplicados por hora: la restricción única de `franja_hora` rechaza la
+#   inserción si ya hay una cita activa a la misma hora y se devuelve error.
 # - Crea un registro `CitaDental` y asocia hasta 2 `Tratamiento`.
 
-	if len(tratamientos_ids) > 2:
-		messages.error(request, 'Sólo se permiten hasta 2 tratamientos por solicitud.')
-		return redirect('home')
 
-	if correo:
+@require_POST
+def api_solicitar_cita(request):
+	"""Versión JSON de `solicitar_cita` (la usa `main.js` con `fetch`)."""
+	if request.content_type == 'application/json':
 		try:
-			validate_email(correo)
-		except ValidationError:
-			messages.error(request, 'El correo proporcionado no es válido.')
-			return redirect('home')
+			datos = json.loads(request.body or b'{}')
+		except ValueError:
+			return JsonResponse({'errores': {'__all__': 'JSON inválido.'}}, status=400)
+		if not isinstance(datos, dict):
+			return JsonResponse({'errores': {'__all__': 'Se esperaba un objeto JSON.'}}, status=400)
+		tratamientos_ids = datos.get('tratamientos') or []
+		if not isinstance(tratamientos_ids, list):
+			tratamientos_ids = [tratamientos_ids]
+	else:
+		datos = request.POST
+		tratamientos_ids = request.POST.getlist('tratamiento[]') or request.POST.getlist('tratamientos')
+
+	nombre = str(datos.get('nombre') or '').strip()
+	telefono = str(datos.get('telefono') or '').strip()
+	correo = str(datos.get('correo') or '').strip()
+	fecha_val = str(datos.get('fecha_cita') or datos.get('fecha-cita') or '').strip()
+
+	fecha, tratamientos_ids, errores = _validar_solicitud_cita(nombre, telefono, correo, tratamientos_ids, fecha_val)
+	if errores:
+		return JsonResponse({'errores': errores}, status=400)
 
-	# Parsear fecha
-	fecha = parse_datetime(fecha_val)
-	if fecha is None:
-		# intentar parse simple reemplazando espacio T si es necesario
-		try:
-			from datetime import datetime
-			fecha = datetime.fromisoformat(fecha_val)
-		except Exception:
-			fecha = None
+	try:
+		cita = _crear_cita_publica(nombre, telefono, correo, fecha, tratamientos_ids)
+	except IntegrityError:
+		dia = timezone.localtime(franja_de(fecha)).date()
+		dias = disponibilidad(dia, dia)
+		return JsonResponse({
+			'errores': {'fecha_cita': _HORARIO_OCUPADO},
+			'libres': dias[0]['libres'] if dias else [],
+		}, status=409)
+
+	return JsonResponse({
+		'id': cita.pk,
+		'fecha_cita': timezone.localtime(cita.franja_hora).isoformat(),
+		'mensaje': _CITA_SOLICITADA,
+	}, status=201)
+
+# API pública para solicitar cita (JSON)
+# - Método: POST con cuerpo JSON (`nombre`, `telefono`, `correo`, `tratamientos`: [ids],
+#   `fecha_cita`) o un formulario con los mismos nombres que `solicitar_cita`.
+# - Protegida por CSRF igual que el formulario (`main.js` envía `X-CSRFToken`).
+# - Respuestas: 201 con la cita creada; 400 con `errores` por campo; 409 si la hora
+#   ya está ocupada, junto con las horas libres de ese día.
+
+
+@cache_control(public=True, max_age=60)
+@condition(
+	etag_func=lambda request: catalogo_tratamientos()['etag'],
+	last_modified_func=lambda request: catalogo_tratamientos()['last_modified'],
+)
+@lectura_en_replica
+def tratamientos_json(request):
+	"""Devuelve la lista de tratamientos en formato JSON para que el frontend los consuma.
+	   Cada objeto incluye id, nombre, descripcion, precio (float) y precioTexto.
+	"""
+	return HttpResponse(catalogo_tratamientos()['json'], content_type='application/json')
 
-	if fecha is None:
-		messages.error(request, 'Formato de fecha inválido.')
-		return redirect('home')
+# API simple para listar tratamientos
+# - Uso desde JavaScript: consume un arreglo JSON con detalles (id, nombre, descripcion, precio).
+# - No requiere autenticación.
+# - El JSON sale ya serializado de la cache del catálogo (`app.catalogo`), que se
+#   invalida al guardar/eliminar un `Tratamiento`.
+# - Responde con `ETag`/`Last-Modified` y `Cache-Control: public`; `condition`
+#   contesta 304 si el cliente (o un proxy) ya tiene la versión vigente.
 
-	if _is_past_day(fecha):
-		messages.error(request, 'La fecha debe ser igual o posterior a hoy.')
-		return redirect('home')
 
-	# Comprobar conflicto (mismo año/mes/día/hora)
-	conflict = CitaDental.objects.filter(
-		fecha_cita__year=fecha.year,
-		fecha_cita__month=fecha.month,
-		fecha_cita__day=fecha.day,
-		fecha_cita__hour=fecha.hour,
-	).exists()
+@csrf_exempt
+@require_POST
+def api_cotizar(request):
+	"""Cotiza uno o varios conjuntos de tratamientos (cuerpo JSON)."""
+	try:
+		datos = json.loads(request.body or b'{}')
+	except ValueError:
+		return JsonResponse({'error': 'JSON inválido.'}, status=400)
+	if not isinstance(datos, dict):
+		return JsonResponse({'error': 'Se esperaba un objeto JSON.'}, status=400)
+	try:
+		if 'cotizaciones' in datos:
+			return JsonResponse({'cotizaciones': cotizar_lote(datos['cotizaciones'])})
+		return JsonResponse(cotizar(datos.get('items'), datos.get('descuento', 0)))
+	except CotizacionInvalida as exc:
+		return JsonResponse({'error': str(exc)}, status=400)
+
+# API del cotizador
+# - Pública y sin efectos secundarios (solo calcula), por eso no exige CSRF y la
+#   puede llamar la herramienta del call center.
+# - Cuerpo: `{"items": [{"id": 1, "cantidad": 2}], "descuento": 10}` o, para varias
+#   combinaciones a la vez, `{"cotizaciones": [{...}, {...}]}`.
+# - Importes calculados con `Decimal` sobre la tabla de precios en memoria
+#   (`app/cotizador.py`); se devuelven como texto con dos decimales.
+
+
+@cache_control(max_age=30)
+@lectura_en_replica
+def disponibilidad_json(request):
+	"""Horarios libres y ocupados por día (`?desde=YYYY-MM-DD&hasta=YYYY-MM-DD`)."""
+	hoy = timezone.localdate()
+	try:
+		desde = parse_date(request.GET.get('desde', '')) or hoy
+		hasta = parse_date(request.GET.get('hasta', ''))
+	except ValueError:
+		return JsonResponse({'error': 'Fecha inválida; use el formato YYYY-MM-DD.'}, status=400)
+	desde = max(desde, hoy)
+	# Antes de sumar días: cerca de 9999-12-31 `date + timedelta` desborda.
+	if desde > hoy + timedelta(days=MAX_ANTICIPACION):
+		return JsonResponse({'error': f'Solo se pueden consultar los próximos {MAX_ANTICIPACION} días.'}, status=400)
+	hasta = hasta or desde + timedelta(days=13)
+	if hasta < desde:
+		return JsonResponse({'error': '`hasta` debe ser igual o posterior a `desde`.'}, status=400)
+	if (hasta - desde).days >= MAX_DIAS:
+		return JsonResponse({'error': f'El rango máximo es de {MAX_DIAS} días.'}, status=400)
+	return JsonResponse({
+		'desde': desde.isoformat(),
+		'hasta': hasta.isoformat(),
+		'dias': disponibilidad(desde, hasta),
+	})
+
+# API de disponibilidad
+# - Pública (la usa el formulario de `index.html` para deshabilitar horarios tomados).
+# - Por defecto devuelve 14 días a partir de hoy; máximo `MAX_DIAS` por petición y
+#   `desde` a no más de `MAX_ANTICIPACION` días de hoy.
+# - Las horas ocupadas salen de una consulta de rango sobre `franja_hora` y se
+#   cachean por día (ver `app/disponibilidad.py`); una cita nueva invalida su día.
 
-	if conflict:
-		messages.error(request, 'Ya existe una cita en esa hora. Elija otro horario.')
-		return redirect('home')
 
-	# Crear cita
-	cita = CitaDental.objects.create(
-		nombre_paciente=nombre,
-		fecha_cita=fecha,
-		telefono=telefono,
-		correo=correo or None,
-	)
+@login_required
+def metricas_json(request):
+	"""Histogramas de latencia/consultas por ruta (solo personal `is_staff`)."""
+	if not request.user.is_staff:
+		return HttpResponseForbidden('No tienes permisos para acceder a esta página.')
+	return JsonResponse({
+		'activas': getattr(settings, 'METRICAS_ACTIVAS', False),
+		'rutas': registro_metricas.resumen(),
+		'limites': limitador.resumen(),
+	})
 
-	# Asociar tratamientos (ignorar ids inválidos)
-	tratamientos_objs = Tratamiento.objects.filter(id__in=tratamientos_ids)[:2]
-	if tratamientos_objs:
-		cita.tratamientos.set(tratamientos_objs)
+# API de métricas
+# - Devuelve p50/p95/p99/max/promedio de tiempo total, SQL, plantillas y número de
+#   consultas por nombre de ruta, tal como los registra `MetricasMiddleware`.
+# - Son métricas del proceso que atiende la petición; para combinar varios procesos
+#   usar `python manage.py metricas` (lee los volcados de `METRICAS_DIR`).
+# - `limites`: intentos permitidos/rechazados/desalojados por regla de `app.limites`.
 
-	messages.success(request, 'La cita fue solicitada correctamente. Nos pondremos en contacto para confirmar.')
-	return redirect('home')
 
+def _limitar(request, template, reglas, contexto=None):
+	"""Aplica `reglas` (`[(regla, clave)]`); si alguna se excede devuelve la respuesta 429."""
+	for regla, clave in reglas:
+		espera = limitador.permitir(regla, clave)
+		if espera is not None:
+			messages.error(request, f'Demasiados intentos. Intente de nuevo en {max(1, espera // 60)} minuto(s).')
+			response = render(request, template, contexto or {}, status=429)
+			response['Retry-After'] = str(espera)
+			return response
+	return None
 
-def tratamientos_json(request):
-	"""Devuelve la lista de tratamientos en formato JSON para que el frontend los consuma.
-	   Cada objeto incluye id, nombre, descripcion, precio (float) y precioTexto.
-	"""
-	qs = Tratamiento.objects.all()
-	data = []
-	for t in qs:
-		data.append({
-			'id': t.id,
-			'nombre': t.nombre,
-			'descripcion': t.descripcion or '',
-			'precio': float(t.precio),
-			'precioTexto': f"${t.precio} MXN",
-		})
-	return JsonResponse(data, safe=False)
 
-# API simple para listar tratamientos
-# - Uso desde JavaScript: consume un arreglo JSON con detalles (id, nombre, descripcion, precio).
-# - No requiere autenticación.
+_CUENTA_DUPLICADA = {
+	'username': 'El nombre de usuario ya está en uso.',
+	'email': 'El correo ya está en uso. Use otro correo o inicie sesión.',
+}
 
 
 def signup(request):
@@ -184,28 +389,18 @@ def signup(request):
 			messages.error(request, 'Las contraseñas no coinciden.')
 			return redirect('signup')
 
-		# Validaciones
-		if User.objects.filter(username=username).exists():
-			messages.error(request, 'El nombre de usuario ya está en uso.')
-			return redirect('signup')
-
-		# Si se proporcionó email, verificar que no exista en nuestro modelo Usuario
-		if email:
-			if Usuario.objects.filter(email=email).exists() or User.objects.filter(email=email).exists():
-				messages.error(request, 'El correo ya está en uso. Use otro correo o inicie sesión.')
-				return redirect('signup')
+		rechazo = _limitar(request, 'signup.html', [
+			('signup_ip', ip_cliente(request)),
+			('signup_usuario', username.lower()),
+		])
+		if rechazo:
+			return rechazo
 
-		# Crear ambos registros dentro de una transacción: User y Usuario espejo
+		# User y Usuario espejo con un solo hash; los duplicados los detecta la BD.
 		try:
-			with transaction.atomic():
-				user = User.objects.create_user(username=username, email=email, password=p1)
-				user.save()
-				# Crear registro espejo en el modelo Usuario (almacenar email y contraseña hasheada)
-				email_val = email if email else None
-				Usuario.objects.create(email=email_val, password=make_password(p1))
-		except Exception:
-			# Rollback automático por atomic(); informar al usuario
-			messages.error(request, 'Error al crear la cuenta. Por favor intente nuevamente.')
+			crear_cuenta(username, email, p1)
+		except CuentaDuplicada as exc:
+			messages.error(request, _CUENTA_DUPLICADA[exc.campo])
 			return redirect('signup')
 
 		# Redirigir al login para que el usuario compruebe sus credenciales
@@ -216,8 +411,12 @@ def signup(request):
 	return render(request, 'signup.html')
 
 # Registro de usuario
-# - POST: valida datos, evita duplicados y crea dos registros: `User` y `Usuario` (espejo).
-# - Se usa `transaction.atomic()` para que la creación sea atómica.
+# - POST: valida datos y crea dos registros: `User` y `Usuario` (espejo), con
+#   `app.cuentas.crear_cuenta` (un solo hash de la contraseña, una transacción).
+# - El usuario repetido se detecta por la restricción única al insertar; el correo,
+#   con una consulta en `auth_user` (no es único y hay cuentas sin espejo).
+# - Límite de intentos por IP y por usuario (`app.limites`): al excederlo responde
+#   429 con `Retry-After` antes de hashear la contraseña.
 # - Mensajes al usuario mediante `messages` y redirección a `login`.
 
 
@@ -227,8 +426,16 @@ def login_view(request):
 		username = request.POST.get('username')
 		password = request.POST.get('password')
 		next_url = request.POST.get('next') or 'listar'
+		# Antes de `authenticate`: un intento rechazado no calcula el hash.
+		rechazo = _limitar(request, 'login.html', [
+			('login_ip', ip_cliente(request)),
+			('login_usuario', (username or '').lower()),
+		], {'next': request.POST.get('next', '')})
+		if rechazo:
+			return rechazo
 		user = authenticate(request, username=username, password=password)
 		if user:
+			limitador.olvidar('login_usuario', (username or '').lower())
 			auth_login(request, user)
 			return redirect(next_url)
 		messages.error(request, 'Credenciales inválidas. Intente de nuevo.')
@@ -239,39 +446,33 @@ def login_view(request):
 # - POST: intenta autenticar y redirige a `next` o a `listar`.
 # - GET: muestra el formulario de login y puede recibir `next` en querystring.
 # - Usa `messages` para feedback en credenciales inválidas.
+# - Límite de intentos por IP y por usuario (`app.limites`): al excederlo responde
+#   429 con `Retry-After` sin llamar a `authenticate`. Un login correcto borra los
+#   intentos del usuario (no los de la IP).
 
 
 @login_required
+@lectura_en_replica
 def listar(request):
 	"""Renderiza el template de listado (`listar.html`)."""
-	ensure_default_groups()
-	try:
-		count_citas = CitaDental.objects.count()
-	except Exception:
-		count_citas = 0
-	try:
-		count_tratamientos = Tratamiento.objects.count()
-	except Exception:
-		count_tratamientos = 0
-
-	recent_citas = CitaDental.objects.all().order_by('-fecha_cita')[:5]
-	is_admin = False
-	is_employee = False
-	if request.user and request.user.is_authenticated:
-		is_admin = request.user.is_superuser or request.user.groups.filter(name='Administrador').exists()
-		is_employee = request.user.groups.filter(name='Empleado').exists()
+	resumen = resumen_dashboard()
+	recent_citas = CitaDental.objects.all().prefetch_related('tratamientos').order_by('-fecha_cita')[:5]
+	roles = banderas_roles(request.user)
 	return render(request, 'listar.html', {
-		'count_citas': count_citas,
-		'count_tratamientos': count_tratamientos,
+		'resumen': resumen,
+		'count_citas': resumen['total_citas'],
+		'count_tratamientos': resumen['total_tratamientos'],
 		'recent_citas': recent_citas,
-		'is_admin': is_admin,
-		'is_employee': is_employee,
+		'is_admin': roles['is_admin'],
+		'is_employee': roles['is_employee'],
 	})
 
 # Dashboard administrativo / resumen
 # - Requiere login.
 # - Muestra contadores y últimas citas para dar una vista rápida al usuario autenticado.
-# - Calcula flags `is_admin` y `is_employee` para condicionar la UI.
+# - Los contadores salen de `app.dashboard.resumen_dashboard()`: una sola consulta
+#   agregada, cacheada unos segundos e invalidada al cambiar citas/tratamientos/reservaciones.
+# - Toma `is_admin` e `is_employee` de `app.roles` (grupos cargados una vez por request).
 
 
 def group_required(*group_names):
@@ -283,7 +484,7 @@ def group_required(*group_names):
 				return redirect('login')
 			if request.user.is_superuser:
 				return view_func(request, *args, **kwargs)
-			if request.user.groups.filter(name__in=group_names).exists():
+			if tiene_grupo(request.user, *group_names):
 				return view_func(request, *args, **kwargs)
 			return HttpResponseForbidden('No tienes permisos para acceder a esta página.')
 		return _wrapped
@@ -293,55 +494,165 @@ def group_required(*group_names):
 # - Usa grupos de Django para controlar acceso (ej: 'Administrador', 'Empleado').
 # - Si el usuario es `superuser` se permite el acceso automáticamente.
 # - Si no está autenticado redirige a `login`, si no pertenece a los grupos retorna 403.
-
-
-def ensure_default_groups():
-	"""Garantiza que existan los grupos base y permisos de módulos."""
-	try:
-		for name in ('Administrador', 'Empleado', 'Permiso Citas', 'Permiso Tratamientos'):
-			Group.objects.get_or_create(name=name)
-	except Exception:
-		pass
-
-# Inicialización de grupos por defecto
-# - Se puede llamar antes de mostrar listas de usuarios o al iniciar ciertos workflows.
-# - Silenciosamente ignora errores para evitar romper vistas por problemas en el ORM.
+# - La pertenencia se resuelve con `app.roles`, que reutiliza los grupos ya cargados.
 
 
 def assign_user_groups(user_obj, role_admin=False, role_employee=False, perm_citas=False, perm_tratamientos=False):
 	"""Asigna grupos al usuario según los flags enviados."""
-	ensure_default_groups()
-	group_map = {
-		'admin': Group.objects.get(name='Administrador'),
-		'employee': Group.objects.get(name='Empleado'),
-		'citas': Group.objects.get(name='Permiso Citas'),
-		'tratamientos': Group.objects.get(name='Permiso Tratamientos'),
-	}
-	user_obj.groups.clear()
-	if role_admin:
-		user_obj.groups.add(group_map['admin'])
-	if role_employee:
-		user_obj.groups.add(group_map['employee'])
-	if perm_citas:
-		user_obj.groups.add(group_map['citas'])
-	if perm_tratamientos:
-		user_obj.groups.add(group_map['tratamientos'])
+	seleccion = (
+		(role_admin, 'Administrador'),
+		(role_employee, 'Empleado'),
+		(perm_citas, 'Permiso Citas'),
+		(perm_tratamientos, 'Permiso Tratamientos'),
+	)
+	user_obj.groups.set([id_grupo(nombre) for activo, nombre in seleccion if activo])
 
 # Función utilitaria para asignar roles y permisos a un `User`:
 # - `role_admin`, `role_employee`: roles de alto nivel.
 # - `perm_citas`, `perm_tratamientos`: permisos por módulo.
-# - Primero limpia los grupos existentes y luego asigna los seleccionados.
+# - Deja al usuario exactamente con los grupos seleccionados (`groups.set`).
+# - Los ids de grupo salen del mapa en memoria de `app.roles` (sin consultar `auth_group`);
+#   los grupos base se crean tras `migrate` (ver `app.roles.ensure_default_groups`).
+# - Los cambios disparan `m2m_changed`, que invalida la cache de roles del usuario
+#   (ver `app/signals.py`).
+
+
+CITAS_POR_PAGINA = 25
+
+
+def _inicio_del_dia(dia):
+	"""Datetime (aware) de las 00:00 del `dia` en la zona horaria actual."""
+	return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _filtros_citas(params):
+	"""Lee del querystring los filtros válidos del listado de citas.
+
+	Claves: `estatus` (uno de ESTATUS_CHOICES), `desde`/`hasta` (YYYY-MM-DD,
+	inclusivos) y `paciente` (prefijo del nombre). Valores inválidos se ignoran.
+	"""
+	filtros = {}
+	estatus = params.get('estatus', '').strip().upper()
+	if estatus in dict(CitaDental.ESTATUS_CHOICES):
+		filtros['estatus'] = estatus
+	for clave in ('desde', 'hasta'):
+		try:
+			dia = parse_date(params.get(clave, '').strip())
+		except ValueError:
+			dia = None
+		if dia:
+			filtros[clave] = dia
+	paciente = params.get('paciente', '').strip()
+	if paciente:
+		filtros['paciente'] = paciente
+	return filtros
+
+
+def _aplicar_filtros_citas(qs, filtros):
+	"""Aplica a `qs` los filtros devueltos por `_filtros_citas` (todos indexables)."""
+	if 'estatus' in filtros:
+		qs = qs.filter(estatus=filtros['estatus'])
+	if 'desde' in filtros:
+		qs = qs.filter(fecha_cita__gte=_inicio_del_dia(filtros['desde']))
+	if 'hasta' in filtros:
+		qs = qs.filter(fecha_cita__lt=_inicio_del_dia(filtros['hasta'] + timedelta(days=1)))
+	if 'paciente' in filtros:
+		# `nombre_paciente` se guarda en mayúsculas: prefijo en mayúsculas.
+		qs = qs.filter(nombre_paciente__startswith=filtros['paciente'].upper())
+	return qs
 
 
 @login_required
 @group_required('Administrador', 'Empleado', 'Permiso Citas')
+@lectura_en_replica
 def citas_listar(request):
-	qs = CitaDental.objects.all().prefetch_related('tratamientos').order_by('-fecha_cita')
-	return render(request, 'citas_listar.html', {'citas': qs})
+	filtros = _filtros_citas(request.GET)
+	qs = _aplicar_filtros_citas(CitaDental.objects.all(), filtros).prefetch_related('tratamientos')
+	pagina = paginar_keyset(
+		qs,
+		'fecha_cita',
+		despues=request.GET.get('despues'),
+		antes=request.GET.get('antes'),
+		tamano=CITAS_POR_PAGINA,
+	)
+	return render(request, 'citas_listar.html', {
+		'citas': pagina,
+		'pagina': pagina,
+		'filtros': filtros,
+		'filtros_qs': urlencode({k: str(v) for k, v in filtros.items()}),
+		'estatus_choices': CitaDental.ESTATUS_CHOICES,
+	})
 
 # CRUD Citas - Listar
 # - Requiere pertenecer a al menos uno de los grupos listados en el decorador.
-# - `prefetch_related` optimiza la carga de tratamientos relacionados.
+# - Filtros por querystring: `estatus`, rango `desde`/`hasta` y prefijo de `paciente`.
+# - Paginación por cursor (`despues`/`antes`) sobre `(fecha_cita, id)`, respaldada por
+#   índices compuestos: el costo por página no crece con el historial.
+# - `prefetch_related` carga los tratamientos solo de las citas de la página.
+
+
+def _respuesta_exportacion(request, nombre, encabezados, filas):
+	"""`StreamingHttpResponse` con el archivo en el formato pedido (`?formato=csv|xlsx`)."""
+	formato = request.GET.get('formato', 'csv').lower()
+	if formato not in exportacion.FORMATOS:
+		formato = 'csv'
+	response = StreamingHttpResponse(
+		exportacion.generar(formato, encabezados, filas, hoja=nombre.capitalize()),
+		content_type=exportacion.FORMATOS[formato],
+	)
+	archivo = f'{nombre}-{timezone.localdate():%Y%m%d}.{formato}'
+	response['Content-Disposition'] = f'attachment; filename="{archivo}"'
+	return response
+
+
+@login_required
+@group_required('Administrador', 'Empleado', 'Permiso Citas')
+def citas_exportar(request):
+	qs = _aplicar_filtros_citas(CitaDental.objects.all(), _filtros_citas(request.GET))
+	return _respuesta_exportacion(request, 'citas', exportacion.ENCABEZADOS_CITAS, exportacion.filas_citas(qs))
+
+# CRUD Citas - Exportar
+# - Mismos permisos y filtros (`estatus`, `desde`, `hasta`, `paciente`) que `citas_listar`.
+# - Devuelve CSV o XLSX (`?formato=`) en streaming; las filas se leen por bloques
+#   con `.iterator()` y los tratamientos se concatenan en la misma consulta SQL.
+
+
+@login_required
+@group_required('Administrador', 'Empleado', 'Permiso Citas')
+@lectura_en_replica
+def buscar(request):
+	termino = request.GET.get('q', '').strip()
+	# Las reservaciones solo las ven administradores y empleados (igual que su listado).
+	con_reservaciones = request.user.is_superuser or tiene_grupo(request.user, 'Administrador', 'Empleado')
+	resultado = buscar_pacientes(termino, incluir_reservaciones=con_reservaciones) if termino else None
+	if request.GET.get('formato') == 'json':
+		if resultado is None:
+			return JsonResponse({'error': f'Escriba al menos {MIN_CARACTERES} caracteres.'}, status=400)
+		return JsonResponse({
+			'tipo': resultado['tipo'],
+			'citas': [
+				{'id': c.pk, 'nombre': c.nombre_paciente, 'fecha': c.fecha_cita.isoformat(),
+				 'telefono': c.telefono, 'correo': c.correo, 'estatus': c.estatus}
+				for c in resultado['citas']
+			],
+			'reservaciones': [
+				{'id': r.pk, 'nombre': r.nombre_cliente, 'fecha': r.fecha_reservacion.isoformat(),
+				 'telefono': r.telefono, 'correo': r.correo, 'estatus': r.estatus}
+				for r in resultado['reservaciones']
+			],
+		})
+	return render(request, 'busqueda.html', {
+		'q': termino,
+		'resultado': resultado,
+		'min_caracteres': MIN_CARACTERES,
+		'con_reservaciones': con_reservaciones,
+	})
+
+# Búsqueda de pacientes
+# - Busca por prefijo de nombre (sin acentos), teléfono o correo en citas y
+#   reservaciones (`app/busqueda.py`), usando columnas indexadas.
+# - Los usuarios con solo 'Permiso Citas' no ven (ni consultan) reservaciones.
+# - `?formato=json` devuelve los mismos resultados en JSON.
 
 
 @login_required
@@ -368,12 +679,17 @@ def citas_crear(request):
 		if _is_past_day(fecha):
 			messages.error(request, 'La fecha debe ser igual o posterior a hoy.')
 			return redirect('citas_crear')
-		CitaDental.objects.create(
-			nombre_paciente=nombre,
-			telefono=telefono,
-			correo=correo or None,
-			fecha_cita=fecha
-		)
+		try:
+			with transaction.atomic():
+				CitaDental.objects.create(
+					nombre_paciente=nombre,
+					telefono=telefono,
+					correo=correo or None,
+					fecha_cita=fecha
+				)
+		except IntegrityError:
+			messages.error(request, 'Ya existe una cita en esa hora. Elija otro horario.')
+			return redirect('citas_crear')
 		messages.success(request, 'Cita creada correctamente.')
 		return redirect('citas_listar')
 	return render(request, 'citas_crear.html')
@@ -401,14 +717,20 @@ def citas_editar(request, id):
 			messages.error(request, 'La fecha debe ser igual o posterior a hoy.')
 			return redirect('citas_editar', id=id)
 		cita.fecha_cita = fecha
-		cita.save(update_fields=['fecha_cita'])
+		try:
+			with transaction.atomic():
+				cita.save(update_fields=['fecha_cita'])
+		except IntegrityError:
+			messages.error(request, 'Ya existe una cita en esa hora. Elija otro horario.')
+			return redirect('citas_editar', id=id)
 		messages.success(request, 'Cita reprogramada exitosamente')
 		return redirect('citas_listar')
 	return render(request, 'citas_editar.html', {'cita': cita})
 
 # CRUD Citas - Editar
 # - Admins y empleados pueden reprogramar la fecha de una cita.
-# - Evita poner una fecha en el pasado y guarda únicamente el campo `fecha_cita`.
+# - Evita poner una fecha en el pasado y guarda únicamente `fecha_cita` (y su `franja_hora`).
+# - Si el nuevo horario ya está ocupado la base de datos lo rechaza y se informa al usuario.
 
 
 @login_required
@@ -431,13 +753,20 @@ def citas_eliminar(request, id):
 def citas_marcar_listo(request, id):
 	cita = get_object_or_404(CitaDental, pk=id)
 	cita.estatus = CitaDental.ESTATUS_ATENDIDA
-	cita.save()
+	try:
+		with transaction.atomic():
+			cita.save(update_fields=['estatus'])
+	except IntegrityError:
+		messages.error(request, 'El horario de esta cita ya está ocupado por otra; reprográmela primero.')
+		return redirect('citas_listar')
 	messages.success(request, 'Cita marcada como atendida')
 	return redirect('citas_listar')
 
 # Acción: marcar cita como atendida
 # - Cambia el estatus interno y redirige a la lista.
 # - Útil para el flujo de trabajo del personal.
+# - Una cita cancelada cuya hora ya se volvió a reservar choca con la
+#   restricción única de franja: se informa en vez de fallar con 500.
 
 
 @login_required
@@ -523,17 +852,39 @@ def tratamientos_eliminar(request, id):
 # - Solo por POST; elimina el registro y muestra mensaje de confirmación.
 
 
+RESERVACIONES_POR_PAGINA = 25
+
+
 @login_required
 @group_required('Administrador', 'Empleado')
+@lectura_en_replica
 def reservaciones_listar(request):
-	qs = Reservacion.objects.all().order_by('-fecha_reservacion')
-	return render(request, 'reservaciones_listar.html', {'reservaciones': qs})
+	pagina = paginar_keyset(
+		Reservacion.objects.all(),
+		'fecha_reservacion',
+		despues=request.GET.get('despues'),
+		antes=request.GET.get('antes'),
+		tamano=RESERVACIONES_POR_PAGINA,
+	)
+	return render(request, 'reservaciones_listar.html', {'reservaciones': pagina, 'pagina': pagina})
 
 # CRUD Reservaciones - Listar
-# - Muestra las reservaciones ordenadas por fecha.
+# - Muestra las reservaciones ordenadas por fecha (más recientes primero).
+# - Paginación por cursor sobre `(fecha_reservacion, id)`, respaldada por un índice.
 # - Acceso restringido según roles.
 
 
+@login_required
+@group_required('Administrador', 'Empleado')
+def reservaciones_exportar(request):
+	filas = exportacion.filas_reservaciones(Reservacion.objects.all())
+	return _respuesta_exportacion(request, 'reservaciones', exportacion.ENCABEZADOS_RESERVACIONES, filas)
+
+# CRUD Reservaciones - Exportar
+# - Mismos permisos que el listado; historial completo en CSV o XLSX (`?formato=`),
+#   generado en streaming (ver `app/exportacion.py`).
+
+
 @login_required
 @group_required('Administrador')
 def reservaciones_crear(request):
@@ -613,22 +964,26 @@ def reservaciones_marcar_listo(request, id):
 # - Útil para indicar que la reservación ya fue atendida/preparada.
 
 
+USUARIOS_POR_PAGINA = 50
+
+
 @login_required
 @group_required('Administrador')
 def usuarios_listar(request):
-	ensure_default_groups()
-	qs = User.objects.all().order_by('username')
-	return render(request, 'users_list.html', {'usuarios': qs})
+	qs = User.objects.all().order_by('username').prefetch_related('groups')
+	pagina = Paginator(qs, USUARIOS_POR_PAGINA).get_page(request.GET.get('page'))
+	return render(request, 'users_list.html', {'usuarios': pagina, 'pagina': pagina})
 
 # Gestión de Usuarios - Listar
-# - Inicializa grupos (si faltan) y lista todos los `User`.
+# - Lista los `User` paginados por `username` (columna con índice único).
+# - `prefetch_related('groups')` trae los grupos de toda la página en una consulta,
+#   en lugar de una por fila al mostrar la columna "Grupos".
 # - Solo accesible por Administradores.
 
 
 @login_required
 @group_required('Administrador')
 def usuarios_crear(request):
-	ensure_default_groups()
 	if request.method == 'POST':
 		username = request.POST.get('username', '').strip()
 		email = request.POST.get('email', '').strip()
@@ -643,14 +998,15 @@ def usuarios_crear(request):
 			messages.error(request, 'Usuario y contraseña son requeridos')
 			return redirect('usuarios_listar')
 
-		if User.objects.filter(username=username).exists():
-			messages.error(request, 'El nombre de usuario ya existe')
+		try:
+			u = crear_cuenta(
+				username, email, password,
+				is_superuser=is_superuser,
+				is_staff=is_superuser or role_admin or role_employee or perm_citas or perm_tratamientos,
+			)
+		except CuentaDuplicada as exc:
+			messages.error(request, _CUENTA_DUPLICADA[exc.campo])
 			return redirect('usuarios_listar')
-
-		u = User.objects.create_user(username=username, email=email, password=password)
-		u.is_superuser = is_superuser
-		u.is_staff = is_superuser or role_admin or role_employee or perm_citas or perm_tratamientos
-		u.save()
 		assign_user_groups(u, role_admin, role_employee, perm_citas, perm_tratamientos)
 
 		messages.success(request, 'Usuario creado correctamente')
@@ -665,13 +1021,13 @@ def usuarios_crear(request):
 # Gestión de Usuarios - Crear
 # - Permite crear un usuario administrativo o con permisos específicos.
 # - Asigna flags y grupos via `assign_user_groups`.
+# - Crea el `User` y su espejo `Usuario` con `crear_cuenta` (un solo INSERT por tabla).
 # - Marca `is_staff` si el usuario tiene cualquier rol o permiso relevante.
 
 
 @login_required
 @group_required('Administrador')
 def usuarios_editar(request, id):
-	ensure_default_groups()
 	user_obj = get_object_or_404(User, pk=id)
 	if request.method == 'POST':
 		username = request.POST.get('username', '').strip()
@@ -686,23 +1042,26 @@ def usuarios_editar(request, id):
 		if username:
 			user_obj.username = username
 		user_obj.email = email
-		if password:
-			user_obj.set_password(password)
 		user_obj.is_staff = is_superuser or role_admin or role_employee or perm_citas or perm_tratamientos
 		user_obj.is_superuser = is_superuser
-		user_obj.save()
+		try:
+			guardar_cuenta(user_obj, password)
+		except CuentaDuplicada as exc:
+			messages.error(request, _CUENTA_DUPLICADA[exc.campo])
+			return redirect('usuarios_editar', id=user_obj.pk)
 		assign_user_groups(user_obj, role_admin, role_employee, perm_citas, perm_tratamientos)
 
 		messages.success(request, 'Usuario actualizado')
 		return redirect('usuarios_listar')
 
+	grupos = nombres_grupos(user_obj)
 	role_flags = {
-		'admin': user_obj.groups.filter(name='Administrador').exists(),
-		'employee': user_obj.groups.filter(name='Empleado').exists(),
+		'admin': 'Administrador' in grupos,
+		'employee': 'Empleado' in grupos,
 	}
 	perm_flags = {
-		'citas': user_obj.groups.filter(name='Permiso Citas').exists(),
-		'tratamientos': user_obj.groups.filter(name='Permiso Tratamientos').exists(),
+		'citas': 'Permiso Citas' in grupos,
+		'tratamientos': 'Permiso Tratamientos' in grupos,
 	}
 	return render(request, 'users_edit.html', {
 		'user_obj': user_obj,
@@ -712,7 +1071,8 @@ def usuarios_editar(request, id):
 	})
 
 # Gestión de Usuarios - Editar
-# - Actualiza username, email, password y flags de rol/permiso.
+# - Actualiza username, email, password y flags de rol/permiso; `guardar_cuenta`
+#   mantiene sincronizado el espejo `Usuario`.
 # - No permite cambiar la propia eliminación desde esta vista (ver `usuarios_eliminar`).
 
 
@@ -734,6 +1094,36 @@ def usuarios_eliminar(request, id):
 # - Solo POST para prevenir borrados accidentales.
 
 
+@login_required
+@group_required('Administrador')
+def importar_datos(request):
+	contexto = {'modelos': sorted(MODELOS), 'formatos': FORMATOS}
+	if request.method == 'POST':
+		modelo = request.POST.get('modelo')
+		formato = request.POST.get('formato')
+		archivo = request.FILES.get('archivo')
+		if modelo not in MODELOS or formato not in FORMATOS or archivo is None:
+			messages.error(request, 'Seleccione el tipo de datos, el formato y un archivo.')
+			return redirect('importar_datos')
+		try:
+			resultado = importar(modelo, leer_filas(abrir_texto(archivo.file), formato))
+		except (ValueError, UnicodeDecodeError) as exc:
+			messages.error(request, f'No se pudo leer el archivo: {exc}')
+			return redirect('importar_datos')
+		if request.headers.get('Accept', '').startswith('application/json'):
+			return JsonResponse(resultado.a_dict())
+		messages.success(request, f'Importación terminada: {resultado.creados} creados, {resultado.omitidos} omitidos.')
+		contexto['resultado'] = resultado
+	return render(request, 'importar.html', contexto)
+
+# Importación masiva (CSV / JSON)
+# - Solo administradores. Recibe `modelo` (citas/tratamientos/reservaciones),
+#   `formato` (csv/json) y el archivo en `archivo`.
+# - El archivo se procesa en streaming y se inserta por lotes (`app/importacion.py`);
+#   las filas con errores se omiten y se listan con su número de fila.
+# - Con `Accept: application/json` devuelve el resultado como JSON.
+
+
 def crear(request):
 	"""Vista placeholder para crear un contacto."""
 	if request.method == 'POST':
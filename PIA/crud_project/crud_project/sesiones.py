@@ -0,0 +1,86 @@
+"""
+Perfil de sesiones a partir de variables de entorno.
+
+La usa `settings.py` para `SESSION_ENGINE`, `CACHES` y `SESSION_CACHE_ALIAS`.
+Sin variables se mantienen las sesiones en base de datos, como siempre.
+
+Variables:
+- `SESION_PERFIL`:
+  - `db` (por defecto): tabla `django_session`; una consulta por petición
+    autenticada para leer la sesión.
+  - `cached_db`: la sesión se lee de la cache y solo va a la base si no está
+    (escrituras en ambas). Recomendado: mismo comportamiento que `db` con una
+    consulta menos por petición.
+  - `cache`: solo cache, sin base de datos. Las sesiones se pierden si la cache
+    se vacía; usar con `SESION_CACHE=archivo` o una cache compartida.
+  - `cookies`: sesión firmada en la cookie del navegador, sin estado en el
+    servidor (útil si casi todo el tráfico es anónimo: `index`, solicitar cita).
+    No se puede invalidar una sesión desde el servidor antes de que expire,
+    solo al cerrar sesión (borra la cookie).
+- `SESION_CACHE` (perfiles `cached_db` y `cache`):
+  - `locmem` (por defecto): memoria del proceso; con varios procesos cada uno
+    tiene la suya (con `cached_db` no se pierde nada, se lee de la base).
+  - `archivo`: archivos en `SESION_CACHE_DIR` (por defecto
+    `base_dir / 'cache_sesiones'`), compartida por los procesos de un nodo.
+  - `default`: la cache `default` del proyecto.
+
+Las sesiones vencidas de la base se borran con
+`python manage.py limpiar_sesiones` (por lotes; programarlo con cron).
+"""
+
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
+ALIAS_CACHE = 'sesiones'
+
+MOTORES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def _cache(entorno, base_dir):
+    tipo = entorno.get('SESION_CACHE', 'locmem').strip() or 'locmem'
+    if tipo == 'default':
+        return None
+    if tipo == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': ALIAS_CACHE,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    if tipo == 'archivo':
+        ruta = entorno.get('SESION_CACHE_DIR', '').strip()
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': Path(ruta) if ruta else Path(base_dir) / 'cache_sesiones',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    raise ImproperlyConfigured(f'SESION_CACHE: valor no soportado {tipo!r} (locmem, archivo o default).')
+
+
+def configuracion_sesiones(entorno, base_dir):
+    """Ajustes de sesión según `entorno` (p. ej. `os.environ`).
+
+    Devuelve `{'SESSION_ENGINE': ..., 'SESSION_CACHE_ALIAS': ..., 'CACHES': {...}}`;
+    `CACHES` solo trae la cache extra de sesiones (se suma a la `default`).
+    """
+    perfil = entorno.get('SESION_PERFIL', 'db').strip() or 'db'
+    if perfil not in MOTORES:
+        raise ImproperlyConfigured(
+            f"SESION_PERFIL: valor no soportado {perfil!r} ({', '.join(MOTORES)})."
+        )
+    config = {
+        'SESSION_ENGINE': MOTORES[perfil],
+        'SESSION_CACHE_ALIAS': 'default',
+        'CACHES': {},
+    }
+    if perfil in ('cached_db', 'cache'):
+        cache = _cache(entorno, base_dir)
+        if cache is not None:
+            config['CACHES'][ALIAS_CACHE] = cache
+            config['SESSION_CACHE_ALIAS'] = ALIAS_CACHE
+    return config
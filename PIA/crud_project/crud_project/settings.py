@@ -3,6 +3,7 @@
 # Este archivo contiene los ajustes principales usados por el proyecto.
 # Cada sección siguiente tiene una breve descripción de para qué sirve.
 
+import os
 from pathlib import Path
 
 # BASE_DIR: ruta absoluta a la carpeta base del proyecto.
@@ -37,13 +38,22 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # Pila de middleware estándar de Django. Cada elemento es una clase
     # que procesa requests/responses (seguridad, sesiones, CSRF, etc.).
+    # Métricas por vista: va primero para medir toda la pila. Solo se
+    # activa con METRICAS_ACTIVAS (ver sección "Métricas").
+    'app.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Estáticos versionados y precomprimidos desde STATIC_ROOT, antes de
+    # sesiones/CSRF. Solo con ESTATICOS_VERSIONADOS (ver "Archivos estáticos").
+    'app.estaticos.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Cookie de "leer lo propio" tras una escritura; solo con réplica
+    # configurada (ver sección "Base de datos").
+    'app.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'crud_project.urls'  # Módulo que contiene las rutas principales
@@ -74,13 +84,57 @@ WSGI_APPLICATION = 'crud_project.wsgi.application'  # Punto de entrada WSGI
 
 
 # ------------------------- Base de datos --------------------------------
-# Base de datos: sqlite3 usada para desarrollo por simplicidad.
+# Por defecto SQLite en `BASE_DIR / 'db.sqlite3'`. En producción:
+# `DATABASE_URL=postgres://...` (opcionalmente con `DB_POOL=1`) o
+# `DATABASE_URL=sqlite:///...` (WAL, synchronous=NORMAL, busy timeout, mmap).
+# Conexiones persistentes con `DB_CONN_MAX_AGE`.
+# Todas las variables están descritas en `crud_project/basedatos.py`.
+from .basedatos import configuracion_bd
+
 DATABASES = {
+    'default': configuracion_bd(os.environ, BASE_DIR),
+}
+
+# Réplica de solo lectura opcional (`DATABASE_REPLICA_URL`). Las vistas
+# marcadas con `@lectura_en_replica` leen de ella; las escrituras y quien acaba
+# de escribir (cookie de `REPLICA_LECTURA_PROPIA` segundos) usan 'default'.
+# En pruebas la réplica apunta a la base de pruebas de 'default' (MIRROR).
+# Ver `app/replicas.py`.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = configuracion_bd(os.environ, BASE_DIR, 'DATABASE_REPLICA_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['app.replicas.RouterReplica']
+REPLICA_LECTURA_PROPIA = int(os.environ.get('REPLICA_LECTURA_PROPIA', '10'))
+
+
+# ------------------------- Cache y sesiones -----------------------------
+# Cache `default` en memoria del proceso (catálogo, dashboard, disponibilidad,
+# precios). `SESION_PERFIL` elige dónde viven las sesiones: `db` (por
+# defecto), `cached_db` (una consulta menos por petición autenticada), `cache`
+# o `cookies` (firmadas, sin estado en el servidor); con `cached_db`/`cache`,
+# `SESION_CACHE` elige la cache (`locmem`, `archivo` o `default`).
+# Todas las variables están descritas en `crud_project/sesiones.py`.
+# Sesiones vencidas: `python manage.py limpiar_sesiones` (por lotes).
+from .sesiones import configuracion_sesiones
+
+_SESIONES = configuracion_sesiones(os.environ, BASE_DIR)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    **_SESIONES['CACHES'],
 }
+SESSION_ENGINE = _SESIONES['SESSION_ENGINE']
+SESSION_CACHE_ALIAS = _SESIONES['SESSION_CACHE_ALIAS']
+
+
+# Grupos de cada usuario cacheados entre requests (`app/roles.py`). Activarlo
+# solo si CACHES['default'] es compartida por todos los procesos (Redis,
+# Memcached): con LocMemCache un cambio de grupos solo se vería en el proceso
+# que lo hizo y los demás autorizarían con grupos revocados hasta 300 s. Sin
+# ella se hace una consulta de grupos por request.
+ROLES_CACHE_COMPARTIDA = os.environ.get('ROLES_CACHE_COMPARTIDA', '0') == '1'
 
 
 # ------------------------- Validación de contraseñas --------------------
@@ -125,6 +179,86 @@ STATICFILES_DIRS = [
     BASE_DIR / 'app' / 'statics',
 ]
 
+# Pipeline de producción (`app/estaticos.py`): `collectstatic` copia a
+# STATIC_ROOT con el hash del contenido en el nombre, crea variantes .gz/.br y
+# `EstaticosMiddleware` las sirve con cache de un año. Por defecto activo solo
+# con DEBUG desactivado; requiere `python manage.py collectstatic` al desplegar.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+ESTATICOS_VERSIONADOS = os.environ.get('ESTATICOS_VERSIONADOS', '0' if DEBUG else '1') == '1'
+ESTATICOS_MAX_AGE = 60  # Segundos para archivos sin hash en el nombre.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'app.estaticos.AlmacenEstaticos' if ESTATICOS_VERSIONADOS
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Imágenes responsivas: `python manage.py imagenes` genera derivadas WebP/AVIF
+# a estos anchos en `app/statics/img/derivadas/` (correrlo antes de
+# `collectstatic`); `{% imagen %}` las usa con srcset y carga diferida.
+IMAGENES_DIR = BASE_DIR / 'app' / 'statics'
+IMAGENES_ANCHOS = (480, 960, 1440)
+
+# Videos de la landing y del login/registro (`{% video_atributos %}`).
+# `preload`: 'none', 'metadata' o 'auto'. `VIDEO_POSTER_ANCHO`: ancho máximo
+# de la derivada usada como poster (0 = sin poster).
+VIDEO_AUTOPLAY = os.environ.get('VIDEO_AUTOPLAY', '1') == '1'
+VIDEO_PRELOAD = os.environ.get('VIDEO_PRELOAD', 'metadata')
+VIDEO_POSTER_ANCHO = 1440
+
+
+# ------------------------- Métricas ------------------------------------
+# `MetricasMiddleware` registra tiempo total, SQL, plantillas y número de
+# consultas por ruta, y añade la cabecera `Server-Timing`. Desactivado, no
+# tiene costo (Django lo quita de la cadena de middleware).
+METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', '0') == '1'
+
+# Carpeta donde cada proceso vuelca sus histogramas (para el comando
+# `python manage.py metricas`) y cada cuántos segundos lo hace.
+METRICAS_DIR = BASE_DIR / 'metricas'
+METRICAS_INTERVALO_VOLCADO = 30
+
+
+# ------------------------- Agenda de citas -----------------------------
+# Horario en que se ofrecen citas (una por hora), por día de la semana
+# (0 = lunes). `(inicio, fin)`: la última cita empieza a las `fin - 1`.
+# Lo usa `/api/disponibilidad/` para calcular los horarios libres.
+HORARIO_CITAS = {
+    0: (9, 18),
+    1: (9, 18),
+    2: (9, 18),
+    3: (9, 18),
+    4: (9, 18),
+    5: (9, 14),
+}
+
+
+# ------------------------- Búsqueda -------------------------------------
+# Con SQLite se puede usar la tabla FTS5 `app_busqueda_fts` para buscar por
+# cualquier palabra del nombre (no solo el prefijo). Se mantiene con señales;
+# tras cargas masivas: `python manage.py busqueda --reindexar`.
+BUSQUEDA_FTS = os.environ.get('BUSQUEDA_FTS', '0') == '1'
+
+
+# ------------------------- Límite de intentos ---------------------------
+# Login y registro por IP y por usuario: `{regla: (intentos, segundos)}` en
+# ventana deslizante. Al excederse se responde 429 sin hashear la contraseña.
+# Los contadores viven en memoria del proceso (hasta `LIMITES_MAX_CLAVES`
+# claves, se desaloja la menos reciente); con `LIMITES_COMPARTIDOS=1` usan la
+# cache de Django (compartida si la cache lo es). Ver `app/limites.py`.
+LIMITES_ACTIVOS = os.environ.get('LIMITES_ACTIVOS', '1') == '1'
+LIMITES_COMPARTIDOS = os.environ.get('LIMITES_COMPARTIDOS', '0') == '1'
+LIMITES_MAX_CLAVES = 10000
+LIMITES_REGLAS = {
+    'login_ip': (20, 300),
+    'login_usuario': (5, 300),
+    'signup_ip': (10, 3600),
+    'signup_usuario': (5, 3600),
+}
+
 
 # Default primary key field type for modelos nuevos
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'